@@ -23,18 +23,62 @@ import future.utils
 from past.builtins import basestring
 
 import logging as _logging
+import importlib as _importlib
+import sys as _sys
 import urllib.parse
 import warnings
+from multiprocessing.pool import ThreadPool as _ThreadPool
+
+# The public katdal objects are only imported on first access (see __getattr__
+# below), since the format modules pull in slow dependencies like dask, numba,
+# h5py and katsdptelstate. This maps each object to the module that has it.
+_LAZY_ATTRIBUTES = {
+    'open_data_source': 'datasources',
+    'DataSet': 'dataset',
+    'WrongVersion': 'dataset',
+    'SpectralWindow': 'spectral_window',
+    'LazyTransform': 'lazy_indexer',
+    'dask_getitem': 'lazy_indexer',
+    'ConcatenatedDataSet': 'concatdata',
+    'H5DataV1': 'h5datav1',
+    'H5DataV2': 'h5datav2',
+    'H5DataV3': 'h5datav3',
+    'VisibilityDataV4': 'visdatav4',
+}
+# Submodules that are accessible as attributes of the package after `import katdal`
+_LAZY_SUBMODULES = (
+    'applycal', 'averager', 'categorical', 'chunkstore', 'chunkstore_dict',
+    'chunkstore_npy', 'chunkstore_s3', 'concatdata', 'datasources', 'dataset',
+    'flags', 'h5datav1', 'h5datav2', 'h5datav3', 'lazy_indexer', 'lazy_jit',
+    'sensordata', 'spectral_window', 'visdatav4',
+)
+
+
+def __getattr__(name):
+    """Import public objects and submodules on first access (PEP 562)."""
+    if name in _LAZY_ATTRIBUTES:
+        module = _importlib.import_module('.' + _LAZY_ATTRIBUTES[name], __name__)
+        value = getattr(module, name)
+    elif name == 'formats':
+        value = [__getattr__('H5DataV3'), __getattr__('H5DataV2'),
+                 __getattr__('H5DataV1')]
+    elif name in _LAZY_SUBMODULES:
+        value = _importlib.import_module('.' + name, __name__)
+    else:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    # Cache the object in the module namespace to bypass __getattr__ next time
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | {'formats'})
 
-from .datasources import open_data_source
-from .dataset import DataSet, WrongVersion
-from .spectral_window import SpectralWindow
-from .lazy_indexer import LazyTransform, dask_getitem
-from .concatdata import ConcatenatedDataSet
-from .h5datav1 import H5DataV1
-from .h5datav2 import H5DataV2
-from .h5datav3 import H5DataV3
-from .visdatav4 import VisibilityDataV4
+
+# Module-level __getattr__ only works on Python 3.7 and above
+if _sys.version_info < (3, 7):
+    for _name in sorted(_LAZY_ATTRIBUTES) + ['formats']:
+        __getattr__(_name)
 
 
 # Setup library logger and add a print-like handler used when no logging is configured
@@ -74,8 +118,6 @@ else:
 # -- Top-level functions passed on to the appropriate format handler
 # -----------------------------------------------------------------------------
 
-formats = [H5DataV3, H5DataV2, H5DataV1]
-
 
 def _file_action(action, filename, *args, **kwargs):
     """Perform action on data file using the appropriate format class.
@@ -94,7 +136,9 @@ def _file_action(action, filename, *args, **kwargs):
         Result of action
 
     """
-    for format in formats:
+    from .dataset import WrongVersion
+    # Look up formats via the module so that it is imported lazily
+    for format in _sys.modules[__name__].formats:
         try:
             result = getattr(format, action)(filename, *args, **kwargs)
             break
@@ -106,7 +150,24 @@ def _file_action(action, filename, *args, **kwargs):
     return result
 
 
-def open(filename, ref_ant='', time_offset=0.0, **kwargs):
+def _open_single(filename, ref_ant='', time_offset=0.0, **kwargs):
+    """Open a single data file or data source (see :func:`open` for details)."""
+    # V4 RDB file or live telstate with optional URL-style query string
+    parsed = urllib.parse.urlsplit(filename)
+    if parsed.path.endswith('.rdb') or parsed.scheme != '':
+        from .datasources import open_data_source
+        from .visdatav4 import VisibilityDataV4
+        return VisibilityDataV4(open_data_source(filename, **kwargs),
+                                ref_ant, time_offset, **kwargs)
+    else:
+        return _file_action('__call__', filename, ref_ant, time_offset, **kwargs)
+
+
+# Default maximum number of data sets opened concurrently by :func:`open`
+DEFAULT_OPEN_WORKERS = 8
+
+
+def open(filename, ref_ant='', time_offset=0.0, open_workers=None, **kwargs):
     """Open data file(s) with loader of the appropriate version.
 
     Parameters
@@ -117,6 +178,12 @@ def open(filename, ref_ant='', time_offset=0.0, **kwargs):
         Name of reference antenna (default is first antenna in use)
     time_offset : float, optional
         Offset to add to all timestamps, in seconds
+    open_workers : int or None, optional
+        Number of threads used to open a list of data files concurrently
+        (the default is one per file, up to :const:`DEFAULT_OPEN_WORKERS`).
+        Opening is mostly I/O-bound (downloading and parsing metadata), so
+        the total time approaches that of the slowest file. Set this to 1
+        to open the files one after the other.
     kwargs : dict, optional
         Extra keyword arguments are passed on to underlying accessor class:
 
@@ -134,19 +201,26 @@ def open(filename, ref_ant='', time_offset=0.0, **kwargs):
         Object providing :class:`DataSet` interface to file(s)
 
     """
-    filenames = [filename] if isinstance(filename, basestring) else filename
-    datasets = []
-    for f in filenames:
-        # V4 RDB file or live telstate with optional URL-style query string
-        parsed = urllib.parse.urlsplit(f)
-        if parsed.path.endswith('.rdb') or parsed.scheme != '':
-            dataset = VisibilityDataV4(open_data_source(f, **kwargs),
-                                       ref_ant, time_offset, **kwargs)
-        else:
-            dataset = _file_action('__call__', f, ref_ant, time_offset, **kwargs)
-        datasets.append(dataset)
-    return datasets[0] if isinstance(filename, basestring) else \
-        ConcatenatedDataSet(datasets)
+    if isinstance(filename, basestring):
+        return _open_single(filename, ref_ant, time_offset, **kwargs)
+    filenames = list(filename)
+    if open_workers is None:
+        open_workers = min(len(filenames), DEFAULT_OPEN_WORKERS)
+    if open_workers <= 1 or len(filenames) <= 1:
+        datasets = [_open_single(f, ref_ant, time_offset, **kwargs)
+                    for f in filenames]
+    else:
+        def open_one(f):
+            return _open_single(f, ref_ant, time_offset, **kwargs)
+        pool = _ThreadPool(open_workers)
+        try:
+            # This preserves the order of the files and reraises any errors
+            datasets = pool.map(open_one, filenames)
+        finally:
+            pool.close()
+            pool.join()
+    from .concatdata import ConcatenatedDataSet
+    return ConcatenatedDataSet(datasets)
 
 
 def get_ants(filename):
@@ -21,8 +21,8 @@ import logging
 
 import numpy as np
 import dask.array as da
-import numba
 
+from .lazy_jit import jit, register_warm_up
 from .categorical import CategoricalData, ComparableArrayWrapper
 from .sensordata import SensorGetter, SimpleSensorGetter
 from .spectral_window import SpectralWindow
@@ -112,6 +112,31 @@ def get_cal_product(cache, cal_stream, product_type):
     return cache.get(sensor_name)
 
 
+def _input_index(indices):
+    """Turn sequence of (pol, ant) input indices into index arrays for cal products."""
+    return tuple(np.array(indices).T)
+
+
+def _categorical_per_input(corrections, events):
+    """Split corrections of shape (n_inputs, n_chans) per segment into sensors per input."""
+    return [CategoricalData([ComparableArrayWrapper(correction[n]) for correction in corrections],
+                            events) for n in range(len(corrections[0]))]
+
+
+def _unwrap_valid(phase, valid):
+    """Unwrap phase along last axis, only considering valid values in each row.
+
+    This is equivalent to unwrapping each row compressed to its valid values,
+    since invalid values are replaced by the preceding (or first) valid value
+    in the row, which contributes no phase jumps.
+    """
+    n = phase.shape[-1]
+    previous = np.maximum.accumulate(np.where(valid, np.arange(n), -1), axis=-1)
+    first = np.argmax(valid, axis=-1)[..., np.newaxis]
+    previous = np.where(previous >= 0, previous, first)
+    return np.unwrap(np.take_along_axis(phase, previous, axis=-1), axis=-1)
+
+
 def calc_delay_correction(sensor, index, data_freqs):
     """Calculate correction sensor from delay calibration solution sensor.
 
@@ -123,12 +148,34 @@ def calc_delay_correction(sensor, index, data_freqs):
     Invalid delays (NaNs) are replaced by zeros, since bandpass calibration
     still has a shot at fixing any residual delay.
     """
-    delays = [np.nan_to_num(value[index]) for segm, value in sensor.segments()]
-    # Delays produced by cal pipeline are raw phase slopes, i.e. exp(2 pi j d f)
-    corrections = [np.exp(-2j * np.pi * d * data_freqs).astype('complex64')
-                   for d in delays]
-    corrections = [ComparableArrayWrapper(c) for c in corrections]
-    return CategoricalData(corrections, sensor.events)
+    return calc_delay_corrections(sensor, [index], data_freqs)[0]
+
+
+def calc_delay_corrections(sensor, indices, data_freqs):
+    """Calculate correction sensors for several inputs from delay solutions.
+
+    This is the batched version of :func:`calc_delay_correction`, which
+    evaluates the correction terms of all the inputs specified by `indices`
+    (a sequence of (pol, ant) pairs) as a 2-D (input, channel) array per
+    solution. The phases are calculated in double precision but the complex
+    exponentials are stored directly in single precision.
+
+    Returns
+    -------
+    sensors : list of :class:`~katdal.categorical.CategoricalData`
+        Correction sensor per input, in the same order as `indices`
+    """
+    index = _input_index(indices)
+    corrections = []
+    for segment, value in sensor.segments():
+        delays = np.nan_to_num(value[index])
+        # Delays produced by cal pipeline are raw phase slopes, i.e. exp(2 pi j d f)
+        phase = np.outer(-2 * np.pi * delays, data_freqs)
+        correction = np.empty(phase.shape, dtype='complex64')
+        np.cos(phase, out=correction.real, casting='same_kind')
+        np.sin(phase, out=correction.imag, casting='same_kind')
+        corrections.append(correction)
+    return _categorical_per_input(corrections, sensor.events)
 
 
 def calc_bandpass_correction(sensor, index, data_freqs, cal_freqs):
@@ -143,18 +190,45 @@ def calc_bandpass_correction(sensor, index, data_freqs, cal_freqs):
     frequency (separately for magnitude and phase), as long as some channels
     have valid solutions.
     """
+    return calc_bandpass_corrections(sensor, [index], data_freqs, cal_freqs)[0]
+
+
+def calc_bandpass_corrections(sensor, indices, data_freqs, cal_freqs):
+    """Calculate correction sensors for several inputs from bandpass solutions.
+
+    This is the batched version of :func:`calc_bandpass_correction`, which
+    handles the bandpasses of all the inputs specified by `indices` (a
+    sequence of (pol, ant) pairs) as a 2-D (input, channel) array per
+    solution. The magnitudes and unwrapped phases of the solutions stay in
+    single precision (like the solutions themselves) and the interpolated
+    corrections are assembled directly in the output array, which produces
+    the same values as :func:`complex_interp` without complex128 temporaries.
+
+    Returns
+    -------
+    sensors : list of :class:`~katdal.categorical.CategoricalData`
+        Correction sensor per input, in the same order as `indices`
+    """
+    index = (slice(None),) + _input_index(indices)
     corrections = []
     for segment, value in sensor.segments():
-        bp = value[(slice(None),) + index]
+        bp = value[index].T
         valid = np.isfinite(bp)
-        if valid.any():
+        mag = np.abs(bp)
+        phase = _unwrap_valid(np.angle(bp), valid)
+        correction = np.empty((len(bp), len(data_freqs)), dtype=bp.dtype)
+        for n, valid_chans in enumerate(valid):
+            if not valid_chans.any():
+                correction[n] = INVALID_GAIN
+                continue
             # Don't extrapolate to edges of band where gain typically drops off
-            bp = complex_interp(data_freqs, cal_freqs[valid], bp[valid],
-                                left=INVALID_GAIN, right=INVALID_GAIN)
-        else:
-            bp = np.full(len(data_freqs), INVALID_GAIN)
-        corrections.append(ComparableArrayWrapper(np.reciprocal(bp)))
-    return CategoricalData(corrections, sensor.events)
+            freqs = cal_freqs[valid_chans]
+            mag_n = np.interp(data_freqs, freqs, mag[n, valid_chans], left=np.nan, right=np.nan)
+            phase_n = np.interp(data_freqs, freqs, phase[n, valid_chans], left=np.nan, right=np.nan)
+            np.multiply(np.cos(phase_n), mag_n, out=correction[n].real, casting='same_kind')
+            np.multiply(np.sin(phase_n), mag_n, out=correction[n].imag, casting='same_kind')
+        corrections.append(np.reciprocal(correction, out=correction))
+    return _categorical_per_input(corrections, sensor.events)
 
 
 def calc_gain_correction(sensor, index, targets=None):
@@ -382,6 +456,22 @@ def add_applycal_sensors(cache, attrs, data_freqs, cal_stream, cal_substreams=No
         return SimpleSensorGetter(indirect_cal_product_name(name, product_type),
                                   np.array(timestamps), np.array(values))
 
+    def calc_corrections_per_product(cache, name, inp, product_type, product_sensor):
+        """Calculate and cache correction sensors for all inputs in one go."""
+        inputs = sorted(cal_input_map.keys())
+        indices = [cal_input_map[cal_inp] for cal_inp in inputs]
+        if product_type == 'K':
+            sensors = calc_delay_corrections(product_sensor, indices, data_freqs)
+        else:
+            sensors = calc_bandpass_corrections(product_sensor, indices,
+                                                data_freqs, cal_freqs)
+        prefix = name[:-len(inp)]
+        for cal_inp, sensor in zip(inputs, sensors):
+            # Don't replace any correction sensors that are already cached
+            if cal_inp == inp or prefix + cal_inp not in cache:
+                cache[prefix + cal_inp] = sensor
+        return sensors[inputs.index(inp)]
+
     def calc_correction_per_input(cache, name, inp, product_type):
         """Calculate correction sensor for input `inp` from cal solutions."""
         product_sensor = get_cal_product(cache, cal_stream, product_type)
@@ -391,12 +481,11 @@ def add_applycal_sensors(cache, attrs, data_freqs, cal_stream, cal_substreams=No
             raise KeyError("No calibration solutions available for input "
                            "'{}' - available ones are {}"
                            .format(inp, sorted(cal_input_map.keys())))
-        if product_type == 'K':
-            correction_sensor = calc_delay_correction(product_sensor, index,
-                                                      data_freqs)
-        elif product_type == 'B':
-            correction_sensor = calc_bandpass_correction(product_sensor, index,
-                                                         data_freqs, cal_freqs)
+        if product_type in ('K', 'B'):
+            # The corrections of all inputs are needed together and are
+            # much cheaper to compute as a batch, so cache them per product
+            return calc_corrections_per_product(cache, name, inp, product_type,
+                                                product_sensor)
         elif product_type == 'G':
             product_sensor = calibrate_flux(product_sensor, targets, gaincal_flux)
             correction_sensor = calc_gain_correction(product_sensor, index)
@@ -415,13 +504,86 @@ def add_applycal_sensors(cache, attrs, data_freqs, cal_stream, cal_substreams=No
     return cal_freqs
 
 
-@numba.jit(nopython=True, nogil=True)
+@jit(nopython=True, nogil=True, cache=True)
 def _correction_inputs_to_corrprods(g_per_cp, g_per_input, input1_index, input2_index):
-    """Convert gains per input to gains per correlation product."""
+    """Convert gains per input to gains per correlation product for several dumps."""
     for i in range(g_per_cp.shape[0]):
         for j in range(g_per_cp.shape[1]):
-            g_per_cp[i, j] = (g_per_input[i, input1_index[j]]
-                              * np.conj(g_per_input[i, input2_index[j]]))
+            for k in range(g_per_cp.shape[2]):
+                g_per_cp[i, j, k] = (g_per_input[i, j, input1_index[k]]
+                                     * np.conj(g_per_input[i, j, input2_index[k]]))
+
+
+class CorrectionSegments(object):
+    """Corrections of all inputs that are piecewise constant in time.
+
+    The dumps are split into segments such that the correction of every
+    input is constant within a segment. Instead of keeping a reference per
+    dump and input, the unique correction vectors of all inputs are stored
+    once in a compact array, together with the index of the relevant vector
+    per segment and input.
+
+    Parameters
+    ----------
+    values : array, shape (n_values, n_chans)
+        Unique correction vectors of all inputs, with a single channel if
+        the corrections are independent of frequency
+    indices : array of int, shape (n_segments, n_inputs)
+        Index into `values` of the correction per segment and input
+    events : array of int, shape (n_segments + 1,)
+        Index of the first dump of each segment, followed by number of dumps
+    """
+    def __init__(self, values, indices, events):
+        self.values = values
+        self.indices = indices
+        self.events = events
+
+    @classmethod
+    def from_sensors(cls, sensors):
+        """Combine categorical correction sensors (one per input) into segments.
+
+        Parameters
+        ----------
+        sensors : sequence of :class:`~katdal.categorical.CategoricalData`
+            Correction sensors per input, with scalar or 1-D array values
+
+        Returns
+        -------
+        segments : :class:`CorrectionSegments` object
+            Corrections of all inputs, split into common segments
+        """
+        events = np.unique(np.concatenate([sensor.events for sensor in sensors]))
+        indices = np.empty((len(events) - 1, len(sensors)), dtype=np.int32)
+        values = []
+        for i, sensor in enumerate(sensors):
+            # The segment of this sensor that contains each common segment
+            segment = np.searchsorted(sensor.events, events[:-1], side='right') - 1
+            indices[:, i] = np.asarray(sensor.indices)[segment] + len(values)
+            values.extend(np.atleast_1d(value) for value in sensor.unique_values)
+        n_chans = max(len(value) for value in values)
+        values = np.stack([np.broadcast_to(value, (n_chans,)) for value in values])
+        return cls(values, indices, events)
+
+    def __getitem__(self, dumps):
+        """Corrections per segment and input for segments overlapping `dumps`.
+
+        Parameters
+        ----------
+        dumps : slice
+            Dump indices (applicable to full data set, i.e. absolute), with
+            explicit start and stop
+
+        Returns
+        -------
+        corrections : array, shape (n_segments, n_inputs, n_chans)
+            Corrections of segments that overlap with `dumps`
+        boundaries : array of int, shape (n_segments + 1,)
+            Boundaries of these segments, clipped to `dumps`
+        """
+        first = np.searchsorted(self.events, dumps.start, side='right') - 1
+        last = np.searchsorted(self.events, dumps.stop, side='left')
+        boundaries = np.clip(self.events[first:last + 1], dumps.start, dumps.stop)
+        return self.values[self.indices[first:last]], boundaries
 
 
 class CorrectionParams(object):
@@ -437,14 +599,16 @@ class CorrectionParams(object):
     input1_index, input2_index : array of int
         Indices into `inputs` of first and second items of correlation product
     corrections : dict
-        A dictionary (indexed by cal product name) of lists (indexed
-        by input) of sequences (indexed by dump) of numpy arrays, with
-        corrections to apply.
+        A dictionary (indexed by cal product name) of corrections to apply,
+        either as a :class:`CorrectionSegments` object (for corrections that
+        are piecewise constant) or as a list (indexed by input) of arrays
+        (indexed by dump) for corrections that change every dump.
     channel_maps : dict
         A dictionary (indexed by cal product name) of functions (signature
-        `g = channel_map(g, channels)`) that map the frequency axis of the
-        cal product `g` onto the frequency axis of the visibility data, where
-        the vis frequency axis will be indexed by the slice `channels`.
+        `g = channel_map(g, channels)`) that map the frequency axis (the last
+        axis) of the cal product `g` onto the frequency axis of the visibility
+        data, where the vis frequency axis will be indexed by the slice
+        `channels`.
     """
     def __init__(self, inputs, input1_index, input2_index, corrections, channel_maps):
         self.inputs = inputs
@@ -454,6 +618,43 @@ class CorrectionParams(object):
         self.channel_maps = channel_maps
 
 
+def _stack_inputs(values):
+    """Stack corrections of all inputs along first axis, broadcasting shapes.
+
+    Inputs without any valid solutions have single-channel corrections,
+    even when the other inputs have multi-channel ones.
+    """
+    return np.stack(np.broadcast_arrays(*values))
+
+
+def _corrections_per_input(dumps, channels, params):
+    """Gain corrections per dump, channel and input for a range of dumps.
+
+    The corrections of each cal product are gathered and mapped to the
+    channels for all inputs at once, once per segment of dumps where they
+    are constant (or once for all the dumps, for products that change every
+    dump), and then broadcast over the dumps.
+    """
+    n_dumps = dumps.stop - dumps.start
+    n_channels = channels.stop - channels.start
+    g_per_input = np.ones((n_dumps, n_channels, len(params.inputs)), dtype='complex64')
+    for cal_product, product_corrections in params.corrections.items():
+        channel_map = params.channel_maps[cal_product]
+        if isinstance(product_corrections, CorrectionSegments):
+            # Shape (segments, inputs, cal channels) => (segments, channels, inputs)
+            g, boundaries = product_corrections[dumps]
+            g = np.moveaxis(channel_map(g, channels), 1, -1)
+            boundaries = (boundaries - dumps.start).tolist()
+            for g_segment, start, stop in zip(g, boundaries[:-1], boundaries[1:]):
+                g_per_input[start:stop] *= g_segment
+        else:
+            # Shape (inputs, dumps, cal channels) => (dumps, channels, inputs)
+            g = _stack_inputs([np.asarray(corrections[dumps])
+                               for corrections in product_corrections])
+            g_per_input *= np.moveaxis(channel_map(g, channels), 0, -1)
+    return g_per_input
+
+
 def calc_correction_per_corrprod(dump, channels, params):
     """Gain correction per channel per correlation product for a given dump.
 
@@ -481,17 +682,13 @@ def calc_correction_per_corrprod(dump, channels, params):
     KeyError
         If input and/or cal product has no associated correction
     """
-    n_channels = channels.stop - channels.start
-    g_per_input = np.ones((len(params.inputs), n_channels), dtype='complex64')
-    for cal_product, product_corrections in params.corrections.items():
-        channel_map = params.channel_maps[cal_product]
-        for i in range(len(params.inputs)):
-            sensor = product_corrections[i]
-            g_per_channel = sensor[dump]
-            g_per_input[i] *= channel_map(g_per_channel, channels)
-    # Transpose to (channel, input) order, and ensure C ordering
-    g_per_input = np.ascontiguousarray(g_per_input.T)
-    g_per_cp = np.empty((n_channels, len(params.input1_index)), dtype='complex64')
+    return _calc_correction_per_corrprod(slice(dump, dump + 1), channels, params)[0]
+
+
+def _calc_correction_per_corrprod(dumps, channels, params):
+    """Gain correction per dump, channel and corrprod for a range of dumps."""
+    g_per_input = _corrections_per_input(dumps, channels, params)
+    g_per_cp = np.empty(g_per_input.shape[:2] + (len(params.input1_index),), dtype='complex64')
     _correction_inputs_to_corrprods(g_per_cp, g_per_input,
                                     params.input1_index, params.input2_index)
     return g_per_cp
@@ -500,12 +697,7 @@ def calc_correction_per_corrprod(dump, channels, params):
 def _correction_block(block_info, params):
     """Calculate applycal correction for a single time-freq-baseline chunk."""
     slices = tuple(slice(*l) for l in block_info[None]['array-location'])
-    block_shape = block_info[None]['chunk-shape']
-    correction = np.empty(block_shape, np.complex64)
-    # TODO: make calc_correction_per_corrprod multi-dump aware
-    for n, dump in enumerate(range(slices[0].start, slices[0].stop)):
-        correction[n] = calc_correction_per_corrprod(dump, slices[1], params)
-    return correction
+    return _calc_correction_per_corrprod(slices[0], slices[1], params)
 
 
 def calc_correction(chunks, cache, corrprods, cal_products, data_freqs,
@@ -559,8 +751,8 @@ def calc_correction(chunks, cache, corrprods, cal_products, data_freqs,
     for cal_product in cal_products:
         cal_stream, product_type = _parse_cal_product(cal_product)
         sensor_prefix = 'Calibration/Corrections/{}/{}/'.format(cal_stream, product_type)
-        corrections_per_product = []
-        for i, inp in enumerate(inputs):
+        sensors = []
+        for inp in inputs:
             try:
                 sensor = cache.get(sensor_prefix + inp)
             except KeyError:
@@ -568,25 +760,24 @@ def calc_correction(chunks, cache, corrprods, cal_products, data_freqs,
                     break
                 else:
                     raise
-            # Indexing CategoricalData by dump is relatively slow (tens of
-            # microseconds), so expand it into a plain-old Python list.
-            if isinstance(sensor, CategoricalData):
-                data = [None] * sensor.events[-1]
-                for s, v in sensor.segments():
-                    for j in range(s.start, s.stop):
-                        data[j] = v
-            else:
-                data = sensor
-            corrections_per_product.append(data)
+            sensors.append(sensor)
         else:
-            corrections[cal_product] = corrections_per_product
+            # Store piecewise constant corrections as unique values and
+            # segment indices shared by all inputs instead of per dump
+            if isinstance(sensors[0], CategoricalData):
+                product_corrections = CorrectionSegments.from_sensors(sensors)
+                correction_n_chans = product_corrections.values.shape[-1]
+            else:
+                product_corrections = sensors
+                # Get number of frequency channels of *corrections* by inspecting
+                # it at first dump for each input and picking max to reject bad inputs.
+                correction_n_chans = max([len(np.atleast_1d(corr_per_input[0]))
+                                          for corr_per_input in product_corrections])
+            corrections[cal_product] = product_corrections
             # Frequency configuration for *stream* (not necessarily for product)
             cal_stream_freqs = all_cal_freqs[cal_stream]
-            # Get number of frequency channels of *corrections* by inspecting it
-            # at first dump for each input and picking max to reject bad inputs.
-            # Expected to be either 1, len(cal_stream_freqs) or len(data_freqs).
-            correction_n_chans = max([len(np.atleast_1d(corr_per_input[0]))
-                                      for corr_per_input in corrections_per_product])
+            # Number of frequency channels of corrections is expected
+            # to be either 1, len(cal_stream_freqs) or len(data_freqs).
             if correction_n_chans == 1:
                 # Scalar values will be broadcast by NumPy - no slicing required
                 channel_maps[cal_product] = lambda g, channels: g
@@ -597,12 +788,12 @@ def calc_correction(chunks, cache, corrprods, cal_products, data_freqs,
                     len(cal_stream_freqs) != len(data_freqs)
                     or np.allclose(cal_stream_freqs, data_freqs, rtol=0, atol=1e-3)):
                 # Corrections are already lined up with data - slice directly
-                channel_maps[cal_product] = lambda g, channels: g[channels]
+                channel_maps[cal_product] = lambda g, channels: g[..., channels]
             else:
                 # Pick closest cal channel for each data channel
                 expand = np.abs(data_freqs[:, np.newaxis]
                                 - cal_stream_freqs[np.newaxis, :]).argmin(axis=-1)
-                channel_maps[cal_product] = lambda g, channels: g[expand[channels]]
+                channel_maps[cal_product] = lambda g, channels: g[..., expand[channels]]
     final_cal_products = list(corrections.keys())
     if not final_cal_products:
         return final_cal_products, None
@@ -614,10 +805,14 @@ def calc_correction(chunks, cache, corrprods, cal_products, data_freqs,
                           name=name, params=params))
 
 
-@numba.jit(nopython=True, nogil=True)
-def apply_vis_correction(data, correction):
-    """Clean up and apply `correction` to visibility data in `data`."""
-    out = np.empty_like(data)
+@jit(nopython=True, nogil=True, cache=True)
+def apply_vis_correction(data, correction, out=None):
+    """Clean up and apply `correction` to visibility data in `data`.
+
+    The corrected data is written to `out` if given, which may be `data`
+    itself to correct it in place.
+    """
+    out = np.empty_like(data) if out is None else out
     for i in range(out.shape[0]):
         for j in range(out.shape[1]):
             for k in range(out.shape[2]):
@@ -629,7 +824,7 @@ def apply_vis_correction(data, correction):
     return out
 
 
-@numba.jit(nopython=True, nogil=True)
+@jit(nopython=True, nogil=True, cache=True)
 def apply_weights_correction(data, correction):
     """Clean up and apply `correction` to weight data in `data`."""
     out = np.empty_like(data)
@@ -645,7 +840,7 @@ def apply_weights_correction(data, correction):
     return out
 
 
-@numba.jit(nopython=True, nogil=True)
+@jit(nopython=True, nogil=True, cache=True)
 def apply_flags_correction(data, correction):
     """Set POSTPROC flag wherever `correction` is invalid."""
     out = np.copy(data)
@@ -655,3 +850,22 @@ def apply_flags_correction(data, correction):
                 if np.isnan(correction[i, j, k]):
                     out[i, j, k] |= POSTPROC
     return out
+
+
+@register_warm_up
+def _warm_up_kernels():
+    """Compile the correction kernels for the types used by katdal."""
+    g_per_input = np.ones((1, 1, 2), np.complex64)
+    g_per_cp = np.empty((1, 1, 3), np.complex64)
+    index = np.zeros(3, np.int64)
+    _correction_inputs_to_corrprods(g_per_cp, g_per_input, index, index)
+    correction = np.ones((1, 1, 1), np.complex64)
+    apply_vis_correction(np.ones((1, 1, 1), np.complex64), correction)
+    apply_weights_correction(np.ones((1, 1, 1), np.float32), correction)
+    apply_flags_correction(np.zeros((1, 1, 1), np.uint8), correction)
+    # In-place corrections of (possibly non-contiguous) regions of output arrays
+    vis = np.ones((2, 2, 1), np.complex64)
+    correction = np.ones((2, 2, 1), np.complex64)
+    apply_vis_correction(vis, correction, vis)
+    apply_vis_correction(vis[:, :1], correction[:, :1], vis[:, :1])
+    apply_vis_correction(vis[:, :1], np.ones((2, 1, 1), np.complex64), vis[:, :1])
@@ -20,8 +20,10 @@ from builtins import range
 import numpy as np
 import numba
 
+from .lazy_jit import register_warm_up
 
-@numba.jit(nopython=True, parallel=True)
+
+@numba.jit(nopython=True, parallel=True, cache=True)
 def _average_visibilities(vis, weight, flag, timeav, chanav, flagav):
     # Workaround for https://github.com/numba/numba/issues/2921
     flag_u8 = flag.view(np.uint8)
@@ -91,6 +93,19 @@ def _average_visibilities(vis, weight, flag, timeav, chanav, flagav):
     return av_vis, av_weight, av_flag
 
 
+@register_warm_up
+def _warm_up_kernels():
+    """Compile :func:`_average_visibilities` for the types used by katdal."""
+    vis = np.ones((2, 2, 1), np.complex64)
+    weight = np.ones((2, 2, 1), np.float32)
+    flag = np.zeros((2, 2, 1), np.bool_)
+    # Trimming the channel axis in :func:`average_visibilities` produces
+    # non-contiguous arrays, which numba compiles separately
+    for chans in (slice(None), slice(1)):
+        _average_visibilities(vis[:, chans], weight[:, chans], flag[:, chans],
+                              1, 1, False)
+
+
 def average_visibilities(vis, weight, flag, timestamps, channel_freqs, timeav=10, chanav=8, flagav=False):
     """Average visibilities, flags and weights.
 
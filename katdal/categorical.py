@@ -19,9 +19,11 @@ from __future__ import print_function, division, absolute_import
 from builtins import zip, range, object
 
 import collections
+import numbers
 
 import numpy as np
-from dask.base import tokenize
+
+from .lazy_jit import jit, register_warm_up
 
 
 class ComparableArrayWrapper(object):
@@ -181,6 +183,7 @@ def unique_in_order(elements, return_inverse=False):
         lookup = collections.OrderedDict(zip(elements, len(elements) * [0]))
     except TypeError:
         # Fall back to slower lookup using dask's tokenizer
+        from dask.base import tokenize
         lookup = {}
         for element in elements:
             token = tokenize(ComparableArrayWrapper.unwrap(element))
@@ -203,6 +206,33 @@ def unique_in_order(elements, return_inverse=False):
         if return_inverse else unique_elements
 
 
+def _compact_int(values, max_value=None):
+    """Store integer `values` as int32 if they fit (`max_value` is the largest)."""
+    values = np.asarray(values)
+    if values.dtype.kind not in 'iu':
+        return values
+    if max_value is None:
+        max_value = values.max() if values.size else 0
+    dtype = np.int32 if max_value <= np.iinfo(np.int32).max else np.int64
+    return values.astype(dtype, copy=False)
+
+
+def _nearest(sorted_values, values):
+    """Index of nearest element in `sorted_values` for each of `values`.
+
+    This is equivalent to ``np.abs(sorted_values[np.newaxis, :] -
+    values[:, np.newaxis]).argmin(axis=1)`` (including its preference for
+    the first of two equally near elements) but scales much better.
+    """
+    sorted_values, values = np.asarray(sorted_values), np.asarray(values)
+    if len(sorted_values) < 2:
+        return np.zeros(values.shape, dtype=np.intp)
+    right = sorted_values.searchsorted(values).clip(1, len(sorted_values) - 1)
+    left = right - 1
+    pick_left = np.abs(values - sorted_values[left]) <= np.abs(sorted_values[right] - values)
+    return np.where(pick_left, left, right)
+
+
 # -------------------------------------------------------------------------------------------------
 # -- CLASS :  CategoricalData
 # -------------------------------------------------------------------------------------------------
@@ -262,13 +292,53 @@ class CategoricalData(object):
     array assimilates objects such as tuples, lists and other arrays. The
     alternative is an array of :class:`ComparableArrayWrapper` objects but
     these then need to be unpacked at some later stage which is also tricky.
+    If the unique values are all numbers, strings or arrays of the same shape,
+    they are additionally stored in a NumPy array behind the scenes, which
+    allows dumps to be looked up in one go. The indices and events are stored
+    as 32-bit integers where possible to save memory.
 
     """
 
     def __init__(self, sensor_values, events):
-        values, self.indices = unique_in_order(sensor_values, return_inverse=True)
+        values, indices = unique_in_order(sensor_values, return_inverse=True)
         self.unique_values = [ComparableArrayWrapper.unwrap(v) for v in values]
-        self.events = np.asarray(events)
+        self.indices = _compact_int(indices, len(self.unique_values))
+        self.events = _compact_int(events)
+
+    @property
+    def unique_values(self):
+        """List of unique sensor values (see class docstring)."""
+        return self._unique_values
+
+    @unique_values.setter
+    def unique_values(self, values):
+        self._unique_values = values
+        self._value_array = None
+
+    def _array_of_values(self):
+        """Unique values as a single NumPy array, or None if not possible.
+
+        This is only done if the values are all numbers, strings or arrays of
+        the same type (and shape), so that indexing the array produces the
+        same result as assembling the selected values into an array one by
+        one. The array is cached until `unique_values` is replaced or resized.
+        """
+        values = self._unique_values
+        if self._value_array is not None and self._value_array[0] == len(values):
+            return self._value_array[1]
+        array = None
+        value_types = set(type(value) for value in values)
+        if len(value_types) == 1:
+            value_type = value_types.pop()
+            if issubclass(value_type, np.ndarray):
+                if len(set((value.shape, value.dtype) for value in values)) == 1:
+                    array = np.array(values)
+            elif issubclass(value_type, (numbers.Number, np.generic, str, bytes)):
+                array = np.array(values)
+        if array is not None and array.dtype.kind == 'O':
+            array = None
+        self._value_array = (len(values), array)
+        return array
 
     @property
     def _comparable_values(self):
@@ -318,16 +388,21 @@ class CategoricalData(object):
         """
         if isinstance(key, slice):
             # Convert slice notation to the corresponding sequence of dump indices
-            key = list(range(*key.indices(self.events[-1])))
-        # Convert sequence of bools (one per dump) to sequence of indices where key is True
-        elif np.asarray(key).dtype == np.bool and len(np.asarray(key)) == self.events[-1]:
-            key = np.nonzero(key)[0]
+            key = np.arange(*key.indices(self.events[-1]))
+        elif not isinstance(key, numbers.Integral):
+            key = np.asarray(key)
+            # Convert sequence of bools (one per dump) to sequence of indices where key is True
+            if key.dtype == bool and len(key) == self.events[-1]:
+                key = np.nonzero(key)[0]
         indices = self._lookup(key)
         # Interpret indices as either a sequence of ints or a single int
-        try:
-            values = [self.unique_values[index] for index in indices]
-        except TypeError:
+        if np.ndim(indices) == 0:
             return self.unique_values[indices]
+        # Look up all values in one go if they fit into an array
+        value_array = self._array_of_values()
+        if value_array is not None:
+            return value_array[indices]
+        values = [self.unique_values[index] for index in indices]
         # Handle empty selections specially to ensure proper dtype and shape
         if not values:
             all_possible_values = np.array(self.unique_values)
@@ -353,11 +428,8 @@ class CategoricalData(object):
 
     def _bool_per_dump(self, bool_per_value):
         """Turn list of bools per unique value into an array of bools per dump."""
-        bool_per_event = np.atleast_1d(np.array(bool_per_value)[self.indices])
-        bool_per_dump = np.empty(self.events[-1], dtype=np.bool)
-        for n, (start, end) in enumerate(zip(self.events[:-1], self.events[1:])):
-            bool_per_dump[start:end] = bool_per_event[n]
-        return bool_per_dump
+        bool_per_event = np.atleast_1d(np.array(bool_per_value, dtype=bool)[self.indices])
+        return np.repeat(bool_per_event, np.diff(self.events))
 
     def __eq__(self, other):
         """Equality comparison operator."""
@@ -399,8 +471,11 @@ class CategoricalData(object):
             Sensor value associated with segment
 
         """
-        for start, end, ind in zip(self.events[:-1], self.events[1:], self.indices):
-            yield slice(start, end), self.unique_values[ind]
+        # Convert to lists up front, as iterating over arrays is slow
+        events, indices = self.events.tolist(), self.indices.tolist()
+        values = self.unique_values
+        for start, end, ind in zip(events[:-1], events[1:], indices):
+            yield slice(start, end), values[ind]
 
     def add(self, event, value=None):
         """Add or override sensor event.
@@ -429,8 +504,9 @@ class CategoricalData(object):
         # If new event coincides with existing event, simply change value of that event, else insert new event
         event_index = self.events.searchsorted(event)
         before, after = event_index, (event_index + 1 if self.events[event_index] == event else event_index)
-        self.indices = np.r_[self.indices[:before], [value_index], self.indices[after:]]
-        self.events = np.r_[self.events[:before], [event], self.events[after:]]
+        self.indices = _compact_int(np.r_[self.indices[:before], [value_index], self.indices[after:]],
+                                    len(self.unique_values))
+        self.events = _compact_int(np.r_[self.events[:before], [event], self.events[after:]])
 
     def remove(self, value):
         """Remove sensor value, remapping indices and merging segments in process.
@@ -451,9 +527,11 @@ class CategoricalData(object):
             keep = (self.indices != index)
             remap = np.arange(len(self.unique_values))
             remap[index:] -= 1
-            self.indices = remap[self.indices[keep]]
-            self.events = np.r_[self.events[:-1][keep], self.events[-1]]
+            self.indices = _compact_int(remap[self.indices[keep]], len(self.unique_values))
+            self.events = np.r_[self.events[:-1][keep], self.events[-1]].astype(self.events.dtype)
             del self.unique_values[index]
+            # The list was modified in place, so invalidate value array explicitly
+            self._value_array = None
 
     def add_unmatched(self, segments, match_dist=1):
         """Add duplicate events for segment starts that don't match sensor events.
@@ -474,7 +552,8 @@ class CategoricalData(object):
         """
         # Identify unmatched segment starts
         segments = np.asarray(segments)
-        unmatched = segments[np.abs(self.events[np.newaxis, :] - segments[:, np.newaxis]).min(axis=1) > match_dist]
+        nearest_events = self.events[_nearest(self.events, segments)]
+        unmatched = segments[np.abs(nearest_events - segments) > match_dist]
         # Add these dumps as duplicate events, ignoring those that are out of bounds
         for segm in unmatched:
             try:
@@ -500,13 +579,14 @@ class CategoricalData(object):
 
         """
         # For each event, pick the segment with the closest start to it and then shift event onto segment start
-        segments_with_event = np.abs(self.events[np.newaxis, :] - segments[:, np.newaxis]).argmin(axis=0)
-        events = segments[segments_with_event]
+        segments = np.asarray(segments)
+        events = segments[_nearest(segments, self.events)]
         # When multiple sensor events are associated with the same segment, only keep the final one
         final = np.nonzero(np.diff(events) > 0)[0]
-        subset, self.indices = np.unique(self.indices[final], return_inverse=True)
+        subset, indices = np.unique(self.indices[final], return_inverse=True)
         self.unique_values = [self.unique_values[index] for index in subset]
-        self.events = np.r_[events[final], events[-1]]
+        self.indices = _compact_int(indices, len(subset))
+        self.events = _compact_int(np.r_[events[final], events[-1]])
 
     def partition(self, segments):
         """Partition dataset into multiple sets along time axis.
@@ -531,11 +611,15 @@ class CategoricalData(object):
         """
         # Ignore last element in event list, as it is not a real event but a placeholder for dataset length
         events = self.events[:-1]
+        segments = np.asarray(segments)
         # Find segment starts in event sequence, associating dumps before first event with it, ditto for ones past last
         initial_indices = self.indices[(events.searchsorted(segments[:-1], side='right') - 1).clip(0, len(events) - 1)]
+        # Range of events [first, last) that occur within each segment
+        first_events = events.searchsorted(segments[:-1]).tolist()
+        last_events = events.searchsorted(segments[1:]).tolist()
         split_data = []
-        for start, end, initial_index in zip(segments[:-1], segments[1:], initial_indices):
-            segment_events = (events >= start) & (events < end)
+        for n, (start, end) in enumerate(zip(segments[:-1].tolist(), segments[1:].tolist())):
+            segment_events = slice(first_events[n], last_events[n])
             # Bypass the normal CategoricalData initialiser to ensure that each cat_data has the same unique_values
             cat_data = CategoricalData([], [])
             cat_data.unique_values = self.unique_values
@@ -543,16 +627,16 @@ class CategoricalData(object):
             cat_data.events = events[segment_events] - start
             # Insert initial event if it is not there, and pad events with data segment length
             if len(cat_data.events) == 0 or cat_data.events[0] != 0:
-                cat_data.indices = np.r_[initial_index, cat_data.indices]
-                cat_data.events = np.r_[0, cat_data.events, end - start]
+                cat_data.indices = np.r_[initial_indices[n], cat_data.indices].astype(self.indices.dtype)
+                cat_data.events = _compact_int(np.r_[0, cat_data.events, end - start])
             else:
-                cat_data.events = np.r_[cat_data.events, end - start]
+                cat_data.events = _compact_int(np.r_[cat_data.events, end - start])
             split_data.append(cat_data)
         return split_data
 
     def remove_repeats(self):
         """Remove repeated events of the same value."""
-        changes = np.nonzero([1] + np.diff(self.indices).tolist())[0]
+        changes = np.r_[0, np.nonzero(np.diff(self.indices))[0] + 1]
         self.indices = self.indices[changes]
         self.events = np.r_[self.events[changes], self.events[-1]]
 
@@ -598,46 +682,50 @@ def concatenate_categorical(split_data, **kwargs):
         events.append(cat_data.events[:-1] + segments[n])
     # Add overall time length as the final event
     events.append([segments[-1]])
-    data.indices = np.concatenate(indices)
-    data.events = np.concatenate(events)
+    data.indices = _compact_int(np.concatenate(indices), len(data.unique_values))
+    data.events = _compact_int(np.concatenate(events))
     if not kwargs.get('allow_repeats', False):
         data.remove_repeats()
     return data
 
 
+@jit(nopython=True, nogil=True, cache=True)
 def _single_event_per_dump(events, greedy):
     """Ensure that each dump is associated with a single sensor event.
 
-    This generates a sequence of cleaned-up sensor events (represented by
+    This produces a sequence of cleaned-up sensor events (represented by
     indices into the original `events` sequence), which ensures that each dump
     is associated with a single event. When there are multiple events inside
     a dump, pick the final one. In addition, some sensor values designated as
     "greedy" will override non-greedy ones and grab a dump even if it is not
     the final value. In this scenario, move the final (non-greedy) event to the
     next dump by modifying its dump index in the `events` parameter. The
-    generator returns up to *N* events but not the special terminal event.
+    result contains up to *N* events but not the special terminal event.
 
     Parameters
     ----------
-    events : mutable sequence of non-negative ints, length *N* + 1
+    events : array of int, length *N* + 1
         Monotonic sequence of dump indices associated with each sensor event.
         The last event is one past the last dump (i.e. the total number of
         dumps). Be aware that this parameter is mutated by the function.
-    greedy : sequence of bool, length *N*
+    greedy : array of bool, length *N*
         Flags indicating whether the sensor value at a given event is "greedy"
 
-    Yields
-    ------
-    event_index : non-negative int
-        Index into `events` sequence of the next cleaned up event (does not
-        yield the one-past-last-dump terminal event)
+    Returns
+    -------
+    event_indices : array of int
+        Indices into `events` sequence of the cleaned up events (excluding
+        the one-past-last-dump terminal event)
 
     """
+    event_indices = np.empty(2 * len(events), dtype=np.int64)
+    num_cleaned = 0
     # The previous winning event is the dominant event in the previous dump
     previous_winning_event = 0
     previous_dump = 0
-    # This generates consecutive event indices with associated dump indices
-    for current_event, current_dump in enumerate(events):
+    # This visits consecutive event indices with associated dump indices
+    for current_event in range(len(events)):
+        current_dump = events[current_event]
         # At the start of a new dump, process the events of the previous dump
         if current_dump > previous_dump:
             # This previous event segment is assumed to straddle dump boundary
@@ -647,23 +735,49 @@ def _single_event_per_dump(events, greedy):
             if not greedy[previous_winning_event]:
                 previous_winning_event = event_at_dump_start
             winning_dump = events[previous_winning_event]
-            # Only yield winning event in immediate past to avoid duplicates
+            # Only pick winning event in immediate past to avoid duplicates
             if previous_dump <= winning_dump < current_dump:
-                yield previous_winning_event
+                event_indices[num_cleaned] = previous_winning_event
+                num_cleaned += 1
             # If winning event was greedy and final event was non-greedy,
-            # push final event to the start of next dump and yield if it is
+            # push final event to the start of next dump and pick it if it is
             # the only event in that dump (otherwise it has to fight it out...)
             if event_at_dump_start != previous_winning_event:
                 # NB: This modifies `events`! It simplifies bookkeeping.
                 events[event_at_dump_start] += 1
                 if current_dump > events[event_at_dump_start]:
-                    yield event_at_dump_start
+                    event_indices[num_cleaned] = event_at_dump_start
+                    num_cleaned += 1
                 previous_winning_event = event_at_dump_start
             previous_dump = current_dump
         # While within the same dump, pick the latest greedy event as winner
         # Also, avoid indexing greedy with final one-past-last event
         if (current_event < len(greedy)) and greedy[current_event]:
             previous_winning_event = current_event
+    return event_indices[:num_cleaned]
+
+
+@register_warm_up
+def _warm_up_kernels():
+    """Compile :func:`_single_event_per_dump` for the types used by katdal."""
+    _single_event_per_dump(np.array([0, 1]), np.array([False]))
+
+
+def _unique_inverse(values):
+    """Unique values of 1-D array in order of appearance, plus inverse indices.
+
+    This uses :func:`numpy.unique` for plain (non-object) arrays, and falls
+    back to :func:`unique_in_order` for objects and floats (to preserve its
+    treatment of NaNs, which are all considered to be unique).
+    """
+    if values.ndim == 1 and values.dtype.kind not in 'Of':
+        unique, first, inverse = np.unique(values, return_index=True, return_inverse=True)
+        # Reorder the sorted unique values in order of first appearance
+        order = np.argsort(first)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        return list(unique[order]), rank[inverse]
+    return unique_in_order(values, return_inverse=True)
 
 
 def sensor_to_categorical(sensor_timestamps, sensor_values, dump_midtimes,
@@ -736,14 +850,15 @@ def sensor_to_categorical(sensor_timestamps, sensor_values, dump_midtimes,
     within_dumps = slice(first_proper_event, one_past_last_event)
     sensor_values = sensor_values[within_dumps]
     events = events[within_dumps]
-    # Apply optional transform to sensor values
+    # Apply optional transform to sensor values (only once per unique value)
     if transform is not None:
         if wrapped_values:
             orig_transform = transform
             def transform(value):   # noqa: E306
                 """Unwrap wrapped value, transform and rewrap."""
                 return ComparableArrayWrapper(orig_transform(value.unwrapped))
-        sensor_values = np.array([transform(y) for y in sensor_values])
+        unique_values, inverse = _unique_inverse(sensor_values)
+        sensor_values = np.array([transform(y) for y in unique_values])[inverse]
     # Force first dump to have valid sensor value
     # (insert initial value or let the first proper value apply from the start)
     if events[0] != 0 and initial_value is not None:
@@ -754,18 +869,19 @@ def sensor_to_categorical(sensor_timestamps, sensor_values, dump_midtimes,
     events[0] = 0
     # Clean up dump->event mapping, taking into account greedy values
     greedy_values = () if greedy_values is None else greedy_values
-    greedy = [value in greedy_values for value in sensor_values]
+    unique_values, inverse = _unique_inverse(sensor_values)
+    greedy = np.array([value in greedy_values for value in unique_values], dtype=bool)[inverse]
     # Add one-past-last-dump terminator (will be removed again by `cleaned_up`)
-    events = np.r_[events, num_dumps]
+    events = np.r_[events, num_dumps].astype(np.int64)
     # NB: `events` is mutated by `_single_event_per_dump`
-    cleaned_up = list(_single_event_per_dump(events, greedy))
+    cleaned_up = _single_event_per_dump(events, greedy)
     sensor_values = sensor_values[cleaned_up]
     events = events[cleaned_up]
     # Discard sensor events that do not change the (transformed) sensor value
     # (i.e. that repeat the previous value)
-    if not allow_repeats:
-        changes_value = [n for n in range(len(sensor_values)) if n == 0 or
-                         sensor_values[n] != sensor_values[n - 1]]
+    if not allow_repeats and len(sensor_values) > 1:
+        changes_value = np.ones(len(sensor_values), dtype=bool)
+        changes_value[1:] = sensor_values[1:] != sensor_values[:-1]
         sensor_values = sensor_values[changes_value]
         events = events[changes_value]
     # Last event is fixed at one-past-last-dump to indicate end of last segment
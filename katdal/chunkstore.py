@@ -22,12 +22,14 @@ from future.utils import raise_from
 
 import contextlib
 import functools
+import itertools
 import uuid
 import io
 
 import numpy as np
 import dask
 import dask.array as da
+from dask.delayed import Delayed
 import dask.highlevelgraph
 
 
@@ -166,6 +168,176 @@ def npy_header_and_body(chunk):
     return header, chunk
 
 
+def read_npy_header(fp):
+    """Read the header of an array in `.npy` format from file object `fp`.
+
+    Returns
+    -------
+    shape : tuple of int
+        Shape of the array
+    fortran_order : bool
+        True if the array data is stored in Fortran (column-major) order
+    dtype : :class:`numpy.dtype` object
+        Data type of the array
+
+    Raises
+    ------
+    ValueError
+        If the header has an unsupported version or the dtype contains objects
+    """
+    version = np.lib.format.read_magic(fp)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fp)
+    elif version == (2, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fp)
+    else:
+        raise ValueError('Unsupported .npy version {}'.format(version))
+    if dtype.hasobject:
+        raise ValueError('Object arrays are not supported')
+    return shape, fortran_order, dtype
+
+
+def readinto_array(fp, out):
+    """Fill `out` in C order with consecutive bytes from file object `fp`.
+
+    The data is read straight into the memory of `out` via `readinto`. If
+    `out` is not contiguous (e.g. a view of part of a bigger output array),
+    it is filled piece by piece in contiguous sub-arrays.
+
+    Returns
+    -------
+    bytes_read : int
+        Number of bytes read, which is less than `out.nbytes` if `fp`
+        ran out of data
+    """
+    if not out.size:
+        return 0
+    # Iterate over leading axes until the remaining sub-arrays are contiguous
+    outer = 0
+    while not out[(0,) * outer].flags.c_contiguous:
+        outer += 1
+    bytes_read = 0
+    for index in np.ndindex(*out.shape[:outer]):
+        piece = memoryview(out[index].reshape(-1).view(np.uint8))
+        while len(piece):
+            n = fp.readinto(piece)
+            if not n:
+                return bytes_read
+            bytes_read += n
+            piece = piece[n:]
+    return bytes_read
+
+
+def _get_chunk_into(store, array_name, slices, dtype, sub, out, default_value, transforms):
+    """Load part `sub` of a chunk into `out`, followed by in-place `transforms`."""
+    try:
+        if all(s.stop - s.start == c.stop - c.start for s, c in zip(sub, slices)):
+            store.get_chunk_into(array_name, slices, dtype, out)
+        else:
+            out[()] = store.get_chunk(array_name, slices, dtype)[sub]
+    except ChunkNotFound:
+        out[()] = default_value
+    for transform, block in transforms:
+        transform(out, block[sub])
+
+
+class DirectReader(object):
+    """Load slices of a chunk store array straight into output arrays.
+
+    Loading a chunk store array via :meth:`ChunkStore.get_dask_array` first
+    decodes each chunk into a temporary array, which is then copied into the
+    final output. This object instead decodes the chunks directly into the
+    matching regions of the output array (by :meth:`ChunkStore.get_chunk_into`)
+    and then applies any transforms to those regions in place.
+
+    Parameters
+    ----------
+    store : :class:`ChunkStore` object
+        Chunk store
+    array_name : string
+        Identifier of array in chunk store
+    chunks : tuple of tuples of ints
+        Chunk specification
+    dtype : :class:`numpy.dtype` object or equivalent
+        Data type of array
+    default_value : number, optional
+        Value used in place of missing chunks
+    transforms : sequence of (function, :class:`dask.array.Array`) pairs, optional
+        In-place transforms with signature ``transform(out, block)``, applied
+        to the output after loading. Each `block` comes from the associated
+        dask array, which must have the same chunks as the chunk store array.
+    """
+
+    def __init__(self, store, array_name, chunks, dtype, default_value=0, transforms=()):
+        self.store = store
+        self.array_name = array_name
+        self.chunks = tuple(tuple(c) for c in chunks)
+        self.dtype = np.dtype(dtype)
+        self.default_value = default_value
+        self.transforms = list(transforms)
+
+    @property
+    def shape(self):
+        """Shape of the full array."""
+        return tuple(sum(c) for c in self.chunks)
+
+    def with_transform(self, transform, array):
+        """Return a new reader that also applies `transform` in place.
+
+        Raises
+        ------
+        ValueError
+            If `array` does not have the same chunks as this reader
+        """
+        if array.chunks != self.chunks:
+            raise ValueError('Array {!r} has chunks {} instead of {}'
+                             .format(array.name, array.chunks, self.chunks))
+        return DirectReader(self.store, self.array_name, self.chunks, self.dtype,
+                            self.default_value, self.transforms + [(transform, array)])
+
+    def store_into(self, index, out):
+        """Load a slice of the array into `out`.
+
+        Parameters
+        ----------
+        index : tuple of unit-stride slice objects
+            Region of array to load (one slice per dimension, with explicit
+            start and stop that lie inside the array)
+        out : :class:`numpy.ndarray` object
+            Output array, with the shape of the region and `dtype` of reader
+
+        Returns
+        -------
+        load : :class:`dask.delayed.Delayed` object
+            Delayed object that fills `out` when computed
+        """
+        name = 'direct-{}-{}'.format(self.array_name, uuid.uuid4().hex)
+        boundaries = [np.cumsum((0,) + c) for c in self.chunks]
+        # Range of chunk indices per dimension that overlap the selection
+        ranges = [range(np.searchsorted(b, s.start, side='right') - 1,
+                        np.searchsorted(b, s.stop, side='left'))
+                  if s.stop > s.start else range(0)
+                  for b, s in zip(boundaries, index)]
+        graph = {}
+        for block_index in itertools.product(*ranges):
+            slices, sub, dst = [], [], []
+            for b, s, i in zip(boundaries, index, block_index):
+                start, stop = max(s.start, b[i]), min(s.stop, b[i + 1])
+                slices.append(slice(int(b[i]), int(b[i + 1])))
+                sub.append(slice(start - b[i], stop - b[i]))
+                dst.append(slice(start - s.start, stop - s.start))
+            transforms = [[transform, (array.name,) + block_index]
+                          for transform, array in self.transforms]
+            graph[(name,) + block_index] = (
+                _get_chunk_into, self.store, self.array_name, tuple(slices),
+                self.dtype, tuple(sub), out[tuple(dst)], self.default_value, transforms)
+        # The final task just waits for all the chunks to be loaded
+        graph[name] = (len, list(k for k in graph))
+        dask_graph = dask.highlevelgraph.HighLevelGraph.from_collections(
+            name, graph, [array for transform, array in self.transforms])
+        return Delayed(name, dask_graph)
+
+
 class ChunkStore(object):
     r"""Base class for accessing a store of chunks (i.e. N-dimensional arrays).
 
@@ -237,6 +409,37 @@ class ChunkStore(object):
         """
         raise NotImplementedError
 
+    def get_chunk_into(self, array_name, slices, dtype, out):
+        """Get chunk from the store and write it into an existing array.
+
+        Stores that can decode chunks straight into the memory of `out`
+        override this to avoid the intermediate copy made by the default
+        implementation, which calls :meth:`get_chunk`.
+
+        Parameters
+        ----------
+        array_name : string
+            Identifier of parent array `x` of chunk
+        slices : sequence of unit-stride slice objects
+            Identifier of individual chunk, to be extracted as `x[slices]`
+        dtype : :class:`numpy.dtype` object or equivalent
+            Data type of array `x`
+        out : :class:`numpy.ndarray` object
+            Destination array with shape dictated by `slices` (it may be a
+            non-contiguous view of a bigger array)
+
+        Raises
+        ------
+        :exc:`chunkstore.BadChunk`
+            If requested `dtype` does not match underlying parent array dtype,
+            `slices` has wrong specification or stored buffer has wrong size
+        :exc:`chunkstore.StoreUnavailable`
+            If interaction with chunk store failed (offline, bad auth, bad config)
+        :exc:`chunkstore.ChunkNotFound`
+            If requested chunk was not found in store
+        """
+        out[()] = self.get_chunk(array_name, slices, dtype)
+
     def get_chunk_or_default(self, array_name, slices, dtype, default_value=0):
         """Get chunk from the store but return default value if it is missing."""
         try:
@@ -25,7 +25,7 @@ import contextlib
 import numpy as np
 
 from .chunkstore import (ChunkStore, StoreUnavailable, ChunkNotFound, BadChunk,
-                         npy_header_and_body)
+                         npy_header_and_body, read_npy_header, readinto_array)
 
 
 def _write_chunk(filename, chunk, direct_write):
@@ -104,6 +104,21 @@ class NpyFileChunkStore(ChunkStore):
                                    dtype, shape))
         return chunk
 
+    def get_chunk_into(self, array_name, slices, dtype, out):
+        """See the docstring of :meth:`ChunkStore.get_chunk_into`."""
+        chunk_name, shape = self.chunk_metadata(array_name, slices, dtype=dtype)
+        filename = os.path.join(self.path, chunk_name) + '.npy'
+        with self._standard_errors(chunk_name):
+            with open(filename, 'rb') as fp:
+                file_shape, fortran_order, file_dtype = read_npy_header(fp)
+                if (file_shape == shape == out.shape and file_dtype == dtype
+                        and not fortran_order):
+                    if readinto_array(fp, out) != out.nbytes:
+                        raise ValueError('NPY file is truncated')
+                    return
+        # Let get_chunk handle (or complain about) any unusual chunks
+        out[()] = self.get_chunk(array_name, slices, dtype)
+
     def create_array(self, array_name):
         """See the docstring of :meth:`ChunkStore.create_array`."""
         # Ensure any subdirectories are in place
@@ -138,6 +153,7 @@ class NpyFileChunkStore(ChunkStore):
         return os.path.isfile(touch_file)
 
     get_chunk.__doc__ = ChunkStore.get_chunk.__doc__
+    get_chunk_into.__doc__ = ChunkStore.get_chunk_into.__doc__
     put_chunk.__doc__ = ChunkStore.put_chunk.__doc__
     mark_complete.__doc__ = ChunkStore.mark_complete.__doc__
     is_complete.__doc__ = ChunkStore.is_complete.__doc__
@@ -24,6 +24,7 @@ import future.utils
 from future.utils import bytes_to_native_str, raise_from
 
 import contextlib
+import functools
 import threading
 import urllib.parse
 import urllib.request
@@ -47,7 +48,7 @@ from urllib3.response import HTTPResponse
 from urllib3.exceptions import MaxRetryError
 
 from .chunkstore import (ChunkStore, StoreUnavailable, ChunkNotFound, BadChunk,
-                         npy_header_and_body)
+                         npy_header_and_body, read_npy_header, readinto_array)
 from .sensordata import to_str
 
 
@@ -117,7 +118,7 @@ class _DetectTruncation(object):
         return data
 
 
-def read_array(fp):
+def read_array(fp, out=None):
     """Read a numpy array in npy format from a file descriptor.
 
     This is the same concept as :func:`numpy.lib.format.read_array`, but
@@ -126,29 +127,31 @@ def read_array(fp):
     array, while this implementation uses `readinto`. Raise :class:`TruncatedRead`
     if the response runs out of data before the array is complete.
 
+    If `out` is given and it matches the shape and dtype of the stored array
+    (which should also be in C order), the data is read straight into `out`,
+    which is returned. Otherwise a new array is returned.
+
     It does not allow pickled dtypes.
     """
     # Wrap file object in _DetectTruncation since data can run out while
     # within the bowels of NumPy (the alternative is monkey-patching NumPy...)
     fp = _DetectTruncation(fp)
-    version = np.lib.format.read_magic(fp)
-    if version == (1, 0):
-        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fp)
-    elif version == (2, 0):
-        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fp)
+    shape, fortran_order, dtype = read_npy_header(fp)
+    if (out is not None and out.shape == shape and out.dtype == dtype
+            and not fortran_order):
+        data = out
     else:
-        raise ValueError('Unsupported .npy version {}'.format(version))
-    if dtype.hasobject:
-        raise ValueError('Object arrays are not supported')
-    count = int(np.product(shape))
-    data = np.ndarray(count, dtype=dtype)
+        count = int(np.product(shape))
+        data = np.ndarray(count, dtype=dtype)
     # For HTTPResponse it works to just pass in `data` directly, but the
     # wrapping is added for the benefit of any other implementation that
     # isn't expecting a numpy array
-    bytes_read = fp.readinto(memoryview(data.view(np.uint8)))
+    bytes_read = readinto_array(fp, data)
     if bytes_read != data.nbytes:
         raise TruncatedRead('Error reading from S3 HTTP response: expected {} '
                             'bytes, got {}'.format(data.nbytes, bytes_read))
+    if data is out:
+        return out
     if fortran_order:
         data.shape = shape[::-1]
         data = data.transpose()
@@ -157,7 +160,7 @@ def read_array(fp):
     return data
 
 
-def _read_chunk(response):
+def _read_chunk(response, out=None):
     """Efficiently read NumPy array in NPY format from content of HTTP response."""
     data = response.raw
     # Workaround for https://github.com/urllib3/urllib3/issues/1540
@@ -167,9 +170,9 @@ def _read_chunk(response):
     if ('Content-encoding' not in response.headers
             and hasattr(data, '_fp')
             and hasattr(data._fp, 'readinto')):
-        chunk = read_array(data._fp)
+        chunk = read_array(data._fp, out)
     else:
-        chunk = read_array(data)
+        chunk = read_array(data, out)
     # This shouldn't actually read any data, but will make requests aware that
     # we've consumed all the data and hence it can reuse the connection.
     response.content
@@ -611,6 +614,27 @@ class S3ChunkStore(ChunkStore):
                                    dtype, shape))
         return chunk
 
+    def get_chunk_into(self, array_name, slices, dtype, out):
+        """See the docstring of :meth:`ChunkStore.get_chunk_into`."""
+        dtype = np.dtype(dtype)
+        chunk_name, shape = self.chunk_metadata(array_name, slices, dtype=dtype)
+        url = self._chunk_url(chunk_name)
+        headers = {'Accept-Encoding': 'identity'}
+        # Only use `out` if it has the expected shape and dtype,
+        # otherwise the chunk is rejected below
+        target = out if out.shape == shape and out.dtype == dtype else None
+        process = functools.partial(_read_chunk, out=target)
+        chunk = self.complete_request('GET', url, chunk_name, process,
+                                      headers=headers, stream=True)
+        if chunk is out:
+            return
+        if chunk.shape != shape or chunk.dtype != dtype:
+            raise BadChunk('Chunk {!r}: dtype {} and/or shape {} in store '
+                           'differs from expected dtype {} and shape {}'
+                           .format(chunk_name, chunk.dtype, chunk.shape,
+                                   dtype, shape))
+        out[()] = chunk
+
     def create_array(self, array_name):
         """See the docstring of :meth:`ChunkStore.create_array`."""
         # Array name is formatted as bucket/array but we only need to create bucket
@@ -675,6 +699,7 @@ class S3ChunkStore(ChunkStore):
         return True
 
     get_chunk.__doc__ = ChunkStore.get_chunk.__doc__
+    get_chunk_into.__doc__ = ChunkStore.get_chunk_into.__doc__
     put_chunk.__doc__ = ChunkStore.put_chunk.__doc__
     mark_complete.__doc__ = ChunkStore.mark_complete.__doc__
     is_complete.__doc__ = ChunkStore.is_complete.__doc__
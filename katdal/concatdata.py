@@ -24,7 +24,7 @@ from functools import reduce
 
 import numpy as np
 
-from .lazy_indexer import LazyIndexer
+from .lazy_indexer import LazyIndexer, DaskLazyIndexer
 from .sensordata import SensorGetter, SensorData, SensorCache, dummy_sensor_getter
 from .categorical import (CategoricalData, unique_in_order,
                           concatenate_categorical)
@@ -49,7 +49,7 @@ class ConcatenatedLazyIndexer(LazyIndexer):
 
     Parameters
     ----------
-    indexers : sequence of :class:`LazyIndexer` objects and/or arrays
+    indexers : sequence of :class:`LazyIndexer` or :class:`DaskLazyIndexer` objects and/or arrays
         Sequence of indexers or raw arrays to be concatenated
     transforms : list of :class:`LazyTransform` objects or None, optional
         Extra chain of transforms to be applied to data after final indexing
@@ -73,7 +73,8 @@ class ConcatenatedLazyIndexer(LazyIndexer):
             self.indexers = indexers[:1]
         # Wrap any raw array in the sequence in a LazyIndexer (slower but more compatible)
         for n, indexer in enumerate(self.indexers):
-            self.indexers[n] = indexer if isinstance(indexer, LazyIndexer) else LazyIndexer(indexer)
+            if not isinstance(indexer, (LazyIndexer, DaskLazyIndexer)):
+                self.indexers[n] = LazyIndexer(indexer)
         self.transforms = [] if transforms is None else transforms
         # Pick the first non-empty indexer name as overall name, or failing that, an empty string
         names = unique_in_order([indexer.name for indexer in self.indexers if indexer.name])
@@ -258,7 +259,14 @@ class ConcatenatedSensorGetter(SensorGetter):
         self._data = data
 
     def get(self):
-        parts = [sd.get() for sd in self._data]
+        return self._concatenate([sd.get() for sd in self._data])
+
+    def get_range(self, start_time, end_time, categorical=None):
+        return self._concatenate([sd.get_range(start_time, end_time, categorical)
+                                  for sd in self._data])
+
+    def _concatenate(self, parts):
+        """Concatenate sensor data of underlying data sets."""
         # Filter out empty sensors, because they may have a default dtype that
         # will skew the dtype of the concatenation
         parts = [part for part in parts if part]
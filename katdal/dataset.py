@@ -19,6 +19,7 @@ from __future__ import print_function, division, absolute_import
 from builtins import zip, object
 from past.builtins import basestring
 
+import os
 import time
 import logging
 import numbers
@@ -28,6 +29,8 @@ import numpy as np
 import katpoint
 from katpoint import is_iterable, rad2deg
 
+from .timeconv import to_ephem_date, to_mjd, local_sidereal_time
+
 
 logger = logging.getLogger(__name__)
 
@@ -120,6 +123,16 @@ def _robust_target(description):
         return katpoint.Target('Nothing, special')
 
 
+def _file_disk_cache(directory, filename):
+    """Persistent sensor cache for a data file, or None if no `directory`."""
+    if not directory:
+        return None
+    from .sensordata import DiskSensorCache
+    stat = os.stat(filename)
+    identity = '%s size=%d mtime=%r' % (os.path.abspath(filename), stat.st_size, stat.st_mtime)
+    return DiskSensorCache(directory, identity)
+
+
 def _selection_to_list(names, **groups):
     """Normalise string of comma-separated names or sequence of names / objects.
 
@@ -164,15 +177,14 @@ DEFAULT_SENSOR_PROPS = {
 
 def _calc_mjd(cache, name):
     """Calculate Modified Julian Day (MJD) timestamps using sensor cache contents."""
-    cache[name] = mjd = np.array([katpoint.Timestamp(t).to_mjd()
-                                  for t in cache.timestamps[:]])
+    cache[name] = mjd = to_mjd(cache.timestamps[:])
     return mjd
 
 
 def _calc_lst(cache, name, ant):
     """Calculate local sidereal time (LST) timestamps using sensor cache contents."""
     antenna = cache.get('Antennas/%s/antenna' % (ant,))[0]
-    cache[name] = lst = antenna.local_sidereal_time(cache.timestamps[:])
+    cache[name] = lst = local_sidereal_time(cache.timestamps[:], antenna)
     return lst
 
 
@@ -182,8 +194,15 @@ def _calc_radec(cache, name, ant):
     antenna = cache.get(ant_group + 'antenna')[0]
     az = cache.get(ant_group + 'az')
     el = cache.get(ant_group + 'el')
-    ra, dec = np.array([katpoint.construct_azel_target(a, e).radec(t, antenna)
-                        for t, a, e in zip(cache.timestamps[:], az, el)]).T
+    # This is what katpoint does for an (az, el) target, minus the overhead
+    # of creating a target and converting the timestamp for every sample
+    observer = antenna.observer
+    radec = np.empty((len(az), 2))
+    dates = to_ephem_date(cache.timestamps[:]).tolist()
+    for n, (date, a, e) in enumerate(zip(dates, az.tolist(), el.tolist())):
+        observer.date = date
+        radec[n] = observer.radec_of(a, e)
+    ra, dec = radec.T.copy()
     cache[ant_group + 'ra'] = ra
     cache[ant_group + 'dec'] = dec
     return ra if name.endswith('ra') else dec
@@ -193,10 +212,13 @@ def _calc_parangle(cache, name, ant):
     """Calculate parallactic angle using sensor cache contents."""
     ant_group = 'Antennas/%s/' % (ant,)
     antenna = cache.get(ant_group + 'antenna')[0]
-    az = cache.get(ant_group + 'az')
-    el = cache.get(ant_group + 'el')
-    parangle = np.array([katpoint.construct_azel_target(a, e).parallactic_angle(t, antenna)
-                         for t, a, e in zip(cache.timestamps[:], az, el)])
+    # The apparent (ra, dec) of an (az, el) target in katpoint is the
+    # astrometric one, so reuse the pointing coordinates
+    ra = cache.get(ant_group + 'ra')
+    dec = cache.get(ant_group + 'dec')
+    ha = cache.get(ant_group + 'lst') - ra
+    parangle = np.arctan2(np.sin(ha), np.tan(antenna.observer.lat) * np.cos(dec) -
+                          np.sin(dec) * np.cos(ha))
     cache[name] = parangle
     return parangle
 
@@ -247,12 +269,18 @@ def _calc_uvw_basis(cache, name, ant):
 
 
 def _calc_uvw_per_ant(cache, name, ant):
-    """Calculate (u,v,w) coordinates per antenna using sensor cache contents."""
+    """Calculate (u,v,w) coordinates per antenna using sensor cache contents.
+
+    Only the requested coordinate of the requested antenna is calculated, as
+    it is a projection of the antenna's baseline onto the shared array basis.
+    Callers such as :meth:`DataSet.u` look up each selected antenna once.
+    """
     array_antenna = cache.get('Antennas/array/antenna')[0]
     antenna = cache.get('Antennas/%s/antenna' % (ant,))[0]
     basis = cache.get('Antennas/array/basis_' + name[-1])
     # Obtain baseline vector from array reference to specified antenna
     baseline_m = array_antenna.baseline_toward(antenna)
+    # A matrix-vector product per antenna matches katpoint's uvw exactly
     coord = basis.dot(baseline_m)
     cache[name] = coord
     return coord
@@ -1047,15 +1075,20 @@ class DataSet(object):
 
         The sensor is specialised to return the difference between the sensors
         of the two antennas making up the correlation product, since that is
-        what (u, v, w) sensors need.
+        what (u, v, w) sensors need. Each antenna's sensor is only looked up
+        once and the differences are formed for all corrprods together.
         """
-        def difference(antA, antB):
-            coord1 = self.sensor['Antennas/%s/%s' % (antA, base_name)]
-            coord2 = self.sensor['Antennas/%s/%s' % (antB, base_name)]
-            return coord1 - coord2
-        return np.column_stack([difference(inpA[:-1], inpB[:-1])
-                                for inpA, inpB in self.corr_products]) \
-            if len(self.corr_products) else np.zeros((self.shape[0], 0))
+        if not len(self.corr_products):
+            return np.zeros((self.shape[0], 0))
+        # Map each input of each corrprod to the index of its antenna
+        inputs, index = np.unique(np.asarray(self.corr_products), return_inverse=True)
+        ants, ant_index = np.unique([inp[:-1] for inp in inputs], return_inverse=True)
+        index = ant_index[index].reshape(-1, 2)
+        coords = np.column_stack([self.sensor['Antennas/%s/%s' % (ant, base_name)]
+                                  for ant in ants])
+        delta = coords[:, index[:, 0]]
+        delta -= coords[:, index[:, 1]]
+        return delta
 
     @property
     def az(self):
@@ -33,12 +33,11 @@ import dask.array as da
 from dask.array.rechunk import intersect_chunks
 from dask.highlevelgraph import HighLevelGraph
 import toolz
-import numba
 
-from .sensordata import TelstateSensorGetter, TelstateToStr
-from .chunkstore_s3 import S3ChunkStore
+from .lazy_jit import jit, register_warm_up
+from .sensordata import TelstateSensorGetter, TelstateToStr, to_str
 from .chunkstore_npy import NpyFileChunkStore
-from .chunkstore import ChunkStoreError
+from .chunkstore import ChunkStoreError, DirectReader
 from .flags import DATA_LOST
 
 
@@ -81,9 +80,12 @@ class VisFlagsWeights(object):
         Visibility weights as a function of time, frequency and baseline
     name : string, optional
         Identifier that describes the origin of the data (backend-specific)
+    direct_vis : :class:`~katdal.chunkstore.DirectReader` object, optional
+        Reader that loads slices of `vis` straight into output arrays,
+        bypassing the dask graph (it has to produce the same values)
 
     """
-    def __init__(self, vis, flags, weights, name='custom'):
+    def __init__(self, vis, flags, weights, name='custom', direct_vis=None):
         if not (vis.shape == flags.shape == weights.shape):
             raise ValueError("Shapes of vis %s, flags %s and weights %s differ"
                              % (vis.shape, flags.shape, weights.shape))
@@ -91,6 +93,7 @@ class VisFlagsWeights(object):
         self.flags = flags
         self.weights = weights
         self.name = name
+        self.direct_vis = direct_vis
 
     @property
     def shape(self):
@@ -177,7 +180,7 @@ def corrprod_to_autocorr(corrprods):
     return _narrow(np.array(auto_indices)), _narrow(np.array(index1)), _narrow(np.array(index2))
 
 
-@numba.jit(nopython=True, nogil=True)
+@jit(nopython=True, nogil=True, cache=True)
 def weight_power_scale(vis, weights, auto_indices, index1, index2, out=None):
     """Compute scaled weights from visibility data.
 
@@ -215,6 +218,18 @@ def weight_power_scale(vis, weights, auto_indices, index1, index2, out=None):
     return out
 
 
+@register_warm_up
+def _warm_up_kernels():
+    """Compile :func:`weight_power_scale` for the types used by katdal."""
+    vis = np.ones((1, 1, 3), np.complex64)
+    weights = np.ones((1, 1, 3), np.float32)
+    index = np.zeros(3, np.uint8)
+    # The auto-correlation indices need 16 bits beyond 255 correlation products
+    for auto_dtype in (np.uint8, np.uint16):
+        auto_indices = np.zeros(1, auto_dtype)
+        weight_power_scale(vis, weights, auto_indices, index, index)
+
+
 class ChunkStoreVisFlagsWeights(VisFlagsWeights):
     """Correlator data stored in a chunk store.
 
@@ -310,6 +325,11 @@ class ChunkStoreVisFlagsWeights(VisFlagsWeights):
                                           dtype=array.dtype)
 
         vis = darray['correlator_data']
+        # The visibilities are only filled with zeros for missing chunks,
+        # so they can also be decoded straight into the output arrays
+        vis_info = chunk_info['correlator_data']
+        direct_vis = DirectReader(store, store.join(vis_info['prefix'], 'correlator_data'),
+                                  vis.chunks, vis.dtype)
         # Combine low-resolution weights and high-resolution weights_channel
         weights = darray['weights'] * darray['weights_channel'][..., np.newaxis]
         # Scale weights according to power
@@ -318,6 +338,7 @@ class ChunkStoreVisFlagsWeights(VisFlagsWeights):
             # Ensure that we have only a single chunk on the baseline axis.
             if len(vis.chunks[2]) > 1:
                 vis = vis.rechunk({2: vis.shape[2]})
+                direct_vis = None
             if len(weights.chunks[2]) > 1:
                 weights = weights.rechunk({2: weights.shape[2]})
             auto_indices, index1, index2 = corrprod_to_autocorr(corrprods)
@@ -325,7 +346,7 @@ class ChunkStoreVisFlagsWeights(VisFlagsWeights):
                                    dtype=np.float32,
                                    auto_indices=auto_indices, index1=index1, index2=index2)
 
-        VisFlagsWeights.__init__(self, vis, flags, weights, self.vis_prefix)
+        VisFlagsWeights.__init__(self, vis, flags, weights, self.vis_prefix, direct_vis)
 
 
 class DataSource(object):
@@ -483,6 +504,49 @@ def _shorten_key(telstate, key):
     return ''
 
 
+def _redis_client(telstate):
+    """Underlying Redis client of `telstate`, or None if it has no such thing."""
+    # Newer katsdptelstate hides the client inside a backend object
+    backend = getattr(telstate, 'backend', None)
+    client = getattr(backend, 'client', None)
+    if client is None:
+        client = getattr(telstate, '_r', None)
+    return client if hasattr(client, 'pipeline') else None
+
+
+def _sensor_keys(telstate):
+    """Find all telstate keys that refer to sensors as opposed to attributes.
+
+    This classifies all keys in one pass. If `telstate` is backed by a Redis
+    server, the key types are requested in a single pipelined round trip
+    instead of checking the keys one by one, which is very slow for a remote
+    server with thousands of keys.
+
+    Parameters
+    ----------
+    telstate : :class:`katsdptelstate.TelescopeState` object
+        Telescope state
+
+    Returns
+    -------
+    sensor_keys : list of string
+        Fully qualified keys of all sensors (i.e. non-immutable keys)
+
+    """
+    keys = telstate.keys()
+    client = _redis_client(telstate)
+    if client is None:
+        return [key for key in keys if not telstate.is_immutable(key)]
+    pipe = client.pipeline(transaction=False)
+    for key in keys:
+        pipe.type(key)
+    # Immutable keys (attributes) are strings, while a type of 'none'
+    # indicates that the key disappeared while we were looking
+    key_types = [to_str(key_type) for key_type in pipe.execute()]
+    return [key for key, key_type in zip(keys, key_types)
+            if key_type not in ('string', 'none')]
+
+
 def _ensure_prefix_is_set(chunk_info, telstate):
     """Augment `chunk_info` with chunk name prefix if not set."""
     for info in chunk_info.values():
@@ -555,6 +619,8 @@ def infer_chunk_store(url_parts, telstate, npy_store_path=None,
     # Use overrides if provided, regardless of URL and telstate (NPY first)
     if npy_store_path:
         return NpyFileChunkStore(npy_store_path)
+    # Only import the S3 machinery (requests, jwt, etc) once it is needed
+    from .chunkstore_s3 import S3ChunkStore
     if s3_endpoint_url:
         return S3ChunkStore(s3_endpoint_url, **kwargs)
     # NPY chunk store is an option if the dataset is an RDB file
@@ -630,11 +696,12 @@ class TelstateDataSource(DataSource):
         self.telstate = TelstateToStr(telstate)
         # Collect sensors
         sensors = {}
-        for key in telstate.keys():
-            if not telstate.is_immutable(key):
-                sensor_name = _shorten_key(telstate, key)
-                if sensor_name:
-                    sensors[sensor_name] = TelstateSensorGetter(telstate, key)
+        for key in _sensor_keys(telstate):
+            sensor_name = _shorten_key(telstate, key)
+            if sensor_name:
+                # The keys have already been vetted so skip the checks
+                sensors[sensor_name] = TelstateSensorGetter(telstate, key,
+                                                            check=False)
         metadata = AttrsSensors(telstate, sensors, name=source_name)
         if chunk_store is not None or timestamps is None:
             chunk_info = telstate['chunk_info']
@@ -706,6 +773,7 @@ class TelstateDataSource(DataSource):
             # Strip off parameters, query strings and fragments to get basic URL
             rdb_url = urllib.parse.urlunparse(
                 (url_parts.scheme, url_parts.netloc, url_parts.path, '', '', ''))
+            from .chunkstore_s3 import S3ChunkStore
             telstate = katsdptelstate.TelescopeState()
             try:
                 rdb_store = S3ChunkStore(store_url, **kwargs)
@@ -26,11 +26,11 @@ import katpoint
 
 from .dataset import (DataSet, WrongVersion, BrokenFile, Subarray,
                       DEFAULT_SENSOR_PROPS, DEFAULT_VIRTUAL_SENSORS,
-                      _robust_target, _selection_to_list)
+                      _file_disk_cache, _robust_target, _selection_to_list)
 from .spectral_window import SpectralWindow
 from .sensordata import RecordSensorGetter, SensorCache, to_str
 from .categorical import CategoricalData, sensor_to_categorical
-from .lazy_indexer import LazyIndexer, LazyTransform
+from .lazy_indexer import LazyIndexer, LazyTransform, DaskLazyIndexer, hdf5_to_dask
 from .flags import NAMES as FLAG_NAMES, DESCRIPTIONS as FLAG_DESCRIPTIONS
 
 logger = logging.getLogger(__name__)
@@ -159,6 +159,14 @@ class H5DataV2(DataSet):
         real timestamps at the cost of slightly inaccurate label borders
     keepdims : {False, True}, optional
         Force vis / weights / flags to be 3-dimensional, regardless of selection
+    sensor_cache_dir : string or None, optional
+        Store extracted and virtual sensors in this directory and reuse them
+        when the file is opened again (see :class:`~katdal.sensordata.DiskSensorCache`)
+    sensor_lazy_interpolation : {False, True}, optional
+        Only interpolate numerical sensors onto the selected timestamps when
+        they are requested, to save memory (see :class:`~katdal.sensordata.SensorCache`)
+    sensor_float32 : {False, True}, optional
+        Store numerical sensor values as float32 to save memory
     kwargs : dict, optional
         Extra keyword arguments, typically meant for other formats and ignored
 
@@ -170,7 +178,8 @@ class H5DataV2(DataSet):
     """
 
     def __init__(self, filename, ref_ant='', time_offset=0.0, mode='r',
-                 quicklook=False, keepdims=False, **kwargs):
+                 quicklook=False, keepdims=False, sensor_cache_dir=None,
+                 sensor_lazy_interpolation=False, sensor_float32=False, **kwargs):
         DataSet.__init__(self, filename, ref_ant, time_offset)
 
         # Load file
@@ -269,7 +278,9 @@ class H5DataV2(DataSet):
         sensors_group.visititems(register_sensor)
         # Use estimated data timestamps for now, to speed up data segmentation
         self.sensor = SensorCache(cache, data_timestamps, self.dump_period, keep=self._time_keep,
-                                  props=SENSOR_PROPS, virtual=VIRTUAL_SENSORS, aliases=SENSOR_ALIASES)
+                                  props=SENSOR_PROPS, virtual=VIRTUAL_SENSORS, aliases=SENSOR_ALIASES,
+                                  disk_cache=_file_disk_cache(sensor_cache_dir, filename),
+                                  lazy_interpolation=sensor_lazy_interpolation, float32=sensor_float32)
 
         # ------ Extract subarrays ------
 
@@ -533,25 +544,27 @@ class H5DataV2(DataSet):
         extract_time = LazyTransform('extract_time', lambda t, keep: t + 0.5 * dump_period + time_offset)
         return LazyIndexer(self._timestamps, keep=self._time_keep, transforms=[extract_time])
 
-    def _vislike_indexer(self, dataset, extractor):
+    def _vislike_indexer(self, dataset, transforms=()):
         """Lazy indexer for vis-like datasets (vis / weights / flags).
 
         This operates on datasets with shape (*T*, *F*, *B*) and potentially
-        different dtypes. The data type conversions are all left to the provided
-        extractor transform, while this method takes care of the common
-        selection issues, such as preserving singleton dimensions and dealing
-        with duplicate final dumps.
+        different dtypes. The dataset is wrapped in a dask array with chunks
+        aligned to its HDF5 chunks, so that it supports joint loading via
+        :meth:`DaskLazyIndexer.get` and parallel reads. The data type
+        conversions are all left to the provided transforms, while this
+        method takes care of the common selection issues, such as preserving
+        singleton dimensions and dealing with duplicate final dumps.
 
         Parameters
         ----------
-        dataset : :class:`h5py.Dataset` object or equivalent
+        dataset : :class:`h5py.Dataset` object
             Underlying vis-like dataset on which lazy indexing will be done
-        extractor : function, signature ``data = f(data, keep)``
-            Transform to apply to data (`keep` is user-provided 2nd-stage index)
+        transforms : sequence of function, signature ``array = f(array)``, optional
+            Transforms to apply to the dask array after first-stage selection
 
         Returns
         -------
-        indexer : :class:`LazyIndexer` object
+        indexer : :class:`DaskLazyIndexer` object
             Lazy indexer with appropriate selectors and transforms included
 
         """
@@ -562,18 +575,9 @@ class H5DataV2(DataSet):
             time_keep = np.zeros(len(dataset), dtype=np.bool)
             time_keep[:len(self._time_keep)] = self._time_keep
         stage1 = (time_keep, self._freq_keep, self._corrprod_keep)
-
-        def _force_3dim(data, keep):
-            """Keep singleton dimensions in stage 2 (i.e. final) indexing."""
-            # Ensure that keep tuple has length of 3 (truncate or pad with blanket slices as necessary)
-            keep = keep[:3] + (slice(None),) * (3 - len(keep))
-            # Final indexing ensures that returned data are always 3-dimensional (i.e. keep singleton dimensions)
-            keep_singles = [(np.newaxis if np.isscalar(dim_keep) else slice(None))
-                            for dim_keep in keep]
-            return data[tuple(keep_singles)]
-        force_3dim = LazyTransform('force_3dim', _force_3dim)
-        transforms = [extractor, force_3dim] if self._keepdims else [extractor]
-        return LazyIndexer(dataset, stage1, transforms)
+        indexer = DaskLazyIndexer(hdf5_to_dask(dataset), stage1, transforms, keepdims=self._keepdims)
+        indexer.name = dataset.name
+        return indexer
 
     @property
     def vis(self):
@@ -594,12 +598,11 @@ class H5DataV2(DataSet):
         electric field of :math:`e^{i(\omega t - jz)}` i.e. phase that
         increases with time.
         """
-        extract = LazyTransform('extract_vis',
-                                # Discard the 4th / last dimension as this is subsumed in complex view
-                                # The visibilities are conjugated due to using the lower sideband
-                                lambda vis, keep: vis.view(np.complex64)[..., 0].conjugate(),
-                                lambda shape: shape[:-1], np.complex64)
-        return self._vislike_indexer(self._vis, extract)
+        def extract_vis(vis):
+            # Discard the 4th / last dimension as this is subsumed in complex view
+            # The visibilities are conjugated due to using the lower sideband
+            return vis.view(np.complex64)[..., 0].conj()
+        return self._vislike_indexer(self._vis, [extract_vis])
 
     @property
     def weights(self):
@@ -616,12 +619,14 @@ class H5DataV2(DataSet):
         indexing on it. Only then will data be loaded into memory.
 
         """
+        import dask.array as da
+        weights_select = bool(self._weights_select)
+
         # We currently only cater for a single weight type (i.e. either select it or fall back to 1.0)
-        def transform(weights, keep):
-            return weights.astype(np.float32) if self._weights_select else \
-                np.ones_like(weights, dtype=np.float32)
-        extract = LazyTransform('extract_weights', transform, dtype=np.float32)
-        return self._vislike_indexer(self._weights, extract)
+        def extract_weights(weights):
+            return weights.astype(np.float32) if weights_select else \
+                da.ones_like(weights, dtype=np.float32)
+        return self._vislike_indexer(self._weights, [extract_weights])
 
     @property
     def flags(self):
@@ -638,12 +643,14 @@ class H5DataV2(DataSet):
         indexing on it. Only then will data be loaded into memory.
 
         """
-        def transform(flags, keep):
+        # Copy so that the transform isn't affected by future changes
+        flags_select = self._flags_select.copy()
+
+        def extract_flags(flags):
             """Use flagmask to blank out the flags we don't want."""
             # Then convert uint8 to bool -> if any flag bits set, flag is set
-            return np.bool_(np.bitwise_and(self._flags_select, flags))
-        extract = LazyTransform('extract_flags', transform, dtype=np.bool)
-        return self._vislike_indexer(self._flags, extract)
+            return np.bitwise_and(flags_select, flags).astype(np.bool_)
+        return self._vislike_indexer(self._flags, [extract_flags])
 
     @property
     def temperature(self):
@@ -30,12 +30,12 @@ import katsdptelstate
 
 from .dataset import (DataSet, WrongVersion, BrokenFile, Subarray,
                       DEFAULT_SENSOR_PROPS, DEFAULT_VIRTUAL_SENSORS,
-                      _robust_target, _selection_to_list)
+                      _file_disk_cache, _robust_target, _selection_to_list)
 from .spectral_window import SpectralWindow
-from .sensordata import (SensorCache, RecordSensorGetter,
+from .sensordata import (SensorCache, SensorGetter, RecordSensorGetter,
                          H5TelstateSensorGetter, telstate_decode, to_str)
 from .categorical import CategoricalData
-from .lazy_indexer import LazyIndexer, LazyTransform
+from .lazy_indexer import DaskLazyIndexer, hdf5_to_dask
 from .flags import NAMES as FLAG_NAMES, DESCRIPTIONS as FLAG_DESCRIPTIONS
 
 logger = logging.getLogger(__name__)
@@ -113,6 +113,82 @@ def dummy_dataset(name, shape, dtype, value):
                                      dtype=dtype, fillvalue=value, compression='gzip')
 
 
+def _is_sensor(obj):
+    """A sensor is defined as a non-empty dataset with expected dtype."""
+    return isinstance(obj, h5py.Dataset) and obj.shape != () and \
+        obj.dtype.names == ('timestamp', 'value', 'status')
+
+
+def _is_telstate_sensor(obj):
+    """A telstate sensor is a non-empty dataset with expected dtype."""
+    # Before 2016-05-09 the dtype was ('value', 'timestamp')
+    return isinstance(obj, h5py.Dataset) and obj.shape != () and \
+        set(obj.dtype.names or ()) == {'timestamp', 'value'}
+
+
+def _leaf_links(group):
+    """Relative paths of all links below `group` that are not groups themselves.
+
+    This only walks the link tables of the groups and does not open any of
+    the datasets. Empty groups are indistinguishable from leaves here.
+    """
+    paths = []
+    group.id.links.visit(paths.append)
+    paths = [to_str(path) for path in paths]
+    parents = {path.rsplit('/', 1)[0] for path in paths if '/' in path}
+    return sorted(path for path in paths if path not in parents)
+
+
+class LazyH5SensorGetter(SensorGetter):
+    """Sensor dataset in HDF5 file that is only opened when first accessed.
+
+    This defers the opening of the dataset, the check whether it actually
+    contains sensor data and the creation of the underlying getter until the
+    sensor data is retrieved.
+
+    Parameters
+    ----------
+    group : :class:`h5py.Group` object
+        HDF5 group containing the sensor dataset
+    path : string
+        Path of dataset relative to `group`
+    name : string
+        Sensor name
+    getter_class : :class:`RecordSensorGetter` class or subclass
+        Type of the underlying sensor getter
+    is_sensor : function
+        Check that HDF5 object contains sensor data suitable for `getter_class`
+    """
+
+    def __init__(self, group, path, name, getter_class=RecordSensorGetter, is_sensor=_is_sensor):
+        super(LazyH5SensorGetter, self).__init__(name)
+        self._group = group
+        self._path = path
+        self._getter_class = getter_class
+        self._is_sensor = is_sensor
+        self._getter = None
+
+    @property
+    def getter(self):
+        """Underlying sensor getter, created on first access.
+
+        Raises
+        ------
+        KeyError
+            If the HDF5 object turns out not to be a sensor dataset
+        """
+        if self._getter is None:
+            obj = self._group.get(self._path)
+            if not self._is_sensor(obj):
+                raise KeyError("HDF5 object '%s/%s' is not a sensor dataset" %
+                               (self._group.name, self._path))
+            self._getter = self._getter_class(obj, self.name)
+        return self._getter
+
+    def get(self):
+        return self.getter.get()
+
+
 class _AttributeFound(Exception):
     """This indicates that an attribute has been found and contains its value."""
 
@@ -149,6 +225,19 @@ class H5DataV3(DataSet):
         Override receiver band if provided (e.g. 'l') - used to find ND models
     keepdims : {False, True}, optional
         Force vis / weights / flags to be 3-dimensional, regardless of selection
+    lazy_sensors : {False, True}, optional
+        Register sensors based on the HDF5 group listings only and only open
+        the sensor datasets when they are first accessed. This speeds up the
+        opening of files with many sensors on slow (network) filesystems, at
+        the expense of listing some non-sensor datasets in :attr:`sensor`.
+    sensor_cache_dir : string or None, optional
+        Store extracted and virtual sensors in this directory and reuse them
+        when the file is opened again (see :class:`~katdal.sensordata.DiskSensorCache`)
+    sensor_lazy_interpolation : {False, True}, optional
+        Only interpolate numerical sensors onto the selected timestamps when
+        they are requested, to save memory (see :class:`~katdal.sensordata.SensorCache`)
+    sensor_float32 : {False, True}, optional
+        Store numerical sensor values as float32 to save memory
     kwargs : dict, optional
         Extra keyword arguments, typically meant for other formats and ignored
 
@@ -171,7 +260,9 @@ class H5DataV3(DataSet):
 
     def __init__(self, filename, ref_ant='', time_offset=0.0, mode='r',
                  time_scale=None, time_origin=None, rotate_bls=False,
-                 centre_freq=None, band=None, keepdims=False, **kwargs):
+                 centre_freq=None, band=None, keepdims=False, lazy_sensors=False,
+                 sensor_cache_dir=None, sensor_lazy_interpolation=False,
+                 sensor_float32=False, **kwargs):
         DataSet.__init__(self, filename, ref_ant, time_offset)
 
         # Load file
@@ -182,8 +273,8 @@ class H5DataV3(DataSet):
         data_group, tm_group = f['Data'], f['TelescopeModel']
         self.stream_name = to_str(data_group.attrs.get('stream_name', 'sdp_l0'))
         # Pick first group with appropriate class as CBF
-        cbfs = [comp for comp in tm_group
-                if to_str(tm_group[comp].attrs.get('class')) == 'CorrelatorBeamformer']
+        comp_types = {comp: to_str(tm_group[comp].attrs.get('class')) for comp in tm_group}
+        cbfs = [comp for comp in tm_group if comp_types[comp] == 'CorrelatorBeamformer']
         cbf_group = tm_group[cbfs[0]]
         # Get SDP group, if present
         sdp_group = tm_group.get('sdp')
@@ -193,29 +284,41 @@ class H5DataV3(DataSet):
         # Populate sensor cache with all HDF5 datasets below TelescopeModel group that fit the description of a sensor
         cache = {}
 
-        def register_sensor(name, obj):
-            """A sensor is defined as a non-empty dataset with expected dtype."""
-            if isinstance(obj, h5py.Dataset) and obj.shape != () and \
-               obj.dtype.names == ('timestamp', 'value', 'status'):
-                comp_name, sensor_name = to_str(name).split('/', 1)
-                comp_type = to_str(tm_group[comp_name].attrs.get('class'))
-                # Mapping from specific components to generic sensor groups
-                # Put antenna sensors in virtual Antenna group, the rest according to component type
-                group_lookup = {'AntennaPositioner': 'Antennas/' + comp_name}
-                group_name = group_lookup.get(comp_type, comp_type) if comp_type else comp_name
-                name = '/'.join((group_name, sensor_name))
-                cache[name] = RecordSensorGetter(obj, name)
-        tm_group.visititems(register_sensor)
-        # Also load sensors from TelescopeState for what it's worth
-        if 'TelescopeState' in f.file:
-            def register_telstate_sensor(name, obj):
-                """A sensor is defined as a non-empty dataset with expected dtype."""
-                # Before 2016-05-09 the dtype was ('value', 'timestamp')
-                if isinstance(obj, h5py.Dataset) and obj.shape != () and \
-                   set(obj.dtype.names) == {'timestamp', 'value'}:
-                    name = 'TelescopeState/' + to_str(name)
-                    cache[name] = H5TelstateSensorGetter(obj, name)
-            f.file['TelescopeState'].visititems(register_telstate_sensor)
+        def generic_sensor_name(path):
+            """Turn path relative to TelescopeModel group into generic sensor name."""
+            comp_name, name = path.split('/', 1)
+            comp_type = comp_types.get(comp_name)
+            # Mapping from specific components to generic sensor groups
+            # Put antenna sensors in virtual Antenna group, the rest according to component type
+            group_lookup = {'AntennaPositioner': 'Antennas/' + comp_name}
+            group_name = group_lookup.get(comp_type, comp_type) if comp_type else comp_name
+            return '/'.join((group_name, name))
+
+        telstate_group = f.file['TelescopeState'] if 'TelescopeState' in f.file else None
+        if lazy_sensors:
+            for path in _leaf_links(tm_group):
+                if '/' in path:
+                    name = generic_sensor_name(path)
+                    cache[name] = LazyH5SensorGetter(tm_group, path, name)
+            # Also load sensors from TelescopeState for what it's worth
+            if telstate_group is not None:
+                for path in _leaf_links(telstate_group):
+                    name = 'TelescopeState/' + path
+                    cache[name] = LazyH5SensorGetter(telstate_group, path, name,
+                                                     H5TelstateSensorGetter, _is_telstate_sensor)
+        else:
+            def register_sensor(path, obj):
+                if _is_sensor(obj):
+                    name = generic_sensor_name(to_str(path))
+                    cache[name] = RecordSensorGetter(obj, name)
+            tm_group.visititems(register_sensor)
+            # Also load sensors from TelescopeState for what it's worth
+            if telstate_group is not None:
+                def register_telstate_sensor(path, obj):
+                    if _is_telstate_sensor(obj):
+                        name = 'TelescopeState/' + to_str(path)
+                        cache[name] = H5TelstateSensorGetter(obj, name)
+                telstate_group.visititems(register_telstate_sensor)
 
         # ------ Extract vis and timestamps ------
 
@@ -261,7 +364,11 @@ class H5DataV3(DataSet):
         # Pick first regular sensor with longer data record than data (hopefully straddling it)
         for sensor_name, sensor_data in cache.items():
             if sensor_name.endswith(regular_sensors) and sensor_data:
-                sensor_times = sensor_data.get().timestamp
+                try:
+                    sensor_times = sensor_data.get().timestamp
+                except KeyError:
+                    # Lazily registered sensor turned out to be something else
+                    continue
                 proposed_sensor_start_time = sensor_times[0]
                 sensor_duration = sensor_times[-1] - proposed_sensor_start_time
                 if sensor_duration > data_duration:
@@ -324,7 +431,9 @@ class H5DataV3(DataSet):
         self.end_time = katpoint.Timestamp(self._timestamps[-1] + 0.5 * self.dump_period)
         # Populate sensor cache with all HDF5 datasets below TelescopeModel group that fit the description of a sensor
         self.sensor = SensorCache(cache, self._timestamps, self.dump_period, keep=self._time_keep,
-                                  props=SENSOR_PROPS, virtual=VIRTUAL_SENSORS, aliases=SENSOR_ALIASES)
+                                  props=SENSOR_PROPS, virtual=VIRTUAL_SENSORS, aliases=SENSOR_ALIASES,
+                                  disk_cache=_file_disk_cache(sensor_cache_dir, filename),
+                                  lazy_interpolation=sensor_lazy_interpolation, float32=sensor_float32)
 
         # ------ Extract flags ------
 
@@ -944,30 +1053,32 @@ class H5DataV3(DataSet):
         """
         return self._timestamps[self._time_keep]
 
-    def _vislike_indexer(self, dataset, extractor=None, dims=3):
+    def _vislike_indexer(self, dataset, transforms=(), dims=3):
         """Lazy indexer for vis-like datasets (vis / weights / flags).
 
         This operates on datasets with shape (*T*, *F*, *B*) and potentially
-        different dtypes. The data type conversions are all left to the provided
-        optional extractor transform, while this method takes care of the common
-        selection issues, such as preserving singleton dimensions and dealing
-        with duplicate final dumps. By reducing the *dims* parameter, this
-        method also works for datasets with shape (*T*, *F*) or even (*T*,).
+        different dtypes. The dataset is wrapped in a dask array with chunks
+        aligned to its HDF5 chunks, so that it supports joint loading via
+        :meth:`DaskLazyIndexer.get` and parallel reads. The data type
+        conversions are all left to the provided optional transforms, while
+        this method takes care of the common selection issues, such as
+        preserving singleton dimensions and dealing with duplicate final
+        dumps. By reducing the *dims* parameter, this method also works for
+        datasets with shape (*T*, *F*) or even (*T*,).
 
         Parameters
         ----------
-        dataset : :class:`h5py.Dataset` object or equivalent
+        dataset : :class:`h5py.Dataset` object
             Underlying vis-like dataset on which lazy indexing will be done
-        extractor : None or function, signature ``data = f(data, keep)``, optional
-            Transform to apply to data (`keep` is user-provided 2nd-stage index)
-            (None means no transform is applied)
+        transforms : sequence of function, signature ``array = f(array)``, optional
+            Transforms to apply to the dask array after first-stage selection
         dims : integer, optional
             Number of dimensions in dataset (default has all three standard
             dimensions, while smaller values get rid of trailing dimensions)
 
         Returns
         -------
-        indexer : :class:`LazyIndexer` object
+        indexer : :class:`DaskLazyIndexer` object
             Lazy indexer with appropriate selectors and transforms included
 
         """
@@ -978,22 +1089,9 @@ class H5DataV3(DataSet):
             time_keep = np.zeros(len(dataset), dtype=np.bool)
             time_keep[:len(self._time_keep)] = self._time_keep
         stage1 = (time_keep, self._freq_keep, self._corrprod_keep)[:dims]
-
-        def _force_full_dim(data, keep):
-            """Keep singleton dimensions in stage 2 (i.e. final) indexing."""
-            # Ensure that keep tuple has length of dims (truncate or pad with blanket slices as necessary)
-            keep = keep[:dims] + (slice(None),) * (dims - len(keep))
-            # Final indexing ensures that returned data are always dims-dimensional (i.e. keep singleton dimensions)
-            keep_singles = [(np.newaxis if np.isscalar(dim_keep) else slice(None))
-                            for dim_keep in keep]
-            return data[tuple(keep_singles)]
-        force_full_dim = LazyTransform('force_full_dim', _force_full_dim)
-        transforms = []
-        if extractor:
-            transforms.append(extractor)
-        if self._keepdims:
-            transforms.append(force_full_dim)
-        return LazyIndexer(dataset, stage1, transforms)
+        indexer = DaskLazyIndexer(hdf5_to_dask(dataset), stage1, transforms, keepdims=self._keepdims)
+        indexer.name = dataset.name
+        return indexer
 
     @property
     def vis(self):
@@ -1016,17 +1114,14 @@ class H5DataV3(DataSet):
         """
         if self.spectral_windows[self.spw].sideband == 1:
             # Discard the 4th / last dimension as this is subsumed in complex view
-            def convert(vis, keep):
+            def extract_vis(vis):
                 return vis.view(np.complex64)[..., 0]
         else:
             # Lower side-band has the conjugate visibilities, and this isn't
             # corrected in the correlator.
-            def convert(vis, keep):
-                return vis.view(np.complex64)[..., 0].conjugate()
-        extract = LazyTransform('extract_vis',
-                                convert,
-                                lambda shape: shape[:-1], np.complex64)
-        return self._vislike_indexer(self._vis, extract)
+            def extract_vis(vis):
+                return vis.view(np.complex64)[..., 0].conj()
+        return self._vislike_indexer(self._vis, [extract_vis])
 
     @property
     def weights(self):
@@ -1043,22 +1138,19 @@ class H5DataV3(DataSet):
         indexing on it. Only then will data be loaded into memory.
 
         """
+        import dask.array as da
         # Build a lazy indexer for high-resolution weights (one per channel)
         weights_channel = self._vislike_indexer(self._weights_channel, dims=2)
-        # Don't keep singleton dimensions in order to match lo-res weight shape
-        # after second-stage indexing (but before any final keepdims transform)
-        weights_channel.transforms = []
+        weights_select = bool(self._weights_select)
 
         # We currently only cater for a single weight type (i.e. either select it or fall back to 1.0)
-        def transform(lo_res_weights, keep):
-            hi_res_weights = weights_channel[keep]
+        def extract_weights(lo_res_weights):
+            if not weights_select:
+                return da.ones_like(lo_res_weights, dtype=np.float32)
             # Add corrprods dimension to hi-res weights to enable broadcasting
-            if lo_res_weights.ndim > hi_res_weights.ndim:
-                hi_res_weights = hi_res_weights[..., np.newaxis]
-            return lo_res_weights * hi_res_weights if self._weights_select else \
-                np.ones_like(lo_res_weights, dtype=np.float32)
-        extract = LazyTransform('extract_weights', transform, dtype=np.float32)
-        indexer = self._vislike_indexer(self._weights, extract)
+            hi_res_weights = weights_channel.dataset[..., np.newaxis]
+            return (lo_res_weights * hi_res_weights).astype(np.float32)
+        indexer = self._vislike_indexer(self._weights, [extract_weights])
         if weights_channel.name.find('dummy') < 0:
             indexer.name += ' * ' + weights_channel.name
         return indexer
@@ -1078,12 +1170,14 @@ class H5DataV3(DataSet):
         indexing on it. Only then will data be loaded into memory.
 
         """
-        def transform(flags, keep):
+        # Copy so that the transform isn't affected by future changes
+        flags_select = self._flags_select.copy()
+
+        def extract_flags(flags):
             """Use flagmask to blank out the flags we don't want."""
             # Then convert uint8 to bool -> if any flag bits set, flag is set
-            return np.bool_(np.bitwise_and(self._flags_select, flags))
-        extract = LazyTransform('extract_flags', transform, dtype=np.bool)
-        return self._vislike_indexer(self._flags, extract)
+            return np.bitwise_and(flags_select, flags).astype(np.bool_)
+        return self._vislike_indexer(self._flags, [extract_flags])
 
     @property
     def temperature(self):
@@ -0,0 +1,250 @@
+################################################################################
+# Copyright (c) 2020, National Research Foundation (Square Kilometre Array)
+#
+# Licensed under the BSD 3-Clause License (the "License"); you may not use
+# this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#   https://opensource.org/licenses/BSD-3-Clause
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+"""Client for katstore (CAM's central sensor database) speaking the katstore64 API."""
+from __future__ import print_function, division, absolute_import
+from future import standard_library
+standard_library.install_aliases()  # noqa: E402
+from future.utils import raise_from, isidentifier
+from builtins import object
+
+import collections
+import json
+import logging
+import threading
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+import requests
+
+from .sensordata import RecordSensorGetter
+
+logger = logging.getLogger(__name__)
+
+
+class KatstoreClient(object):
+    """Fetch raw sensor data from katstore (CAM's central sensor database).
+
+    The katstore64 query API takes one sensor per request, so several sensors
+    are fetched with concurrent requests that share a pool of persistent
+    connections. Large responses are retrieved in pages of at most
+    `page_size` records, and the results are cached by (sensor, time range).
+
+    Parameters
+    ----------
+    store : string
+        Hostname / endpoint of katstore webserver speaking katstore64 API
+    workers : int, optional
+        Maximum number of concurrent requests (and persistent connections)
+    page_size : int, optional
+        Maximum number of records requested in a single query
+    cache_size : int, optional
+        Maximum number of (sensor, time range) results kept in the cache
+    timeout : float or None, optional
+        Timeout for connecting to and reading from the server, in seconds
+
+    Attributes
+    ----------
+    url : string
+        URL of the katstore64 query endpoint
+    """
+
+    def __init__(self, store, workers=16, page_size=100000, cache_size=1024, timeout=300.0):
+        self.store = store
+        self.url = "http://%s/katstore/api/query" % (store,)
+        self.workers = workers
+        self.page_size = page_size
+        self.cache_size = cache_size
+        self.timeout = timeout
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self._session.mount('http://', adapter)
+        # Maps (name, start_time, end_time) to a sensor getter, or None if there is no data
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        """Short human-friendly string representation of client object."""
+        return "<katdal.%s '%s' cached=%d at 0x%x>" % (
+            self.__class__.__name__, self.store, len(self._cache), id(self))
+
+    def close(self):
+        """Close the persistent connections and clear the cache."""
+        self._session.close()
+        with self._lock:
+            self._cache.clear()
+
+    def get(self, name, start_time, end_time):
+        """Get raw sensor data of a single sensor.
+
+        Parameters
+        ----------
+        name : string
+            Sensor name (the normalised / escaped version with underscores)
+        start_time, end_time : float
+            Time range for sensor records as UTC seconds since Unix epoch
+
+        Returns
+        -------
+        data : :class:`RecordSensorGetter` object
+            Retrieved sensor data with 'timestamp', 'value' and 'status' fields
+
+        Raises
+        ------
+        ConnectionError
+            If this cannot connect to the katstore server
+        RuntimeError
+            If connection succeeded but interaction with katstore64 API failed
+        KeyError
+            If the sensor was not found in the store or it has no data in time range
+        """
+        # The sensor name won't be in sensor store if it contains invalid characters
+        if not isidentifier(name):
+            raise KeyError("Sensor name '%s' is not valid Python identifier" % (name,))
+        key = (name, start_time, end_time)
+        with self._lock:
+            cached = key in self._cache
+            if cached:
+                sensor_data = self._cache.pop(key)
+                self._cache[key] = sensor_data
+        if not cached:
+            sensor_data = self._query(name, start_time, end_time)
+            with self._lock:
+                self._cache[key] = sensor_data
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        if sensor_data is None:
+            raise KeyError("Sensor store has no data for sensor '%s'" % (name,))
+        return sensor_data
+
+    def get_many(self, names, start_time, end_time):
+        """Get raw sensor data of several sensors concurrently.
+
+        Parameters
+        ----------
+        names : sequence of string
+            Sensor names (the normalised / escaped versions with underscores)
+        start_time, end_time : float
+            Time range for sensor records as UTC seconds since Unix epoch
+
+        Returns
+        -------
+        data : dict mapping string to :class:`RecordSensorGetter` object
+            Retrieved sensor data per sensor name, leaving out the sensors
+            that were not found in the store or have no data in time range
+
+        Raises
+        ------
+        ConnectionError
+            If this cannot connect to the katstore server
+        RuntimeError
+            If connection succeeded but interaction with katstore64 API failed
+        """
+        names = list(collections.OrderedDict.fromkeys(names))
+
+        def fetch(name):
+            try:
+                return name, self.get(name, start_time, end_time)
+            except KeyError:
+                return name, None
+
+        if len(names) > 1 and self.workers > 1:
+            pool = ThreadPool(min(self.workers, len(names)))
+            try:
+                results = pool.map(fetch, names)
+            finally:
+                pool.close()
+        else:
+            results = [fetch(name) for name in names]
+        return dict((name, sensor_data) for name, sensor_data in results
+                    if sensor_data is not None)
+
+    def _query_page(self, name, start_time, end_time, limit):
+        """Retrieve a single page of records from the katstore64 API."""
+        params = {'sensor': name, 'start_time': start_time, 'end_time': end_time,
+                  'limit': limit, 'include_value_time': 'True'}
+        try:
+            response = self._session.get(self.url, params=params,
+                                         stream=True, timeout=self.timeout)
+        except requests.exceptions.ConnectionError as exc:
+            err = ConnectionError("Could not connect to sensor store '%s'" % (self.store,))
+            raise_from(err, exc)
+        with response:
+            try:
+                response.raise_for_status()
+                # Parse the JSON straight off the socket instead of via response.text
+                response.raw.decode_content = True
+                return json.load(response.raw)['data']
+            except (ValueError, IndexError, TypeError, KeyError,
+                    requests.exceptions.RequestException) as exc:
+                err = RuntimeError("Could not retrieve samples from '%s' (%d: %s)" %
+                                   (self.url, response.status_code, response.reason))
+                raise_from(err, exc)
+
+    def _query(self, name, start_time, end_time):
+        """Retrieve all records of sensor in time range, page by page."""
+        timestamp, value, status = [], [], []
+        limit = self.page_size
+        # Number of records at the start of the next page that were already seen
+        skip = 0
+        while True:
+            records = self._query_page(name, start_time, end_time, limit)
+            try:
+                for rec in records[skip:]:
+                    if rec['sensor'] == name:
+                        timestamp.append(rec['value_time'])
+                        value.append(rec['value'])
+                        status.append(rec['status'])
+                if len(records) < limit:
+                    break
+                # The next page starts at the sample time of the last record,
+                # which may be shared by records that are already in this page
+                last_time = records[-1]['sample_time']
+                repeats = 1
+                while repeats < len(records) and records[-repeats - 1]['sample_time'] == last_time:
+                    repeats += 1
+            except (IndexError, TypeError, KeyError) as exc:
+                err = RuntimeError("Could not retrieve samples from '%s' (unexpected records)"
+                                   % (self.url,))
+                raise_from(err, exc)
+            if last_time == start_time:
+                # The page is full of records at a single time, so enlarge it and try again
+                limit *= 2
+                skip = len(records)
+            else:
+                start_time = last_time
+                skip = repeats
+            logger.debug("Fetching next page of sensor '%s' from '%s' starting at %r",
+                         name, self.store, start_time)
+        if not timestamp:
+            return None
+        samples = np.rec.fromarrays([np.array(timestamp, dtype=np.float64),
+                                     np.array(value), np.array(status)],
+                                    names='timestamp,value,status')
+        return RecordSensorGetter(samples, name)
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def katstore_client(store):
+    """Shared :class:`KatstoreClient` for `store`, which reuses its connections and cache."""
+    with _clients_lock:
+        client = _clients.get(store)
+        if client is None:
+            client = _clients[store] = KatstoreClient(store)
+        return client
@@ -18,17 +18,16 @@
 from __future__ import print_function, division, absolute_import
 from builtins import zip, range, object
 
+import atexit
 import copy
+import multiprocessing
 import threading
+import time
+from multiprocessing.pool import ThreadPool
 from numbers import Integral
 from functools import reduce, partial
 
 import numpy as np
-import dask.array as da
-import dask.highlevelgraph
-import dask.optimization
-
-# TODO support advanced integer indexing with non-strictly increasing indices (i.e. out-of-order and duplicates)
 
 
 def _range_to_slice(index):
@@ -74,6 +73,7 @@ def _simplify_index(indices, shape):
 
     .. _NEP 21: http://www.numpy.org/neps/nep-0021-advanced-indexing.html
     """
+    import dask.array as da
     # First clean up and check indices, unpacking ellipsis and boolean arrays
     indices = da.slicing.normalize_index(indices, shape)
     out = []
@@ -94,11 +94,121 @@ def _simplify_index(indices, shape):
     return tuple(out)
 
 
+def _unit_stride_slices(indices, shape):
+    """Turn index expression into unit-stride slices, one per dimension.
+
+    Returns a tuple of slices with explicit start and stop, or None if
+    `indices` cannot be expressed this way (or is invalid, in which case
+    the error is left for the normal indexing machinery to report).
+    """
+    try:
+        indices = _simplify_index(indices, shape)
+    except (IndexError, TypeError, ValueError):
+        return None
+    if len(indices) != len(shape):
+        return None
+    slices = []
+    for index, length in zip(indices, shape):
+        if not isinstance(index, slice):
+            return None
+        start, stop, step = index.indices(length)
+        if step != 1:
+            return None
+        slices.append(slice(start, max(start, stop)))
+    return tuple(slices)
+
+
+def _gather_index(index):
+    """Split integer index into sorted unique indices and a reordering.
+
+    Out-of-order and duplicate indices are handled by a gather step that
+    fetches each distinct index once in increasing order (touching each chunk
+    of the underlying data only once), followed by a scatter step that
+    rearranges the results into the requested order via `inverse`, such
+    that ``index == unique[inverse]``. If `index` is already strictly
+    increasing, `inverse` is None.
+    """
+    if len(index) < 2 or np.all(np.diff(index) > 0):
+        return index, None
+    return np.unique(index, return_inverse=True)
+
+
+def _dask_gather(indices):
+    """Replace unsorted / duplicate fancy indices by sorted unique ones.
+
+    Returns the new indices and a list of (output axis, inverse) pairs
+    describing how to scatter the output into the requested order.
+    """
+    out, reorder = [], []
+    axis = 0
+    for index in indices:
+        if isinstance(index, np.ndarray) and index.ndim == 1 and index.dtype.kind in 'iu':
+            index, inverse = _gather_index(index)
+            if inverse is not None:
+                reorder.append((axis, inverse))
+                try:
+                    index = _range_to_slice(index)
+                except ValueError:
+                    pass
+        out.append(index)
+        if not isinstance(index, Integral):
+            axis += 1
+    return tuple(out), reorder
+
+
+def _scatter_block(pieces, axis, size, *blocks):
+    """Assemble one output block of :func:`_dask_scatter` from input `blocks`."""
+    shape = list(blocks[0].shape)
+    shape[axis] = size
+    out = np.empty(shape, blocks[0].dtype)
+    for block, (dst, src) in zip(blocks, pieces):
+        out[(slice(None),) * axis + (dst,)] = np.take(block, src, axis=axis)
+    return out
+
+
+def _dask_scatter(x, axis, inverse):
+    """Rearrange dask array `x` along `axis` as ``np.take(x, inverse, axis)``.
+
+    Each output block only depends on the input blocks that contain its
+    elements, and the output chunks along `axis` are no larger than the
+    biggest input chunk, so that a long permuted index does not merge
+    all of `x` along `axis` into a single huge chunk.
+    """
+    import dask.array as da
+    import dask.highlevelgraph
+    from dask.base import tokenize
+    inverse = np.asarray(inverse)
+    out_chunks = da.core.normalize_chunks(max(x.chunks[axis]), (len(inverse),))[0]
+    in_bounds = np.cumsum((0,) + x.chunks[axis])
+    in_block = np.searchsorted(in_bounds, inverse, side='right') - 1
+    name = 'scatter-' + tokenize(x, axis, inverse)
+    numblocks = list(x.numblocks)
+    numblocks[axis] = 1
+    dsk = {}
+    start = 0
+    for k, size in enumerate(out_chunks):
+        stop = start + size
+        needed = np.unique(in_block[start:stop])
+        pieces = []
+        for j in needed:
+            dst = np.flatnonzero(in_block[start:stop] == j)
+            pieces.append((dst, inverse[start:stop][dst] - in_bounds[j]))
+        func = partial(_scatter_block, pieces, axis, size)
+        for other in np.ndindex(*numblocks):
+            in_keys = [(x.name,) + other[:axis] + (j,) + other[axis + 1:] for j in needed]
+            dsk[(name,) + other[:axis] + (k,) + other[axis + 1:]] = (func,) + tuple(in_keys)
+        start = stop
+    graph = dask.highlevelgraph.HighLevelGraph.from_collections(name, dsk, dependencies=[x])
+    chunks = x.chunks[:axis] + (out_chunks,) + x.chunks[axis + 1:]
+    return da.Array(graph, name, chunks, dtype=x.dtype)
+
+
 def _dask_oindex(x, indices):
     """Perform outer indexing on dask array `x`, one dimension at a time.
 
     It is assumed that `indices` is suitably normalised (no ellipsis, etc.)
     """
+    import dask.array as da
     axis = 0
     for index in indices:
         x = da.take(x, index, axis=axis)
@@ -123,16 +233,25 @@ def dask_getitem(x, indices):
     .. _dask #433: https://github.com/dask/dask/issues/433
     .. _h5py #652: https://github.com/h5py/h5py/issues/652
 
+    Out-of-order and duplicate integer indices are supported by first
+    selecting the sorted unique indices and then rearranging the result,
+    which avoids the many small chunks produced by :func:`dask.array.take`.
+
     In addition, this optimises performance by culling unnecessary nodes from
     the dask graph after indexing, which makes it cheaper to compute if only a
     small piece of the graph is needed, and by collapsing fancy indices in
     `indices` to slices where possible (which also implies oindex semantics).
     """
-    indices = _simplify_index(indices, x.shape)
+    # Import dask on first use, as the HDF5 LazyIndexer does not need it
+    import dask.highlevelgraph
+    import dask.optimization
+    indices, reorder = _dask_gather(_simplify_index(indices, x.shape))
     try:
         out = x[indices]
     except NotImplementedError:
         out = _dask_oindex(x, indices)
+    for axis, inverse in reorder:
+        out = _dask_scatter(out, axis, inverse)
     # dask does culling anyway as part of optimization, but it first calls
     # ensure_dict, which copies all the keys, presumably to speed up the
     # case where most keys are retained. A lazy indexer is normally used to
@@ -208,6 +327,166 @@ class LazyTransform(object):
         """Transform data (`keep` is user-specified second-stage index)."""
         return self.transform(data, keep)
 
+
+# Cost model for reading a hyperslab from a dataset: fixed overhead per read (in seconds) and cost per byte
+# read (in seconds per byte), which are used to decide whether to bridge gaps between selected segments.
+# These defaults are typical for HDF5 files on local disk - use :func:`measure_read_cost` to refine them.
+DEFAULT_READ_COST = (1e-4, 1e-9)
+
+
+def measure_read_cost(dataset, repeats=10, max_bytes=16 * 1024 ** 2):
+    """Measure the parameters of the cost model for reading from `dataset`.
+
+    This times small and large reads from the start of the dataset to estimate
+    the overhead per read and cost per byte. The result can be assigned to
+    :attr:`LazyIndexer.read_cost` (note that OS file caching affects it).
+
+    Parameters
+    ----------
+    dataset : :class:`h5py.Dataset` object or equivalent
+        Dataset to read from (needs at least one element)
+    repeats : int, optional
+        Number of times to repeat each read (the fastest time is used)
+    max_bytes : int, optional
+        Upper limit on the size of the large read, in bytes
+
+    Returns
+    -------
+    read_cost : tuple of float
+        Overhead per read (in seconds) and cost per byte (in seconds per byte)
+    """
+    def best_time(select):
+        times = []
+        for n in range(repeats):
+            start = time.time()
+            dataset[select]
+            times.append(time.time() - start)
+        return min(times)
+
+    ndim = len(dataset.shape)
+    overhead = best_time((slice(0, 1),) * ndim)
+    row_bytes = dataset.dtype.itemsize * int(np.prod(dataset.shape[1:]))
+    rows = int(min(dataset.shape[0], max(max_bytes // max(row_bytes, 1), 1)))
+    per_byte = max(best_time(np.s_[:rows]) - overhead, 0.0) / max(rows * row_bytes, 1)
+    return overhead, per_byte
+
+
+def _plan_reads(indices, chunk_len, index_bytes, read_cost):
+    """Group sorted unique indices along one dimension into reads.
+
+    The indices are first split into contiguous segments. Neighbouring
+    segments are then merged into a single read spanning the gap between
+    them (followed by post-selection on the resulting ndarray) if the
+    estimated cost of reading the gap is less than the overhead of an extra
+    read. Gaps that lie inside HDF5 chunks that have to be read anyway
+    cost nothing.
+
+    Parameters
+    ----------
+    indices : array of int
+        Sorted unique indices along dimension
+    chunk_len : int
+        Length of HDF5 chunks along dimension (1 for contiguous datasets)
+    index_bytes : int
+        Number of bytes read per index along this dimension
+    read_cost : tuple of float
+        Overhead per read (in seconds) and cost per byte (in seconds per byte)
+
+    Returns
+    -------
+    reads : list of tuple
+        List of (dataset selection, post-selection, output selection) per read
+    """
+    overhead, per_byte = read_cost
+    jumps = np.nonzero(np.diff(indices) > 1)[0]
+    starts = [indices[0]] + indices[jumps + 1].tolist()
+    ends = (indices[jumps] + 1).tolist() + [indices[-1] + 1]
+    groups = [[starts[0], ends[0]]]
+    for start, end in zip(starts[1:], ends[1:]):
+        prev_end = groups[-1][1]
+        # Only count the chunks that are touched by the gap but not by the segments on either side
+        gap_chunks = max(start // chunk_len - (prev_end - 1) // chunk_len - 1, 0)
+        if gap_chunks * chunk_len * index_bytes * per_byte <= overhead:
+            groups[-1][1] = end
+        else:
+            groups.append([start, end])
+    reads = []
+    out_start = 0
+    for start, end in groups:
+        members = indices[np.searchsorted(indices, start):np.searchsorted(indices, end)]
+        post_select = slice(None) if len(members) == end - start else members - start
+        reads.append((slice(start, end, 1), post_select, slice(out_start, out_start + len(members), 1)))
+        out_start += len(members)
+    return reads
+
+
+def _selection_length(dim_keep, dim_len):
+    """Number of elements selected by `dim_keep` along a dimension of length `dim_len`."""
+    if np.isscalar(dim_keep):
+        return 1
+    if isinstance(dim_keep, slice):
+        return len(range(*dim_keep.indices(dim_len)))
+    dim_keep = np.atleast_1d(dim_keep)
+    if dim_keep.dtype == np.bool and len(dim_keep) == dim_len:
+        return int(np.count_nonzero(dim_keep))
+    return len(np.unique(dim_keep))
+
+
+def _read_segment(dataset, dataset_select, post_select):
+    """Read hyperslab from dataset and perform post-selection on it."""
+    chunk = dataset[dataset_select]
+    # Do post-selection one dimension at a time, as ndarray does not allow simultaneous advanced indexing
+    # on more than one dimension. This caters for the scenario where more than one dimension has gaps
+    # bridged by the cost model (the only way to get advanced post-selection).
+    for dim in range(len(chunk.shape)):
+        # Only do post-selection on this dimension if non-trivial (otherwise an unnecessary copy happens)
+        if not (isinstance(post_select[dim], slice) and post_select[dim] == slice(None)):
+            # Prepend the appropriate number of colons to the selection to place it at correct dimension
+            chunk = chunk[tuple([slice(None)] * dim + [post_select[dim]])]
+    return chunk
+
+
+# HDF5 files opened by the current worker process, indexed by filename
+_worker_files = {}
+
+
+def _read_hdf5_segment(filename, dataset_name, dataset_select, post_select):
+    """Read hyperslab from HDF5 dataset in a worker process, on its own file handle."""
+    import h5py
+    try:
+        h5file = _worker_files[filename]
+    except KeyError:
+        h5file = _worker_files[filename] = h5py.File(filename, 'r')
+    return _read_segment(h5file[dataset_name], dataset_select, post_select)
+
+
+# Worker pools shared by all LazyIndexers, indexed by (worker type, number of workers)
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(worker_type, workers):
+    """Get a (cached) pool of `workers` threads or processes."""
+    with _pools_lock:
+        try:
+            return _pools[worker_type, workers]
+        except KeyError:
+            pass
+        if worker_type == 'thread':
+            pool = ThreadPool(workers)
+        else:
+            # Forking a process with open HDF5 files is asking for trouble, so spawn workers if possible
+            try:
+                context = multiprocessing.get_context('spawn')
+            except AttributeError:
+                context = multiprocessing
+            pool = context.Pool(workers)
+        # Shut the pool down before interpreter teardown breaks its queues
+        atexit.register(pool.terminate)
+        _pools[worker_type, workers] = pool
+        return pool
+
+
 # -------------------------------------------------------------------------------------------------
 # -- CLASS :  LazyIndexer
 # -------------------------------------------------------------------------------------------------
@@ -244,7 +523,11 @@ class LazyIndexer(object):
     of the dimension to alleviate issue 2. Finally, this also allows faster
     data retrieval by extracting a large slice from the HDF5 dataset and then
     performing advanced indexing on the resulting :class:`numpy.ndarray` object
-    instead, in response to issue 3.
+    instead, in response to issue 3. Neighbouring segments are merged into a
+    single slice whenever the estimated cost of reading the gap between them
+    (based on :attr:`read_cost` and the HDF5 chunk layout) is less than the
+    overhead of a separate read. The resulting reads may be performed in
+    parallel by a pool of threads or processes.
 
     The `keep` parameter of the :meth:`__init__` and :meth:`__getitem__` methods
     accepts a generic index or slice specification, i.e. anything that would be
@@ -269,11 +552,25 @@ class LazyIndexer(object):
         Chain of transforms to be applied to data after final indexing. The
         chain as a whole may only add or drop dimensions at the end of data
         shape without changing the preserved dimensions.
+    workers : int or None, optional
+        Number of workers that read hyperslabs in parallel (defaults to
+        class attribute :attr:`workers`, which is 1, i.e. serial reads)
+    worker_type : {'thread', 'process'} or None, optional
+        Read with a pool of threads or processes (defaults to class attribute
+        :attr:`worker_type`, which is 'thread'). Threads are cheap but h5py
+        serialises all calls into the HDF5 library via a global lock, so they
+        mainly help with non-HDF5 datasets or decompression-free reads that
+        release it. Processes reopen the HDF5 file on separate file handles
+        and read truly in parallel at the cost of pickling the results.
 
     Attributes
     ----------
     name : string
         Name of HDF5 dataset (or empty string for unnamed ndarrays, etc.)
+    read_cost : tuple of float
+        Overhead per read (in seconds) and cost per byte (in seconds per
+        byte) of the dataset, used to decide whether to bridge gaps between
+        selected segments with a single larger read (see :func:`measure_read_cost`)
 
     Raises
     ------
@@ -282,10 +579,24 @@ class LazyIndexer(object):
 
     """
 
-    def __init__(self, dataset, keep=slice(None), transforms=None):
+    # Cost model used to decide whether to bridge gaps in selection (see :func:`measure_read_cost`)
+    read_cost = DEFAULT_READ_COST
+    # Default number of workers and type of worker ('thread' or 'process') performing reads
+    workers = 1
+    worker_type = 'thread'
+
+    def __init__(self, dataset, keep=slice(None), transforms=None, workers=None, worker_type=None):
         self.dataset = dataset
         self.transforms = [] if transforms is None else transforms
         self.name = getattr(self.dataset, 'name', '')
+        if workers is not None:
+            self.workers = workers
+        if worker_type is not None:
+            self.worker_type = worker_type
+        if self.worker_type not in ('thread', 'process'):
+            raise ValueError("Unknown worker type %r (should be 'thread' or 'process')" % (self.worker_type,))
+        if self.worker_type == 'process' and not hasattr(dataset, 'file'):
+            raise ValueError('Process workers need an h5py.Dataset to reopen, not %r' % (type(dataset),))
         # Ensure that keep is a tuple (then turn it into a list to simplify further processing)
         keep = list(keep) if isinstance(keep, tuple) else [keep]
         # Ensure that keep is same length as data shape (truncate or pad with blanket slices as necessary)
@@ -373,7 +684,12 @@ class LazyIndexer(object):
         # (dataset selection, post-selection, output array selection)
         # Similarly, `segment_sizes` is a list of lists of segment lengths (empty lists for scalar-selected dimensions)
         selection, segment_sizes = [], []
-        for dim_keep, dim_len in zip(keep, self.dataset.shape):
+        # List of (output axis, inverse) pairs used to scatter gathered data into requested order
+        reorder = []
+        # Number of elements selected along each dimension and HDF5 chunk shape, to estimate the cost of reads
+        keep_sizes = [_selection_length(dim_keep, dim_len) for dim_keep, dim_len in zip(keep, self.dataset.shape)]
+        chunks = getattr(self.dataset, 'chunks', None) or (1,) * ndim
+        for dim, (dim_keep, dim_len) in enumerate(zip(keep, self.dataset.shape)):
             if np.isscalar(dim_keep):
                 # If selection is a scalar, pass directly to dataset selector and remove dimension from output
                 selection.append([(dim_keep, None, None)])
@@ -394,27 +710,18 @@ class LazyIndexer(object):
                 # Turn boolean mask into integer indices (True means keep that index)
                 if dim_keep.dtype == np.bool and len(dim_keep) == dim_len:
                     dim_keep = np.nonzero(dim_keep)[0]
-                elif not np.all(dim_keep == np.unique(dim_keep)):
-                    raise TypeError('LazyIndexer cannot handle duplicate or unsorted advanced integer indices')
-                # Split indices into multiple contiguous segments (specified by first and one-past-last data indices)
-                jumps = np.nonzero(np.diff(dim_keep) > 1)[0]
-                first = [dim_keep[0]] + dim_keep[jumps + 1].tolist()
-                last = dim_keep[jumps].tolist() + [dim_keep[-1]]
-                segments = np.c_[first, np.array(last) + 1]
-                if len(dim_keep) > 0.2 * dim_len and len(segments) > 1:
-                    # If more than 20% of data are selected in 2 or more separate segments (the Ratcliffian benchmark),
-                    # select data at dataset level with a single slice spanning segments and then postselect the ndarray
-                    selection.append([(slice(segments[0, 0], segments[-1, 1], 1),
-                                       dim_keep - dim_keep[0], slice(0, len(dim_keep), 1))])
-                    segment_sizes.append([len(dim_keep)])
                 else:
-                    # Turn each segment into a separate slice at dataset level without post-selection,
-                    # and construct contiguous output slices of the same segment sizes
-                    segm_sizes = [end - start for start, end in segments]
-                    segm_starts = np.cumsum([0] + segm_sizes)
-                    selection.append([(slice(start, end, 1), slice(None), slice(segm_starts[n], segm_starts[n + 1], 1))
-                                      for n, (start, end) in enumerate(segments)])
-                    segment_sizes.append(segm_sizes)
+                    # Fetch sorted unique indices and rearrange them into requested order afterwards
+                    dim_keep = np.where(dim_keep < 0, dim_keep + dim_len, dim_keep)
+                    dim_keep, inverse = _gather_index(dim_keep)
+                    if inverse is not None:
+                        reorder.append((len([sizes for sizes in segment_sizes if sizes]), inverse))
+                # Split indices into contiguous segments and bridge gaps between them where this is cheaper
+                # than separate reads, based on the cost model and the HDF5 chunk layout of the dataset
+                index_bytes = self.dataset.dtype.itemsize * np.prod(keep_sizes[:dim] + keep_sizes[dim + 1:])
+                reads = _plan_reads(dim_keep, chunks[dim], index_bytes, self.read_cost)
+                selection.append(reads)
+                segment_sizes.append([out_select.stop - out_select.start for _, _, out_select in reads])
         # Short-circuit the selection if all dimensions are selected with scalars (resulting in a scalar output)
         if segment_sizes == [[]] * ndim:
             out_data = self.dataset[tuple([select[0][0] for select in selection])]
@@ -423,30 +730,41 @@ class LazyIndexer(object):
             chunk_indices = np.mgrid[[slice(0, len(select), 1) for select in selection]]
             # Pre-allocate output ndarray to have the correct shape and dtype (will be at least 1-dimensional)
             out_data = np.empty([np.sum(segments) for segments in segment_sizes if segments], dtype=self.dataset.dtype)
-            # Iterate over chunks, extracting them from dataset and inserting them into the right spot in output array
+            reads = []
             for chunk_index in chunk_indices.reshape(ndim, -1).T:
                 # Extract chunk from dataset (don't use any advanced indexing here, only scalars and slices)
                 dataset_select = tuple([select[segment][0] for select, segment in zip(selection, chunk_index)])
-                chunk = self.dataset[dataset_select]
-                # Perform post-selection on chunk (can be fancier / advanced indexing because chunk is now an ndarray)
-                post_select = [select[segment][1] for select, segment in zip(selection, chunk_index)]
+                # Post-selection on chunk can be fancier / advanced indexing because chunk is then an ndarray.
                 # If any dimensions were dropped due to scalar indexing, drop them from post_select/out_select tuples
+                post_select = [select[segment][1] for select, segment in zip(selection, chunk_index)]
                 post_select = tuple([select for select in post_select if select is not None])
-                # Do post-selection one dimension at a time, as ndarray does not allow simultaneous advanced indexing
-                # on more than one dimension. This caters for the scenario where more than one dimension satisfies
-                # the Ratcliffian benchmark (the only way to get advanced post-selection).
-                for dim in range(len(chunk.shape)):
-                    # Only do post-selection on this dimension if non-trivial (otherwise an unnecessary copy happens)
-                    if not (isinstance(post_select[dim], slice) and post_select[dim] == slice(None)):
-                        # Prepend the appropriate number of colons to the selection to place it at correct dimension
-                        chunk = chunk[[slice(None)] * dim + [post_select[dim]]]
-                # Determine appropriate output selection and insert chunk into output array
                 out_select = [select[segment][2] for select, segment in zip(selection, chunk_index)]
                 out_select = tuple([select for select in out_select if select is not None])
-                out_data[out_select] = chunk
+                reads.append((dataset_select, post_select, out_select))
+            self._read_into(out_data, reads)
+            for axis, inverse in reorder:
+                out_data = np.take(out_data, inverse, axis=axis)
         # Apply transform chain to output data, if any
         return reduce(lambda data, transform: transform(data, original_keep), self.transforms, out_data)
 
+    def _read_into(self, out_data, reads):
+        """Perform reads from dataset and insert the results into the right spot in output array."""
+        if self.workers <= 1 or len(reads) <= 1:
+            for dataset_select, post_select, out_select in reads:
+                out_data[out_select] = _read_segment(self.dataset, dataset_select, post_select)
+        elif self.worker_type == 'thread':
+            def read(args):
+                dataset_select, post_select, out_select = args
+                out_data[out_select] = _read_segment(self.dataset, dataset_select, post_select)
+            _get_pool('thread', self.workers).map(read, reads)
+        else:
+            pool = _get_pool('process', self.workers)
+            filename, dataset_name = self.dataset.file.filename, self.dataset.name
+            results = [pool.apply_async(_read_hdf5_segment, (filename, dataset_name, dataset_select, post_select))
+                       for dataset_select, post_select, _ in reads]
+            for result, (_, _, out_select) in zip(results, reads):
+                out_data[out_select] = result.get()
+
     @property
     def shape(self):
         """Shape of data array after first-stage indexing and transformation, i.e. ``self[:].shape``."""
@@ -465,6 +783,55 @@ class LazyIndexer(object):
                       self.transforms, self._initial_dtype)
 
 
+# Default upper limit on the size of a dask chunk wrapping an HDF5 dataset
+DEFAULT_HDF5_CHUNK_BYTES = 16 * 1024 ** 2
+
+
+def hdf5_to_dask(dataset, max_bytes=DEFAULT_HDF5_CHUNK_BYTES):
+    """Wrap an HDF5 dataset in a dask array with chunks aligned to its layout.
+
+    Each dask chunk consists of a whole number of HDF5 chunks (or
+    contiguous rows for datasets without chunked layout), grown from the
+    last dimension backwards until it reaches `max_bytes`. Dask chunks
+    therefore never split an HDF5 chunk and mostly map onto contiguous
+    reads from the file.
+
+    Parameters
+    ----------
+    dataset : :class:`h5py.Dataset` object
+        HDF5 dataset to wrap
+    max_bytes : int, optional
+        Upper limit on the size of each dask chunk, in bytes (a single HDF5
+        chunk is used if that is already larger)
+
+    Returns
+    -------
+    array : :class:`dask.array.Array`
+        Dask array that reads from `dataset` on computation
+    """
+    import dask.array as da
+    from dask.base import tokenize
+    shape = dataset.shape
+    chunks = list(dataset.chunks or (1,) * len(shape))
+    for axis in reversed(range(len(shape))):
+        chunk_bytes = dataset.dtype.itemsize * np.prod(chunks)
+        chunks[axis] = max(min(chunks[axis] * max(max_bytes // chunk_bytes, 1), shape[axis]), 1)
+    name = 'hdf5-' + tokenize(dataset.file.filename, dataset.name, tuple(chunks))
+    return da.from_array(dataset, chunks=tuple(chunks), name=name, fancy=False)
+
+
+def _keep_singletons(keep):
+    """Turn integer indices in `keep` into length-1 slices to keep their dimensions."""
+    keep = keep if isinstance(keep, tuple) else (keep,)
+    return tuple(slice(dim_keep, dim_keep + 1 if dim_keep != -1 else None)
+                 if isinstance(dim_keep, Integral) and not isinstance(dim_keep, bool) else dim_keep
+                 for dim_keep in keep)
+
+
+# Default upper limit on the size of a block in DaskLazyIndexer.iter_blocks
+DEFAULT_BLOCK_BYTES = 256 * 1024 ** 2
+
+
 class DaskLazyIndexer(object):
     """Turn a dask Array into a LazyIndexer by computing it upon indexing.
 
@@ -491,6 +858,13 @@ class DaskLazyIndexer(object):
         Transformations that are applied after indexing by `keep` but
         before indexing on this object. Each transformation is a callable
         that takes a dask array and returns another dask array.
+    direct : :class:`~katdal.chunkstore.DirectReader` object, optional
+        Alternative source of `dataset` that loads slices straight into the
+        output arrays. It is used instead of the dask graph if there are no
+        `transforms` and both selection stages reduce to simple slices.
+    keepdims : bool, optional
+        Keep the dimensions selected by integer indices in the second-stage
+        selection as singleton dimensions, instead of dropping them
 
     Attributes
     ----------
@@ -500,8 +874,9 @@ class DaskLazyIndexer(object):
         The dask array that is accessed by indexing (after applying `keep` and
         `transforms`). It can be used directly to perform dask computations.
     """
-    def __init__(self, dataset, keep=(), transforms=()):
+    def __init__(self, dataset, keep=(), transforms=(), direct=None, keepdims=False):
         self.name = getattr(dataset, 'name', '')
+        self.keepdims = keepdims
         # Fancy indices can be mutable arrays, so take a copy to protect
         # against the caller mutating the array before we apply it.
         self.keep = copy.deepcopy(keep)
@@ -509,6 +884,7 @@ class DaskLazyIndexer(object):
         self._orig_dataset = dataset
         self._dataset = None
         self._lock = threading.Lock()
+        self.direct = direct
 
     @property
     def transforms(self):
@@ -588,15 +964,137 @@ class DaskLazyIndexer(object):
         out : sequence of :class:`numpy.ndarray`
             Extracted output array (computed from the final dask version)
         """
-        kept = [dask_getitem(array.dataset, keep) for array in arrays]
-        # Workaround for https://github.com/dask/dask/issues/3595
-        # This is equivalent to da.compute(kept), but does not allocate
-        # excessive memory.
+        import dask
+        import dask.array as da
+        keeps = [_keep_singletons(keep) if array.keepdims else keep for array in arrays]
+        direct = [array._direct_index(array_keep) for array, array_keep in zip(arrays, keeps)]
+        kept = [dask_getitem(array.dataset, array_keep) if index is None else None
+                for array, array_keep, index in zip(arrays, keeps, direct)]
         if out is None:
-            out = [np.empty(array.shape, array.dtype) for array in kept]
-        da.store(kept, out, lock=False)
+            out = [np.empty(array.shape, array.dtype) if index is None
+                   else np.empty(tuple(s.stop - s.start for s in index), indexer.direct.dtype)
+                   for indexer, index, array in zip(arrays, direct, kept)]
+        # Simple selections bypass dask arrays and go straight into `out`
+        loads = [array.direct.store_into(index, result)
+                 for array, index, result in zip(arrays, direct, out) if index is not None]
+        kept_out = [(array, result) for array, result in zip(kept, out) if array is not None]
+        if kept_out:
+            # Workaround for https://github.com/dask/dask/issues/3595
+            # This is equivalent to da.compute(kept), but does not allocate
+            # excessive memory.
+            loads.append(da.store(*zip(*kept_out), lock=False, compute=False))
+        dask.compute(*loads)
         return out
 
+    def _direct_index(self, keep):
+        """Combine both selection stages into an index for the direct reader.
+
+        Returns a tuple of unit-stride slices (one per dimension of the
+        original dataset) if the direct reader can be used, otherwise None.
+        """
+        if self.direct is None or self.transforms:
+            return None
+        stage1 = _unit_stride_slices(self.keep, self.direct.shape)
+        if stage1 is None:
+            return None
+        stage2 = _unit_stride_slices(keep, tuple(s.stop - s.start for s in stage1))
+        if stage2 is None:
+            return None
+        return tuple(slice(s1.start + s2.start, s1.start + s2.stop)
+                     for s1, s2 in zip(stage1, stage2))
+
+    @classmethod
+    def iter_blocks(cls, arrays, axis=0, block=None, max_bytes=DEFAULT_BLOCK_BYTES):
+        """Iterate over several arrays jointly in chunk-aligned blocks.
+
+        This splits the arrays along `axis` into blocks whose boundaries
+        coincide with chunk boundaries in all of the underlying dask arrays,
+        loads each block with :meth:`get` and yields it. The next block is
+        fetched in the background while the caller processes the current
+        one, and the output buffers are reused from block to block.
+
+        Parameters
+        ----------
+        arrays : list of :class:`DaskLazyIndexer`
+            Arrays to iterate over, which must have the same length along `axis`
+        axis : int, optional
+            Axis along which to split the arrays into blocks
+        block : int, optional
+            Desired number of elements along `axis` per block. This is rounded
+            down to the nearest chunk boundary (but includes at least one chunk).
+            If not specified, use as many chunks as fit into `max_bytes`.
+        max_bytes : int, optional
+            Maximum size of a block summed over all arrays, in bytes (only used
+            if `block` is not specified, and at least one chunk is included)
+
+        Yields
+        ------
+        index : tuple of slice
+            Index expression that selects the block from each array
+        out : :class:`numpy.ndarray`
+            One array per element of `arrays`, containing the block. The
+            arrays are reused by later blocks: they are only valid until the
+            next block is requested, so copy them if they need to be kept.
+
+        Raises
+        ------
+        ValueError
+            If the arrays have different lengths along `axis`
+        """
+        lengths = set(array.shape[axis] for array in arrays)
+        if len(lengths) > 1:
+            raise ValueError('Arrays have different lengths {} along axis {}'
+                             .format(sorted(lengths), axis))
+        # Only split on boundaries shared by the chunks of all the arrays
+        boundaries = None
+        for array in arrays:
+            array_boundaries = set(np.cumsum((0,) + array.dataset.chunks[axis]))
+            boundaries = array_boundaries if boundaries is None else boundaries & array_boundaries
+        boundaries = sorted(boundaries or ())
+        if block is None:
+            bytes_per_element = sum(array.dtype.itemsize * np.prod(array.shape)
+                                    // max(array.shape[axis], 1) for array in arrays)
+            block = max_bytes // max(bytes_per_element, 1)
+        # Greedily merge consecutive chunks into blocks of up to `block` elements
+        edges = [0]
+        for start, stop in zip(boundaries[1:-1], boundaries[2:]):
+            if stop - edges[-1] > block:
+                edges.append(start)
+        if len(boundaries) > 1:
+            edges.append(boundaries[-1])
+        blocks = [(slice(None),) * axis + (slice(start, stop),)
+                  for start, stop in zip(edges[:-1], edges[1:])]
+        if not blocks:
+            return
+        # Two sets of buffers: one being filled, the other one being consumed
+        max_block = max(stop - start for start, stop in zip(edges[:-1], edges[1:]))
+        buffers = []
+        for n in range(2):
+            buffers.append([np.empty(array.shape[:axis] + (max_block,) + array.shape[axis + 1:],
+                                     array.dtype) for array in arrays])
+
+        def views(n, index):
+            return [buf[(slice(None),) * axis + (slice(0, index[axis].stop - index[axis].start),)]
+                    for buf in buffers[n % 2]]
+
+        pool = ThreadPool(1)
+        pending = None
+        try:
+            pending = pool.apply_async(cls.get, (arrays, blocks[0], views(0, blocks[0])))
+            for n, index in enumerate(blocks):
+                out = pending.get()
+                pending = None
+                if n + 1 < len(blocks):
+                    pending = pool.apply_async(cls.get, (arrays, blocks[n + 1],
+                                                         views(n + 1, blocks[n + 1])))
+                yield (index,) + tuple(out)
+        finally:
+            # Don't leave a background load running if the caller stops early
+            if pending is not None:
+                pending.wait()
+            pool.close()
+            pool.join()
+
     def __len__(self):
         """Length operator."""
         return self.shape[0]
@@ -0,0 +1,129 @@
+################################################################################
+# Copyright (c) 2020, National Research Foundation (Square Kilometre Array)
+#
+# Licensed under the BSD 3-Clause License (the "License"); you may not use
+# this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#   https://opensource.org/licenses/BSD-3-Clause
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+"""Numba JIT compilation that is deferred until the function is first called.
+
+Importing :mod:`numba` (and LLVM with it) is expensive. Most katdal users
+that merely inspect metadata never run any of the numba kernels, so wrap
+them in a :class:`LazyJit` object instead and only import numba and
+create the dispatcher when the kernel is actually called.
+
+The kernels are also compiled with ``cache=True`` so that the machine code
+is stored on disk (in ``__pycache__`` or ``NUMBA_CACHE_DIR``) and reused by
+subsequent processes. Modules containing kernels register a warm-up hook
+via :func:`register_warm_up`, and :func:`warm_up` runs all of them in
+order to compile (or load from the cache) the kernels for the argument
+types that katdal typically uses. This is useful for e.g. dask workers,
+which can be warmed up before the first task arrives::
+
+    client.run(katdal.lazy_jit.warm_up)
+"""
+from __future__ import print_function, division, absolute_import
+from builtins import object
+
+import functools
+import importlib
+import threading
+import time
+
+
+_lock = threading.Lock()
+# Modules with numba kernels that register warm-up hooks when imported
+KERNEL_MODULES = ('katdal.applycal', 'katdal.averager', 'katdal.categorical', 'katdal.datasources')
+_warm_up_hooks = []
+
+
+class LazyJit(object):
+    """Python function that is turned into a numba dispatcher on first call.
+
+    Parameters
+    ----------
+    func : function
+        Pure Python version of the function
+    options : dict
+        Keyword arguments passed to :func:`numba.jit` (e.g. `nopython`)
+    """
+
+    def __init__(self, func, options):
+        self.py_func = func
+        self.options = options
+        self._dispatcher = None
+        functools.update_wrapper(self, func)
+
+    def __repr__(self):
+        """Short human-friendly string representation of lazy JIT function."""
+        state = 'compiled' if self._dispatcher is not None else 'pending'
+        return "<katdal.LazyJit %s %r at 0x%x>" % (state, self.__name__, id(self))
+
+    def __reduce__(self):
+        # Pickle by reference to the module-level name, like normal functions
+        return self.__name__
+
+    @property
+    def dispatcher(self):
+        """The underlying :class:`numba.Dispatcher` (imports numba if needed)."""
+        if self._dispatcher is None:
+            with _lock:
+                if self._dispatcher is None:
+                    import numba
+                    self._dispatcher = numba.jit(**self.options)(self.py_func)
+        return self._dispatcher
+
+    def __call__(self, *args, **kwargs):
+        return self.dispatcher(*args, **kwargs)
+
+
+def jit(**options):
+    """Decorator equivalent to :func:`numba.jit` that defers compilation.
+
+    Unlike :func:`numba.jit` this does not import numba until the decorated
+    function is called for the first time. It only supports the keyword
+    form of the decorator, e.g. ``@jit(nopython=True, nogil=True)``.
+    """
+    def decorator(func):
+        return LazyJit(func, options)
+    return decorator
+
+
+def register_warm_up(func):
+    """Decorator that registers `func` as a warm-up hook for :func:`warm_up`.
+
+    The hook takes no arguments and should call the numba kernels of its
+    module on small dummy inputs of the types used in practice.
+    """
+    _warm_up_hooks.append(func)
+    return func
+
+
+def warm_up():
+    """Compile all katdal numba kernels (or load them from the disk cache).
+
+    Returns
+    -------
+    elapsed : dict
+        Time taken by each warm-up hook, in seconds, keyed by hook
+        module (including the import of the module itself)
+    """
+    elapsed = {}
+    for module_name in KERNEL_MODULES:
+        start = time.time()
+        importlib.import_module(module_name)
+        elapsed[module_name] = time.time() - start
+    for hook in list(_warm_up_hooks):
+        start = time.time()
+        hook()
+        elapsed[hook.__module__] = elapsed.get(hook.__module__, 0.0) + time.time() - start
+    return elapsed
@@ -33,9 +33,9 @@ import multiprocessing
 import multiprocessing.sharedctypes
 
 import numpy as np
-import katpoint
 
 from . import ms_extra
+from .timeconv import to_mjd_seconds
 
 
 class RawArray(object):
@@ -147,8 +147,7 @@ def ms_writer_process(
 
                     # Convert averaged UTC timestamps to MJD seconds.
                     # Blow time up to (ntime*nbl,)
-                    out_mjd = np.asarray([katpoint.Timestamp(t).to_mjd() * 24 * 60 * 60
-                                          for t in item.time_utc])
+                    out_mjd = to_mjd_seconds(item.time_utc)
 
                     out_mjd = np.broadcast_to(out_mjd[:, np.newaxis], (tdiff, nbl)).ravel()
 
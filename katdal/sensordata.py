@@ -18,13 +18,17 @@
 from __future__ import print_function, division, absolute_import
 from future import standard_library
 standard_library.install_aliases()  # noqa: E402
-from future.utils import raise_from, PY3, isidentifier
-from builtins import zip, range, object
+from future.utils import PY3
+from builtins import zip, object
 from past.builtins import unicode
 
+import hashlib
 import logging
+import numbers
+import os
 import re
 import threading
+from multiprocessing.pool import ThreadPool
 try:
     from collections.abc import MutableMapping
 except ImportError:
@@ -33,9 +37,8 @@ except ImportError:
 import numpy as np
 import katpoint
 import katsdptelstate
-import requests
 
-from .categorical import (ComparableArrayWrapper, infer_dtype,
+from .categorical import (CategoricalData, ComparableArrayWrapper, infer_dtype,
                           sensor_to_categorical)
 
 logger = logging.getLogger(__name__)
@@ -107,6 +110,33 @@ class SensorGetter(object):
         """
         raise NotImplementedError
 
+    def get_range(self, start_time, end_time, categorical=None):
+        """Retrieve the values relevant to a time range from underlying storage.
+
+        This returns at least the values in the range [`start_time`, `end_time`)
+        as well as the last value before `start_time` (if any), which is still
+        in effect at the start of the range, and the first value at or after
+        `end_time` (if any), so that numerical sensors can be interpolated up
+        to the end of the range. It may return more values than that. The
+        default is to retrieve all values via :meth:`get`, so only subclasses
+        with storage that can be queried by time need to override it.
+
+        Parameters
+        ----------
+        start_time, end_time : float
+            Time range of interest, as UTC seconds since Unix epoch
+        categorical : {None, True, False}, optional
+            True if the values will be turned into categorical data, which
+            does not need the value following `end_time` (by default, data of
+            type float is numerical and of any other type is categorical)
+
+        Returns
+        -------
+        values : :class:`SensorData`
+            Underlying data
+        """
+        return self.get()
+
     def __repr__(self):
         """Short human-friendly string representation of sensor data object."""
         return "<katdal.%s '%s' at 0x%x>" % \
@@ -342,6 +372,11 @@ class TelstateToStr(object):
         return value
 
 
+# Sensor history fetched from telstate after the end of the time range in the
+# same request, which normally contains the next value of numerical sensors
+TELSTATE_LOOKAHEAD = 60.0
+
+
 class TelstateSensorGetter(SensorGetter):
     """Raw (uninterpolated) sensor data stored in original TelescopeState.
 
@@ -357,6 +392,9 @@ class TelstateSensorGetter(SensorGetter):
         Telescope state object
     name : string
         Sensor name, also used as telstate key
+    check : {True, False}, optional
+        Verify that `name` is an existing sensor in `telstate` (disable this
+        if the caller already knows it, to avoid a round trip per sensor)
 
     Raises
     ------
@@ -364,12 +402,12 @@ class TelstateSensorGetter(SensorGetter):
         If sensor name is not found in telstate or it is an attribute instead
     """
 
-    def __init__(self, telstate, name):
+    def __init__(self, telstate, name, check=True):
         self._telstate = TelstateToStr(telstate)
-        if name not in telstate:
+        if check and name not in telstate:
             raise KeyError('No sensor named %r in telstate (key not found)' %
                            (name,))
-        if telstate.is_immutable(name):
+        if check and telstate.is_immutable(name):
             raise KeyError("No sensor named %r in telstate (it's an attribute)" %
                            (name,))
         super(TelstateSensorGetter, self).__init__(name)
@@ -378,13 +416,63 @@ class TelstateSensorGetter(SensorGetter):
         """True if sensor has at least one data point (already checked in init)."""
         return True
 
-    def get(self):
-        values, times = zip(*self._telstate.get_range(self.name, st=0))
+    def _sensor_data(self, records):
+        """Turn output of :meth:`katsdptelstate.TelescopeState.get_range` into sensor data."""
+        if not records:
+            return SensorData(self.name, np.array([]), np.array([]))
+        values, times = zip(*records)
         dtype = infer_dtype(values)
         if dtype == np.object:
             values = [ComparableArrayWrapper(v) for v in values]
         return SensorData(self.name, np.asarray(times), np.asarray(values))
 
+    def get(self):
+        return self._sensor_data(self._telstate.get_range(self.name, st=0))
+
+    def get_range(self, start_time, end_time, categorical=None):
+        """Retrieve the values relevant to a time range from telstate.
+
+        This only transfers the values in [`start_time`, `end_time`) plus the
+        last value before `start_time` and the first value at or after
+        `end_time` instead of the entire sensor history, which matters for
+        long-lived sensors in a shared telstate. A single request normally
+        suffices, as it also covers :data:`TELSTATE_LOOKAHEAD` seconds after
+        `end_time`. Numerical sensors without a value in that period are
+        searched further ahead, while categorical sensors don't need it.
+        """
+        records = self._telstate.get_range(self.name, st=start_time,
+                                           et=end_time + TELSTATE_LOOKAHEAD,
+                                           include_previous=True)
+        # Keep records up to and including the first one at or after end_time
+        after_end = next((n for n, (value, time) in enumerate(records) if time >= end_time), None)
+        if after_end is not None:
+            return self._sensor_data(records[:after_end + 1])
+        sensor_data = self._sensor_data(records)
+        if categorical is None:
+            categorical = not np.issubdtype(sensor_data.value.dtype, np.floating)
+        if categorical:
+            return sensor_data
+        return self._sensor_data(records + self._next_record(end_time + TELSTATE_LOOKAHEAD))
+
+    def _next_record(self, time):
+        """First record at or after `time`, as a list with at most one record.
+
+        Telstate can only be asked for records in a time range, so search
+        forward in windows of increasing size, which typically finds it in
+        the first few windows. This stops early if the latest record
+        precedes `time`.
+        """
+        latest = self._telstate.get_range(self.name)
+        if not latest or latest[-1][1] < time:
+            return []
+        window = 2 * TELSTATE_LOOKAHEAD
+        while True:
+            records = self._telstate.get_range(self.name, st=time, et=time + window,
+                                               include_end=True)
+            if records:
+                return records[:1]
+            window *= 2
+
 
 # -------------------------------------------------------------------------------------------------
 # -- Utility functions
@@ -394,6 +482,10 @@ class TelstateSensorGetter(SensorGetter):
 def get_sensor_from_katstore(store, name, start_time, end_time):
     """Get raw sensor data from katstore (CAM's central sensor database).
 
+    This uses a :class:`~katdal.katstore.KatstoreClient` shared by all
+    callers with the same `store`, which reuses its connections and caches
+    the results by (sensor, time range).
+
     Parameters
     ----------
     store : string
@@ -417,33 +509,9 @@ def get_sensor_from_katstore(store, name, start_time, end_time):
     KeyError
         If the sensor was not found in the store or it has no data in time range
     """
-    # The sensor name won't be in sensor store if it contains invalid characters
-    if not isidentifier(name):
-        raise KeyError("Sensor name '%s' is not valid Python identifier" % (name,))
-    with requests.Session() as session:
-        url = "http://%s/katstore/api/query" % (store,)
-        params = {'sensor': name, 'start_time': start_time, 'end_time': end_time,
-                  'limit': 1000000, 'include_value_time': 'True'}
-        try:
-            response = session.get(url, params=params)
-        except requests.exceptions.ConnectionError as exc:
-            err = ConnectionError("Could not connect to sensor store '%s'" % (store,))
-            raise_from(err, exc)
-        with response:
-            try:
-                response.raise_for_status()
-                sensor_data = response.json()['data']
-                samples = [(rec['value_time'], rec['value'], rec['status'])
-                           for rec in sensor_data if rec['sensor'] == name]
-            except (ValueError, IndexError, TypeError, KeyError,
-                    requests.exceptions.RequestException) as exc:
-                err = RuntimeError("Could not retrieve samples from '%s' (%d: %s)" %
-                                   (url, response.status_code, response.reason))
-                raise_from(err, exc)
-        if not samples:
-            raise KeyError("Sensor store has no data for sensor '%s'" % (name,))
-        samples = np.rec.fromrecords(samples, names='timestamp,value,status')
-        return RecordSensorGetter(samples, name)
+    # Importing requests is slow and only needed if there is a sensor store
+    from .katstore import katstore_client
+    return katstore_client(store).get(name, start_time, end_time)
 
 
 def dummy_sensor_getter(name, value=None, dtype=np.float64, timestamp=0.0):
@@ -493,6 +561,38 @@ def dummy_sensor_getter(name, value=None, dtype=np.float64, timestamp=0.0):
     return SimpleSensorGetter(name, np.array([timestamp]), np.array([value]))
 
 
+# Sensor statuses that indicate a valid sensor value
+VALID_STATUSES = ('nominal', 'warn', 'error')
+# Maximum number of differing duplicates that are logged individually per sensor
+MAX_LOGGED_DUPLICATES = 10
+
+
+def _log_differing_duplicates(name, x, y, z, last_of_run, unique_ind):
+    """Log duplicate timestamps with differing values or statuses (for debugging)."""
+    # Determine the index of the x value chosen to represent each original x value (used to pick y values too)
+    duplicates = (~last_of_run).nonzero()[0]
+    if len(duplicates) == 0:
+        return
+    replacement = unique_ind[len(unique_ind) - np.cumsum(last_of_run[::-1])[::-1]]
+    replacement = replacement[duplicates]
+    for field, values in (('values', y), ('statuses', z)):
+        if values is None:
+            continue
+        # All duplicates should have the same y and z values - complain otherwise, but continue
+        differs = np.array([values[r] != values[n] for r, n in zip(replacement, duplicates)],
+                           dtype=bool).reshape(-1) if values.dtype == np.object_ else \
+            (values[replacement] != values[duplicates]).reshape(len(duplicates), -1).any(axis=-1)
+        differs = differs.nonzero()[0]
+        if len(differs) == 0:
+            continue
+        logger.debug("Sensor %r has %d duplicate timestamps with different %s",
+                     name, len(differs), field)
+        for ind in differs[:MAX_LOGGED_DUPLICATES]:
+            logger.debug("At %s, sensor %r has %s of %r and %r - keeping last one",
+                         katpoint.Timestamp(x[duplicates[ind]]).local(), name, field,
+                         values[duplicates[ind]], values[replacement[ind]])
+
+
 def remove_duplicates_and_invalid_values(sensor):
     """Remove duplicate timestamps and invalid values from sensor data.
 
@@ -523,47 +623,310 @@ def remove_duplicates_and_invalid_values(sensor):
     x = sensor.timestamp
     y = sensor.value
     z = sensor.status
-    # Sort x via mergesort, as it is usually already sorted and stability is important
-    sort_ind = np.argsort(x, kind='mergesort')
-    x, y = x[sort_ind], y[sort_ind]
-    # Array contains True where an x value is unique or the last of a run of identical x values
-    last_of_run = np.asarray(list(np.diff(x) != 0) + [True])
-    # Discard the False values, as they represent duplicates - simultaneously keep last of each run of duplicates
-    unique_ind = last_of_run.nonzero()[0]
-    # Determine the index of the x value chosen to represent each original x value (used to pick y values too)
-    replacement = unique_ind[len(unique_ind) - np.cumsum(last_of_run[::-1])[::-1]]
-    # All duplicates should have the same y and z values - complain otherwise, but continue
-    y_differs = [n for (r, n) in zip(replacement, range(len(y))) if r != n and y[r] != y[n]]
-    if y_differs:
-        logger.debug("Sensor %r has duplicate timestamps with different values",
-                     sensor.name)
-        for ind in y_differs:
-            logger.debug("At %s, sensor %r has values of %s and %s - "
-                         "keeping last one", katpoint.Timestamp(x[ind]).local(),
-                         sensor.name, y[ind], y[replacement[ind]])
-    if z is not None:
-        z_differs = [n for (r, n) in zip(replacement, range(len(z))) if z[r] != z[n]]
-        if z_differs:
-            logger.debug("Sensor %r has duplicate timestamps with different statuses",
-                         sensor.name)
-            for ind in z_differs:
-                logger.debug("At %s, sensor %r has statuses of %r and %r - "
-                             "keeping last one", katpoint.Timestamp(x[ind]).local(),
-                             sensor.name, z[ind], z[replacement[ind]])
+    if len(x) > 1 and not np.all(x[1:] > x[:-1]):
+        # Sort x via mergesort, as it is usually already sorted and stability is important
+        sort_ind = np.argsort(x, kind='mergesort')
+        x, y = x[sort_ind], y[sort_ind]
+        z = z[sort_ind] if z is not None else None
+        # Array contains True where an x value is unique or the last of a run of identical x values
+        last_of_run = np.ones(len(x), dtype=bool)
+        last_of_run[:-1] = x[1:] != x[:-1]
+        # Discard the False values, as they represent duplicates - simultaneously keep last of each run of duplicates
+        unique_ind = last_of_run.nonzero()[0]
+        if logger.isEnabledFor(logging.DEBUG):
+            _log_differing_duplicates(sensor.name, x, y, z, last_of_run, unique_ind)
+    else:
+        # Strictly increasing timestamps (the usual case) have nothing to remove
+        unique_ind = np.arange(len(x))
     # Remove entries where 'status' implies invalid values, if 'status' is present
     if z is not None:
+        status = z[unique_ind]
         # Explicitly cast status to string type, as k7_augment produced sensors with integer statuses
-        status = z[unique_ind].astype('|S7')
-        unique_ind = unique_ind[(status == b'nominal') | (status == b'warn') |
-                                (status == b'error')]
+        if status.dtype.kind not in 'SU':
+            status = status.astype('|S7')
+        valid = [s.encode('ascii') if status.dtype.kind == 'S' else s for s in VALID_STATUSES]
+        unique_ind = unique_ind[np.isin(status, valid)]
     # Strip 'status' / z field from final output as its job is done
+    if len(unique_ind) == len(x):
+        return SensorData(sensor.name, x, y)
     return SensorData(sensor.name, x[unique_ind], y[unique_ind])
 
+# -------------------------------------------------------------------------------------------------
+# -- CLASS :  DiskSensorCache
+# -------------------------------------------------------------------------------------------------
+
+
+def _props_key(props):
+    """Stable string representation of sensor properties, naming any functions."""
+    def describe(value):
+        if callable(value):
+            return '%s.%s' % (getattr(value, '__module__', ''),
+                              getattr(value, '__qualname__', getattr(value, '__name__', '')))
+        return repr(value)
+    return ','.join('%s=%s' % (key, describe(props[key])) for key in sorted(props))
+
+
+def _pack_values(values):
+    """Turn list of categorical sensor values into array and matching unpack flag."""
+    if all(isinstance(value, np.ndarray) and value.dtype != np.object_ for value in values):
+        shapes = set((value.shape, value.dtype) for value in values)
+        if len(shapes) == 1:
+            return np.stack(values), False
+    elif all(isinstance(value, (str, unicode)) for value in values) or \
+            all(isinstance(value, (bool, int, float, np.number, np.bool_)) for value in values):
+        array = np.array(values)
+        if array.dtype != np.object_:
+            return array, True
+    array = np.empty(len(values), dtype=object)
+    for n, value in enumerate(values):
+        array[n] = value
+    return array, False
+
+
+class DiskSensorCache(object):
+    """Persistent store of extracted sensor data in a directory on disk.
+
+    Extracting sensors (and especially computing virtual sensors such as
+    pointing coordinates and calibration corrections) can be expensive.
+    This stores the interpolated sensor data as NumPy ``.npz`` files so that
+    it can be reused when the data set is opened again. Each entry is keyed
+    by the data set identity, sensor name, extraction properties and data
+    timestamps, so that a change in any of them results in a cache miss.
+
+    Numerical sensors and categorical sensors with string, scalar or
+    array values are stored as plain arrays, while other categorical values
+    (e.g. :class:`katpoint.Target` objects) are pickled.
+
+    Parameters
+    ----------
+    directory : string
+        Directory in which to store sensor data (created if it does not exist)
+    identity : string
+        Unique identity of the data set (such as file name, size and
+        modification time, or capture block ID and stream name)
+    """
+
+    def __init__(self, directory, identity):
+        self.directory = directory
+        self.identity = identity
+        try:
+            os.makedirs(directory)
+        except OSError:
+            if not os.path.isdir(directory):
+                raise
+
+    def __repr__(self):
+        """Short human-friendly string representation of disk sensor cache."""
+        return "<katdal.%s %r identity=%r at 0x%x>" % \
+               (self.__class__.__name__, self.directory, self.identity, id(self))
+
+    def _filename(self, name, timestamps, props):
+        """Name of file storing sensor data for given sensor and setup."""
+        key = hashlib.sha1()
+        for part in (self.identity, name, _props_key(props)):
+            key.update(part.encode('utf-8') + b'\0')
+        key.update(np.ascontiguousarray(timestamps, dtype=np.float64).tobytes())
+        return os.path.join(self.directory, key.hexdigest() + '.npz')
+
+    def load(self, name, timestamps, props):
+        """Load extracted sensor data from disk.
+
+        Parameters
+        ----------
+        name : string
+            Sensor name
+        timestamps : array of float
+            Correlator data timestamps onto which sensor data was interpolated
+        props : dict
+            Sensor properties used during extraction
+
+        Returns
+        -------
+        data : array or :class:`CategoricalData` object or None
+            Extracted sensor data, or None if not found on disk
+        """
+        filename = self._filename(name, timestamps, props)
+        if not os.path.exists(filename):
+            return None
+        try:
+            with np.load(filename, allow_pickle=True) as stored:
+                if 'value' in stored:
+                    return stored['value']
+                values = stored['unique_values']
+                values = values.tolist() if stored['unpack'] else list(values)
+                values = [ComparableArrayWrapper(value) for value in values]
+                return CategoricalData([values[n] for n in stored['indices']],
+                                       stored['events'])
+        except Exception as err:
+            logger.warning("Could not load sensor '%s' from %s, ignoring it: %s",
+                           name, filename, err)
+            return None
+
+    def save(self, name, timestamps, props, data):
+        """Save extracted sensor data to disk.
+
+        Parameters
+        ----------
+        name : string
+            Sensor name
+        timestamps : array of float
+            Correlator data timestamps onto which sensor data was interpolated
+        props : dict
+            Sensor properties used during extraction
+        data : array or :class:`CategoricalData` object
+            Extracted sensor data (anything else is silently ignored)
+
+        Returns
+        -------
+        saved : bool
+            True if the data was saved
+        """
+        if isinstance(data, np.ndarray) and data.dtype != np.object_:
+            arrays = {'value': data}
+        elif isinstance(data, CategoricalData):
+            unique_values, unpack = _pack_values(data.unique_values)
+            arrays = {'unique_values': unique_values, 'unpack': unpack,
+                      'indices': data.indices, 'events': data.events}
+        else:
+            return False
+        filename = self._filename(name, timestamps, props)
+        # Write to temporary file first so that readers never see partial files
+        temp_filename = '%s.%d.%d.tmp' % (filename, os.getpid(), threading.current_thread().ident)
+        try:
+            with open(temp_filename, 'wb') as f:
+                np.savez(f, **arrays)
+            os.rename(temp_filename, filename)
+        except Exception as err:
+            logger.warning("Could not save sensor '%s' to %s: %s", name, filename, err)
+            if os.path.exists(temp_filename):
+                os.remove(temp_filename)
+            return False
+        return True
+
+
+class _SampleTimes(object):
+    """Sample times of one or more numerical sensors, with interpolation weights.
+
+    Sensors sampled at exactly the same times share a single object, so that
+    the timestamps are only stored once and the search for the samples that
+    straddle each data timestamp is only done once for all of them.
+
+    Parameters
+    ----------
+    timestamps : array of float, shape (*N*,)
+        Sensor sample times (sorted and unique)
+    """
+
+    def __init__(self, timestamps):
+        self.timestamps = timestamps
+        # Weights for the most recent data timestamp arrays, keyed by their ids
+        self._weights = {}
+
+    def weights(self, data_times):
+        """Linear interpolation weights for `data_times`, as used by :func:`numpy.interp`.
+
+        The result is remembered for the last two `data_times` arrays (the
+        full and selected data timestamps, typically), based on identity.
+
+        Returns
+        -------
+        index : array of int, shape (*M*,)
+            Index of sample before each data timestamp (clipped to *N* - 2)
+        dx, dt : array of float, shape (*M*,)
+            Time since that sample and time interval to the next sample
+        direct : array of bool, shape (*M*,)
+            True where the value is copied from a sample instead, at `take`
+        take : array of int, shape (*M*,)
+            Index of sample to copy (before start, after end or exact match)
+        """
+        key = id(data_times)
+        cached = self._weights.get(key)
+        if cached is not None and cached[0] is data_times:
+            return cached[1]
+        t = self.timestamps
+        before = t.searchsorted(data_times, side='right') - 1
+        index = before.clip(0, max(len(t) - 2, 0))
+        dx = data_times - t[index]
+        dt = t[np.minimum(index + 1, len(t) - 1)] - t[index]
+        take = before.clip(0, len(t) - 1)
+        direct = (before < 0) | (before >= len(t) - 1) | (dx == 0)
+        weights = (index, dx, dt, direct, take)
+        if len(self._weights) >= 2:
+            self._weights.clear()
+        self._weights[key] = (data_times, weights)
+        return weights
+
+
+class LazyInterpolator(object):
+    """Numerical sensor data that is interpolated onto data timestamps on demand.
+
+    This stores the cleaned-up sensor samples instead of their interpolated
+    values and only interpolates them onto the data timestamps (typically the
+    selected ones) when the sensor is requested. It produces the same values
+    as :func:`numpy.interp`, but the search for the relevant samples is shared
+    between sensors with the same sample times.
+
+    Parameters
+    ----------
+    name : string
+        Sensor name
+    times : :class:`_SampleTimes` object
+        Sensor sample times (shared with other sensors)
+    values : array, shape (*N*,)
+        Sensor values, one per sample time
+    dtype : :class:`numpy.dtype` object or equivalent, optional
+        Type of interpolated values (float64 by default)
+    """
+
+    def __init__(self, name, times, values, dtype=np.float64):
+        self.name = name
+        self.times = times
+        self.values = values
+        self.dtype = np.dtype(dtype)
+
+    def __repr__(self):
+        """Short human-friendly string representation of lazy interpolator object."""
+        return "<katdal.%s '%s' samples=%d type=%s at 0x%x>" % \
+               (self.__class__.__name__, self.name, len(self.values), self.dtype, id(self))
+
+    def interpolate(self, data_times):
+        """Interpolate sensor values onto `data_times` (array of float)."""
+        index, dx, dt, direct, take = self.times.weights(data_times)
+        values = self.values
+        if len(values) > 1:
+            # Same expression as numpy.interp, to get identical results
+            before = values[index]
+            slope = (values[index + 1] - before) / dt
+            result = (slope * dx + before).astype(self.dtype)
+        else:
+            result = np.empty(len(data_times), self.dtype)
+        result[direct] = values[take[direct]]
+        return result
+
+
 # -------------------------------------------------------------------------------------------------
 # -- CLASS :  SensorCache
 # -------------------------------------------------------------------------------------------------
 
 
+def _wildcard_match(pattern, name):
+    """True if `name` matches `pattern`, which may contain ``*`` wildcards."""
+    regex = '.*'.join(re.escape(part) for part in pattern.split('*'))
+    return re.match('^' + regex + '$', name) is not None
+
+
+def _sensor_window(timestamps, dump_period):
+    """Time range of raw sensor data needed to extract sensor at `timestamps`.
+
+    The sensor getters also return the values on either side of this range,
+    which are needed to interpolate numerical sensors at the first and last dumps.
+    """
+    if len(timestamps) == 0:
+        return 0.0, np.inf
+    return (timestamps[0] - 0.5 * dump_period,
+            timestamps[-1] + 0.5 * dump_period)
+
+
 class SensorCache(MutableMapping):
     """Container for sensor data providing name lookup, interpolation and caching.
 
@@ -626,15 +989,31 @@ class SensorCache(MutableMapping):
         the aliased names and the data of the original sensors.
     store : string, optional
         Hostname / endpoint of katstore webserver to access additional sensors
+    disk_cache : :class:`DiskSensorCache` object, optional
+        Persistent store for extracted actual and virtual sensors, which is
+        consulted before extracting a sensor and updated afterwards
+    lazy_interpolation : {False, True}, optional
+        Keep the samples of numerical sensors (as :class:`LazyInterpolator`
+        objects) and only interpolate them onto the data timestamps when
+        requested, instead of storing interpolated values for all timestamps.
+        This saves memory when sensors are mostly accessed via a selection.
+    float32 : {False, True}, optional
+        Store and return numerical sensor values as float32 to save memory
     """
 
     def __init__(self, cache, timestamps, dump_period, keep=slice(None),
-                 props=None, virtual={}, aliases={}, store=None):
+                 props=None, virtual={}, aliases={}, store=None, disk_cache=None,
+                 lazy_interpolation=False, float32=False):
         super(SensorCache, self).__init__()
-        # This needs to be an RLock because instantiating a virtual sensor
-        # may require further sensor lookups (hopefully without a loop, which
-        # would really cause problems).
+        # The main lock only protects the internal dicts and is never held
+        # while sensor data is fetched or computed. That is serialised per
+        # sensor instead, so that concurrent requests for the same sensor
+        # wait for a single extraction while other sensors proceed in
+        # parallel. The sensor locks need to be RLocks because instantiating
+        # a virtual sensor may require further sensor lookups (hopefully
+        # without a loop, which would really cause problems).
         self._lock = threading.RLock()
+        self._sensor_locks = {}
         # Store internals of the cache in a regular dict
         self._raw = dict(cache)
         self.timestamps = timestamps
@@ -647,13 +1026,20 @@ class SensorCache(MutableMapping):
         for alias, original in aliases.items():
             self.add_aliases(alias, original)
         self.store = store
+        self.disk_cache = disk_cache
+        self.lazy_interpolation = lazy_interpolation
+        self.float32 = float32
+        # Sample times of lazily interpolated sensors, to share them where possible
+        self._sample_times = {}
+        # Most recent time selection as (all timestamps, selected dumps, selected timestamps)
+        self._selection = None
 
     def __str__(self):
         """Verbose human-friendly string representation of sensor cache object."""
         with self._lock:
             names = sorted([key for key in self.keys()])
             maxlen = max([len(name) for name in names])
-            objects = [self.get(name, extract=False) for name in names]
+            objects = [self._raw[name] for name in names]
         obj_reprs = [(("<numpy.ndarray shape=%s type=%s at 0x%x>" % (obj.shape, obj.dtype, id(obj)))
                      if isinstance(obj, np.ndarray) else repr(obj)) for obj in objects]
         actual = ['%s : %s' % (str(name).ljust(maxlen), obj_repr) for name, obj_repr in zip(names, obj_reprs)]
@@ -665,7 +1051,7 @@ class SensorCache(MutableMapping):
     def __repr__(self):
         """Short human-friendly string representation of sensor cache object."""
         with self._lock:
-            sensors = [self.get(name, extract=False) for name in self.keys()]
+            sensors = list(self._raw.values())
         return "<katdal.%s sensors=%d cached=%d virtual=%d at 0x%x>" % \
                (self.__class__.__name__, len(sensors),
                 np.sum([not isinstance(s, SensorGetter) for s in sensors]),
@@ -696,6 +1082,11 @@ class SensorCache(MutableMapping):
         """
         return self.get(name, select=True)
 
+    def _sensor_lock(self, name):
+        """Lock that serialises the retrieval of sensor `name`."""
+        with self._lock:
+            return self._sensor_locks.setdefault(name, threading.RLock())
+
     def _set_keep(self, keep=None):
         """Set time selection for sensor values."""
         if keep is not None:
@@ -722,17 +1113,17 @@ class SensorCache(MutableMapping):
         props = prop_map.setdefault(name, {})
         # Look up properties associated with this class of sensor
         for key, val in prop_map.items():
-            if '*' in key:
-                regex = '.*'.join(re.escape(part) for part in key.split('*'))
-                if re.match('^' + regex + '$', name):
-                    props.update(val)
+            if '*' in key and _wildcard_match(key, name):
+                props.update(val)
         # Any properties passed directly to this method takes precedence
         props.update(kwargs)
         return props
 
     @staticmethod
-    def _extract(sensor_getter, timestamps, dump_period, **props):
-        sensor_data = sensor_getter.get()
+    def _extract(sensor_getter, timestamps, dump_period, interpolate=True, **props):
+        # Only retrieve the raw sensor data relevant to the data set
+        sensor_data = sensor_getter.get_range(*_sensor_window(timestamps, dump_period),
+                                              categorical=props.get('categorical'))
         # Clean up sensor data if non-empty
         if sensor_data:
             # Sort sensor events in chronological order and discard duplicates and unreadable sensor values
@@ -762,7 +1153,9 @@ class SensorCache(MutableMapping):
                     logger.warning("Last data point for sensor '%s' arrives %g seconds "
                                    "before end of data set" %
                                    (sensor_data.name, timestamps[-1] - sensor_timestamps[-1]))
-            sensor_data = np.interp(timestamps, sensor_timestamps, sensor_data.value)
+            # Return the cleaned-up samples instead if interpolation is deferred
+            if interpolate:
+                sensor_data = np.interp(timestamps, sensor_timestamps, sensor_data.value)
         return sensor_data
 
     def add_aliases(self, alias, original):
@@ -827,42 +1220,227 @@ class SensorCache(MutableMapping):
         """
         if select and not extract:
             raise ValueError('Cannot apply selection on raw sensor data')
-        with self._lock:
+        with self._sensor_lock(name):
             try:
                 # First try to load the actual sensor data from cache
-                sensor_data = self._raw[name]
+                with self._lock:
+                    sensor_data = self._raw[name]
             except KeyError:
-                # Otherwise, iterate through virtual sensor templates and look for a match
-                for pattern, create_sensor in self.virtual.items():
-                    # Expand variable names enclosed in braces to the relevant regular expression
-                    # (match anything but slashes, which are preferred delimiters in virtual sensor names)
-                    pattern = re.sub(r'(\{[a-zA-Z_]\w*\})',
-                                     lambda m: '(?P<%s>[^/]+)' % (m.group(0)[1:-1],), pattern)
-                    match = re.match(pattern, name)
-                    if match:
-                        # Call sensor creation function with extracted variables from sensor name
-                        sensor_data = create_sensor(self, name, **match.groupdict())
-                        break
+                # Next, try the persistent cache of previously computed virtual sensors
+                sensor_data = self._load_from_disk(name, kwargs)
+                if sensor_data is not None:
+                    with self._lock:
+                        self._raw[name] = sensor_data
+                    return sensor_data[self.keep] if select else sensor_data
+                # Otherwise, look for a matching virtual sensor template
+                create_sensor, match = self._match_virtual(name)
+                if match:
+                    # Call sensor creation function with extracted variables from sensor name
+                    sensor_data = create_sensor(self, name, **match.groupdict())
+                    self._save_to_disk(name, kwargs, sensor_data)
+                elif self.store:
+                    sensor_data = get_sensor_from_katstore(self.store, name, *self._katstore_window())
                 else:
-                    if self.store:
-                        # Katstore samples sensors at least once every 10 minutes
-                        # Go that far back to support sporadic discrete sensors
-                        start_time = self.timestamps[0] - self.dump_period - 600
-                        end_time = self.timestamps[-1] + self.dump_period + 60
-                        sensor_data = get_sensor_from_katstore(
-                            self.store, name, start_time, end_time)
-                    else:
-                        raise KeyError("Unknown sensor '%s' (does not match actual name or "
-                                       "virtual template and no sensor store provided)" % (name,))
+                    raise KeyError("Unknown sensor '%s' (does not match actual name or "
+                                   "virtual template and no sensor store provided)" % (name,))
             # If this is the first time this sensor is accessed, extract its data and store it in cache, if enabled
             if isinstance(sensor_data, SensorGetter) and extract:
-                props = self._get_props(name, self.props, **kwargs)
-                # If this is the first time any sensor is accessed, obtain all data timestamps via indexer
-                self.timestamps = self.timestamps[:] if not isinstance(self.timestamps, np.ndarray) else self.timestamps
-                sensor_data = self._extract(sensor_data, self.timestamps, self.dump_period, **props)
-                self._raw[name] = sensor_data
+                sensor_data = self._extract_and_store(name, sensor_data, **kwargs)
+        if isinstance(sensor_data, LazyInterpolator):
+            values = sensor_data.interpolate(self._data_times(select))
+            # Selecting a single dump produces a scalar, as it would for an array
+            return values[0] if select and isinstance(self.keep, numbers.Integral) else values
         return sensor_data[self.keep] if select else sensor_data
 
+    def _match_virtual(self, name):
+        """Find virtual sensor template matching `name` as (create_sensor, match)."""
+        for pattern, create_sensor in self.virtual.items():
+            # Expand variable names enclosed in braces to the relevant regular expression
+            # (match anything but slashes, which are preferred delimiters in virtual sensor names)
+            pattern = re.sub(r'(\{[a-zA-Z_]\w*\})',
+                             lambda m: '(?P<%s>[^/]+)' % (m.group(0)[1:-1],), pattern)
+            match = re.match(pattern, name)
+            if match:
+                return create_sensor, match
+        return None, None
+
+    def _katstore_window(self):
+        """Time range of sensor records to request from the sensor store."""
+        timestamps = self._all_timestamps()
+        # Katstore samples sensors at least once every 10 minutes
+        # Go that far back to support sporadic discrete sensors
+        return (timestamps[0] - self.dump_period - 600,
+                timestamps[-1] + self.dump_period + 60)
+
+    def _all_timestamps(self):
+        """All data timestamps as an array."""
+        with self._lock:
+            # If this is the first time any sensor is accessed, obtain all data timestamps via indexer
+            if not isinstance(self.timestamps, np.ndarray):
+                self.timestamps = self.timestamps[:]
+            return self.timestamps
+
+    def _load_from_disk(self, name, props):
+        """Load sensor data from persistent cache, if any (else return None)."""
+        if self.disk_cache is None:
+            return None
+        return self.disk_cache.load(name, self._all_timestamps(), props)
+
+    def _save_to_disk(self, name, props, sensor_data):
+        """Save sensor data to persistent cache, if any."""
+        if self.disk_cache is not None:
+            self.disk_cache.save(name, self._all_timestamps(), props, sensor_data)
+
+    def _extract_and_store(self, name, sensor_getter, **kwargs):
+        """Extract sensor data from getter and cache it (with sensor lock held)."""
+        with self._lock:
+            props = self._get_props(name, self.props, **kwargs)
+        # Snapshot the props for the disk cache key, as _get_props updates them in place
+        disk_props = dict(props)
+        if self.float32:
+            disk_props['float32'] = True
+        sensor_data = self._load_from_disk(name, disk_props)
+        if sensor_data is None:
+            sensor_data = self._extract(sensor_getter, self._all_timestamps(), self.dump_period,
+                                        interpolate=not self.lazy_interpolation, **props)
+            if isinstance(sensor_data, SensorData):
+                sensor_data = self._lazy_interpolator(sensor_data)
+            elif self.float32 and isinstance(sensor_data, np.ndarray):
+                sensor_data = sensor_data.astype(np.float32)
+            self._save_to_disk(name, disk_props, sensor_data)
+        with self._lock:
+            self._raw[name] = sensor_data
+        return sensor_data
+
+    def _lazy_interpolator(self, sensor_data):
+        """Turn cleaned-up numerical sensor samples into a lazy interpolator."""
+        timestamps = sensor_data.timestamp
+        key = (len(timestamps), timestamps[0], timestamps[-1])
+        with self._lock:
+            candidates = self._sample_times.setdefault(key, [])
+            for times in candidates:
+                if np.array_equal(times.timestamps, timestamps):
+                    break
+            else:
+                times = _SampleTimes(timestamps)
+                candidates.append(times)
+        dtype = np.float32 if self.float32 else np.float64
+        values = sensor_data.value
+        if self.float32 and values.dtype == np.float64:
+            values = values.astype(np.float32)
+        return LazyInterpolator(sensor_data.name, times, values, dtype)
+
+    def _data_times(self, select):
+        """Data timestamps to interpolate onto, either selected or all of them.
+
+        The selected timestamps are reused while the selection stays the same,
+        so that lazy interpolators can reuse their interpolation weights.
+        """
+        timestamps = self._all_timestamps()
+        if not select:
+            return timestamps
+        dumps = np.atleast_1d(np.arange(len(timestamps))[self.keep])
+        with self._lock:
+            if (self._selection is None or self._selection[0] is not timestamps
+                    or not np.array_equal(self._selection[1], dumps)):
+                self._selection = (timestamps, dumps, timestamps[dumps])
+            return self._selection[2]
+
+    def prefetch(self, names, workers=16, **kwargs):
+        """Extract and cache several sensors, fetching their raw data concurrently.
+
+        This is equivalent to calling :meth:`get` on each sensor in turn,
+        except that the raw data of all the uncached sensors are retrieved in
+        parallel by a pool of threads. It pays off for sensor getters with a
+        high latency per sensor, such as telstate backed by a Redis server or
+        HDF5 files on a network filesystem.
+
+        Parameters
+        ----------
+        names : string or sequence of strings
+            Sensor names, which may contain ``*`` wildcards that are matched
+            against the actual sensors in the cache. Names without wildcards
+            that are not actual sensors (such as virtual sensors) are passed
+            to :meth:`get` after the actual sensors have been fetched. If there
+            is a sensor store, the ones that do not match a virtual template
+            are first requested from it concurrently. Unknown sensors are
+            skipped.
+        workers : int, optional
+            Number of threads fetching raw sensor data
+        kwargs : dict, optional
+            Additional parameters are passed to :meth:`get`, and apply to all
+            sensors
+
+        Returns
+        -------
+        fetched : list of string
+            Names of the sensors that are now cached (in no particular order)
+        """
+        if isinstance(names, (str, unicode)):
+            names = [names]
+        with self._lock:
+            actual = set()
+            other = []
+            for name in names:
+                if '*' in name:
+                    actual.update(key for key in self._raw if _wildcard_match(name, key))
+                elif name in self._raw:
+                    actual.add(name)
+                else:
+                    other.append(name)
+            getters = [(name, self._raw[name]) for name in actual
+                       if isinstance(self._raw[name], SensorGetter)]
+            categorical = {name: self._get_props(name, self.props).get('categorical')
+                           for name, getter in getters}
+
+        start_time, end_time = _sensor_window(self._all_timestamps(), self.dump_period)
+
+        def fetch(name_getter):
+            name, getter = name_getter
+            try:
+                return name, getter.get_range(start_time, end_time, categorical[name])
+            except KeyError:
+                # Leave it to get() to complain about this one
+                return name, None
+
+        if getters:
+            pool = ThreadPool(min(workers, len(getters)))
+            try:
+                raw_data = pool.map(fetch, getters)
+            finally:
+                pool.close()
+        else:
+            raw_data = []
+        fetched = list(actual - set(name for name, sensor_data in raw_data if sensor_data is None))
+        if self.store:
+            # Request the unknown sensors from the sensor store in one go
+            missing = [name for name in other if self._match_virtual(name)[0] is None]
+            if missing:
+                from .katstore import katstore_client
+                stored = katstore_client(self.store).get_many(missing, *self._katstore_window())
+                with self._lock:
+                    for name, getter in stored.items():
+                        self._raw.setdefault(name, getter)
+        # Now extract and interpolate the raw data without further round trips
+        for name, sensor_data in raw_data:
+            if sensor_data is None:
+                continue
+            getter = SimpleSensorGetter(name, sensor_data.timestamp,
+                                        sensor_data.value, sensor_data.status)
+            with self._sensor_lock(name):
+                with self._lock:
+                    # Another thread may have beaten us to it
+                    uncached = isinstance(self._raw.get(name), SensorGetter)
+                if uncached:
+                    self._extract_and_store(name, getter, **kwargs)
+        for name in other:
+            try:
+                self.get(name, **kwargs)
+            except KeyError:
+                continue
+            fetched.append(name)
+        return fetched
+
     def get_with_fallback(self, sensor_type, names):
         """Sensor values interpolated to correlator data timestamps.
 
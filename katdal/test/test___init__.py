@@ -0,0 +1,89 @@
+################################################################################
+# Copyright (c) 2020, National Research Foundation (Square Kilometre Array)
+#
+# Licensed under the BSD 3-Clause License (the "License"); you may not use
+# this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#   https://opensource.org/licenses/BSD-3-Clause
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+"""Tests for :py:func:`katdal.open`."""
+from __future__ import print_function, division, absolute_import
+from builtins import object, range
+
+import os
+import shutil
+import tempfile
+import threading
+
+import mock
+from nose.tools import assert_equal, assert_raises, assert_true
+
+import katdal
+from katdal.concatdata import ConcatenatedDataSet
+from katdal.test.test_h5datav3 import make_v3_file
+
+
+class TestOpen(object):
+    def setup(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.filenames = [os.path.join(self.tempdir, 'test%d.h5' % (n,)) for n in range(3)]
+        for n, filename in enumerate(self.filenames):
+            make_v3_file(filename, start_time=1500000000.0 + 100.0 * n)
+        self.open_single = katdal._open_single
+        self.opened = []
+
+    def teardown(self):
+        shutil.rmtree(self.tempdir)
+
+    def _open(self, filenames, open_single, **kwargs):
+        """Open `filenames` via `open_single` and return data set and its inputs."""
+        with mock.patch.object(katdal, '_open_single', side_effect=open_single), \
+                mock.patch('katdal.concatdata.ConcatenatedDataSet',
+                           side_effect=ConcatenatedDataSet) as concat:
+            data = katdal.open(filenames, band='l', **kwargs)
+        return data, concat.call_args[0][0]
+
+    def _record_open(self, filename, *args, **kwargs):
+        self.opened.append((filename, threading.current_thread()))
+        return self.open_single(filename, *args, **kwargs)
+
+    def test_order_when_files_finish_out_of_order(self):
+        last_done = threading.Event()
+
+        def open_single(filename, *args, **kwargs):
+            # The first file only finishes after the last one
+            if filename == self.filenames[0]:
+                assert_true(last_done.wait(5))
+            data = self._record_open(filename, *args, **kwargs)
+            if filename == self.filenames[-1]:
+                last_done.set()
+            return data
+        data, datasets = self._open(self.filenames, open_single)
+        assert_equal([filename for filename, thread in self.opened],
+                     self.filenames[1:] + self.filenames[:1])
+        assert_equal([d.name for d in datasets], self.filenames)
+        assert_equal([d.name for d in data.datasets], self.filenames)
+        assert_equal(data.shape, (30, 16, 4))
+
+    def test_exception_reaches_caller(self):
+        def open_single(filename, *args, **kwargs):
+            if filename == self.filenames[1]:
+                raise ValueError('Broken file')
+            return self.open_single(filename, *args, **kwargs)
+        with assert_raises(ValueError):
+            self._open(self.filenames, open_single)
+
+    def test_sequential_open(self):
+        data, datasets = self._open(self.filenames, self._record_open, open_workers=1)
+        assert_equal(self.opened, [(filename, threading.current_thread())
+                                   for filename in self.filenames])
+        assert_equal([d.name for d in datasets], self.filenames)
+        assert_equal(data.shape, (30, 16, 4))
@@ -22,7 +22,7 @@ from functools import partial
 import katpoint
 import numpy as np
 from numpy.testing import assert_array_equal, assert_allclose
-from nose.tools import assert_raises, assert_equal
+from nose.tools import assert_raises, assert_equal, assert_true
 import dask.array as da
 
 from katdal.spectral_window import SpectralWindow
@@ -31,9 +31,12 @@ from katdal.categorical import (ComparableArrayWrapper, CategoricalData,
                                 sensor_to_categorical)
 from katdal.applycal import (complex_interp, get_cal_product, INVALID_GAIN,
                              calc_delay_correction, calc_bandpass_correction,
+                             calc_delay_corrections, calc_bandpass_corrections,
                              calc_gain_correction, apply_vis_correction,
                              apply_weights_correction, apply_flags_correction,
-                             add_applycal_sensors, calc_correction, calibrate_flux)
+                             add_applycal_sensors, calc_correction, calibrate_flux,
+                             CorrectionSegments, CorrectionParams,
+                             calc_correction_per_corrprod)
 from katdal.flags import POSTPROC
 from katdal.visdatav4 import SENSOR_PROPS
 
@@ -396,6 +399,17 @@ class TestCorrectionPerInput(object):
                 assert_array_equal(sensor[n], constant_bandpass)
                 assert_array_equal(sensor[12 + n], bandpass_corrections(m, n))
 
+    def test_batched_corrections(self):
+        indices = [(m, n) for n in range(len(ANTS)) for m in range(len(POLS))]
+        product_sensor = get_cal_product(self.cache, CAL_STREAM, 'K')
+        sensors = calc_delay_corrections(product_sensor, indices, FREQS)
+        for (m, n), sensor in zip(indices, sensors):
+            assert_array_equal(sensor[10 + n], delay_corrections(m, n))
+        product_sensor = get_cal_product(self.cache, CAL_STREAM, 'B')
+        sensors = calc_bandpass_corrections(product_sensor, indices, FREQS, CAL_FREQS)
+        for (m, n), sensor in zip(indices, sensors):
+            assert_array_equal(sensor[12 + n], bandpass_corrections(m, n))
+
     def test_calc_gain_correction(self):
         product_sensor = get_cal_product(self.cache, CAL_STREAM, 'G')
         for n in range(len(ANTS)):
@@ -445,6 +459,19 @@ class TestVirtualCorrectionSensors(object):
                 sensor = self.cache.get(sensor_name)
                 assert_array_equal(sensor[12 + n], bandpass_corrections(m, n))
 
+    def test_corrections_cached_per_product(self):
+        prefix = 'Calibration/Corrections/{}/B/'.format(CAL_STREAM)
+        first_input = ANTS[0] + POLS[0]
+        self.cache.get(prefix + first_input)
+        for inp in INPUTS:
+            assert_true(prefix + inp in self.cache)
+        # Already cached corrections are left alone
+        prefix = 'Calibration/Corrections/{}/K/'.format(CAL_STREAM)
+        last_input = ANTS[-1] + POLS[-1]
+        self.cache[prefix + last_input] = sensor = CategoricalData([1.0], [0, N_DUMPS])
+        self.cache.get(prefix + first_input)
+        assert_true(self.cache.get(prefix + last_input) is sensor)
+
     def test_gain_sensors(self, stream=CAL_STREAM):
         for n, ant in enumerate(ANTS):
             for m, pol in enumerate(POLS):
@@ -514,6 +541,41 @@ class TestCalibrateFlux(object):
         assert_categorical_data_equal(calibrated_sensor, self.sensor)
 
 
+def test_correction_segments():
+    sensors = [CategoricalData([1.0, np.array([2.0, 3.0])], [0, 4, 10]),
+               CategoricalData([np.array([4.0, 5.0]), 6.0, 7.0], [0, 2, 4, 10])]
+    segments = CorrectionSegments.from_sensors(sensors)
+    assert_array_equal(segments.events, [0, 2, 4, 10])
+    assert_array_equal(segments.values, [[1., 1.], [2., 3.], [4., 5.], [6., 6.], [7., 7.]])
+    assert_array_equal(segments.indices, [[0, 2], [0, 3], [1, 4]])
+    corrections, boundaries = segments[slice(3, 5)]
+    assert_array_equal(boundaries, [3, 4, 5])
+    assert_array_equal(corrections, [[[1., 1.], [6., 6.]], [[2., 3.], [7., 7.]]])
+    corrections, boundaries = segments[slice(4, 10)]
+    assert_array_equal(boundaries, [4, 10])
+    assert_array_equal(corrections, [[[2., 3.], [7., 7.]]])
+
+
+def test_per_dump_corrections_with_missing_solutions():
+    # Multi-channel gains, except for an input without any solutions (at all dumps)
+    n_dumps, n_chans = 10, 4
+    gains = (np.arange(n_dumps * n_chans).reshape(n_dumps, n_chans) + 1j).astype(np.complex64)
+    no_solutions = np.full((n_dumps, 1), INVALID_GAIN)
+    inputs = ['m000h', 'm000v']
+    input1_index = np.array([0, 0, 1])
+    input2_index = np.array([0, 1, 1])
+    params = CorrectionParams(inputs, input1_index, input2_index,
+                              {'cal.GAMP_PHASE': [gains, no_solutions]},
+                              {'cal.GAMP_PHASE': lambda g, channels: g[..., channels]})
+    channels = np.s_[1:3]
+    for dump in range(n_dumps):
+        corrections = calc_correction_per_corrprod(dump, channels, params)
+        assert_equal(corrections.shape, (2, 3))
+        g = gains[dump, channels]
+        assert_array_equal(corrections[:, 0], g * g.conj())
+        assert_true(np.isnan(corrections[:, 1:]).all())
+
+
 class TestCalcCorrection(object):
     """Test :func:`~katdal.applycal.calc_correction` function."""
     def setup(self):
@@ -535,6 +597,19 @@ class TestCalcCorrection(object):
                                                         final_cal_products)
         assert_array_equal(corrections, expected_corrections)
 
+    def test_correction_blocks(self):
+        # Blocks of many dumps span several gain solutions, and all inputs
+        # have their final delay and bandpass solutions from dump 16 onwards
+        shape = (N_DUMPS, N_CHANS, N_CORRPRODS)
+        chunks = da.core.normalize_chunks(((16, 42, 42), (48, 80), -1), shape)
+        final_cal_products, corrections = calc_correction(
+            chunks, self.cache, CORRPRODS, CAL_PRODUCTS, FREQS, {'cal': CAL_FREQS})
+        corrections = corrections.compute()
+        for dump in [16, 19, 20, 31, 57, 58, 60, 99]:
+            expected_corrections = corrections_per_corrprod([dump], np.s_[:],
+                                                            final_cal_products)
+            assert_array_equal(corrections[dump:dump+1], expected_corrections)
+
     def test_skip_missing_products(self):
         dump = 15
         channels = np.s_[22:38]
@@ -19,8 +19,11 @@ from __future__ import print_function, division, absolute_import
 
 import numpy as np
 from numpy.testing import assert_array_equal
+from nose.tools import assert_equal
 
-from katdal.categorical import _single_event_per_dump, sensor_to_categorical
+from katdal.categorical import (CategoricalData, ComparableArrayWrapper,
+                                _single_event_per_dump, concatenate_categorical,
+                                sensor_to_categorical)
 
 
 def test_dump_to_event_parsing():
@@ -49,3 +52,34 @@ def test_categorical_sensor_creation():
                        'Sensor->categorical failed')
     assert_array_equal(categ.indices, [0, 1, 0, 1, 0],
                        'Sensor->categorical failed')
+
+
+def test_categorical_data_lookup():
+    data = CategoricalData([1.5, 2.5, 1.5], [0, 2, 5, 6])
+    assert data.indices.dtype == np.int32 and data.events.dtype == np.int32
+    assert data[1] == 1.5
+    assert_array_equal(data[:], [1.5, 1.5, 2.5, 2.5, 2.5, 1.5])
+    assert_array_equal(data[[5, 0]], [1.5, 1.5])
+    assert_array_equal(data[data == 2.5], [2.5, 2.5, 2.5])
+    assert_equal(data[[]].shape, (0,))
+    assert_equal(list(data.segments()),
+                 [(slice(0, 2), 1.5), (slice(2, 5), 2.5), (slice(5, 6), 1.5)])
+    # Replacing the unique values should be reflected in lookups
+    data.unique_values = [value * 2 for value in data.unique_values]
+    assert_array_equal(data[:], [3., 3., 5., 5., 5., 3.])
+    # Array-valued sensors of the same shape become 2-D arrays
+    data = CategoricalData([ComparableArrayWrapper(np.ones(2)),
+                            ComparableArrayWrapper(np.zeros(2))], [0, 1, 3])
+    assert_array_equal(data[1:], [[0., 0.], [0., 0.]])
+
+
+def test_categorical_data_partition_and_align():
+    data = CategoricalData(['a', 'b', 'c', 'a'], [0, 3, 4, 8, 10])
+    split = data.partition(np.array([0, 4, 7, 10]))
+    assert_equal([str(part[:].tolist()) for part in split],
+                 [str(['a', 'a', 'a', 'b']), str(['c', 'c', 'c']), str(['c', 'a', 'a'])])
+    assert_array_equal(split[2].events, [0, 1, 3])
+    assert_array_equal(concatenate_categorical(split)[:], data[:])
+    data.align(np.array([0, 2, 5, 10]))
+    assert_array_equal(data.events, [0, 2, 5, 10])
+    assert_array_equal(data[:], ['a'] * 2 + ['b'] * 3 + ['c'] * 5)
@@ -24,7 +24,7 @@ from nose.tools import (assert_raises, assert_equal, assert_true, assert_false,
                         assert_is_instance, assert_is_none)
 import dask.array as da
 
-from katdal.chunkstore import (ChunkStore, generate_chunks,
+from katdal.chunkstore import (ChunkStore, DirectReader, generate_chunks,
                                StoreUnavailable, ChunkNotFound, BadChunk)
 
 
@@ -224,6 +224,47 @@ class ChunkStoreTestBase(object):
         # Try an empty slice on a zero-dimensional array (but why?)
         self.put_get_chunk('z', ())
 
+    def test_get_chunk_into(self):
+        name = self.array_name('y')
+        s = (slice(3, 7), slice(2, 5), slice(0, 2))
+        self.put_get_chunk('y', s)
+        # Fill non-contiguous part of bigger array
+        out = np.zeros((5, 4, 2))
+        self.store.get_chunk_into(name, s, self.y.dtype, out[1:, 1:])
+        assert_array_equal(out[1:, 1:], self.y[s])
+        assert_array_equal(out[0], 0.0)
+        assert_array_equal(out[:, 0], 0.0)
+        assert_raises(BadChunk, self.store.get_chunk_into, name, s,
+                      self.x.dtype, np.zeros((4, 3, 2), self.x.dtype))
+        missing = (slice(0, 1), slice(0, 1), slice(0, 1))
+        assert_raises(ChunkNotFound, self.store.get_chunk_into,
+                      self.array_name('haha'), missing, self.y.dtype, out[:1, :1, :1])
+
+    def test_direct_reader(self):
+        self.put_dask_array('big_y')
+        array_name, dask_array, offset = self.make_dask_array('big_y')
+        reader = DirectReader(self.store, array_name, dask_array.chunks, dask_array.dtype)
+        assert_equal(reader.shape, self.big_y.shape)
+        # Selection that cuts through chunks
+        index = np.s_[1:7, 5:51, 0:2]
+        out = np.empty((6, 46, 2), self.big_y.dtype)
+        reader.store_into(index, out).compute()
+        assert_array_equal(out, self.big_y[index])
+        # In-place transform that subtracts the same data again
+
+        def subtract(out, block):
+            out -= block
+
+        reader = reader.with_transform(subtract, dask_array)
+        reader.store_into(index, out).compute()
+        assert_array_equal(out, 0.0)
+        assert_raises(ValueError, reader.with_transform, subtract, dask_array.rechunk(4))
+        # Missing chunks are replaced by default value
+        reader = DirectReader(self.store, self.array_name('haha'), dask_array.chunks,
+                              dask_array.dtype, default_value=17)
+        reader.store_into(index, out).compute()
+        assert_array_equal(out, 17.0)
+
     def test_put_chunk_noraise(self):
         name = self.array_name('x')
         self.store.create_array(name)
@@ -52,7 +52,7 @@ from urllib3.util.retry import Retry
 import numpy as np
 from numpy.testing import assert_array_equal
 from nose import SkipTest
-from nose.tools import assert_raises, assert_equal, timed
+from nose.tools import assert_raises, assert_equal, assert_true, timed
 import requests
 import jwt
 
@@ -120,6 +120,21 @@ class TestReadArray(object):
             warnings.simplefilter('ignore', category=UserWarning)
             self._test(np.zeros(100, dtype))
 
+    def testOut(self):
+        array = np.arange(20.).reshape(4, 5)
+        fp = io.BytesIO()
+        np.save(fp, array)
+        # Read into non-contiguous part of bigger array
+        big = np.zeros((4, 10))
+        fp.seek(0)
+        out = read_array(fp, big[:, 2:7])
+        np.testing.assert_equal(big[:, 2:7], array)
+        assert_true(out.base is big)
+        # Ignore output array with the wrong shape
+        fp.seek(0)
+        out = read_array(fp, np.zeros((5, 4)))
+        np.testing.assert_equal(out, array)
+
     def testBadVersion(self):
         data = b'\x93NUMPY\x03\x04'     # Version 3.4
         fp = io.BytesIO(data)
@@ -32,7 +32,8 @@ import katsdptelstate
 
 from katdal.chunkstore import generate_chunks
 from katdal.chunkstore_npy import NpyFileChunkStore
-from katdal.datasources import ChunkStoreVisFlagsWeights, TelstateDataSource, view_l0_capture_stream
+from katdal.datasources import (ChunkStoreVisFlagsWeights, TelstateDataSource,
+                                view_l0_capture_stream, _sensor_keys)
 from katdal.flags import DATA_LOST
 
 
@@ -262,6 +263,33 @@ class TestChunkStoreVisFlagsWeights(object):
             })
 
 
+class FakeRedisPipeline(object):
+    """Pipeline that answers TYPE queries from an in-memory telstate."""
+    def __init__(self, client):
+        self._client = client
+        self._keys = []
+
+    def type(self, key):
+        self._keys.append(key)
+
+    def execute(self):
+        self._client.round_trips += 1
+        telstate = self._client.telstate
+        return [b'none' if key not in telstate else
+                b'string' if telstate.is_immutable(key) else b'zset'
+                for key in self._keys]
+
+
+class FakeRedisClient(object):
+    """Just enough of a Redis client to test pipelined key discovery."""
+    def __init__(self, telstate):
+        self.telstate = telstate
+        self.round_trips = 0
+
+    def pipeline(self, transaction=True):
+        return FakeRedisPipeline(self)
+
+
 class TestTelstateDataSource(object):
     def setup(self):
         self.tempdir = tempfile.mkdtemp()
@@ -280,6 +308,18 @@ class TestTelstateDataSource(object):
             data_source.timestamps,
             np.arange(20, dtype=np.float32) * 2 + 123456912)
 
+    def test_sensor_keys(self):
+        self.telstate['attr'] = 1
+        self.telstate.add('sensor', 1.0, ts=1.0)
+        self.telstate.add('sensor', 2.0, ts=2.0)
+        self.telstate.add('other_sensor', 'a', ts=1.0)
+        expected = ['other_sensor', 'sensor']
+        assert_equal(_sensor_keys(self.telstate), expected)
+        client = FakeRedisClient(self.telstate)
+        self.telstate._r = client
+        assert_equal(_sensor_keys(self.telstate), expected)
+        assert_equal(client.round_trips, 1)
+
     def test_upgrade_flags(self):
         shape = (20, 16, 40)
         view, cbid, sn, l0_data, l1_flags_data = \
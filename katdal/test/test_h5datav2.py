@@ -0,0 +1,153 @@
+################################################################################
+# Copyright (c) 2020, National Research Foundation (Square Kilometre Array)
+#
+# Licensed under the BSD 3-Clause License (the "License"); you may not use
+# this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#   https://opensource.org/licenses/BSD-3-Clause
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+"""Tests for :py:mod:`katdal.h5datav2`."""
+from __future__ import print_function, division, absolute_import
+from builtins import object, range
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import h5py
+from nose.tools import assert_equal
+
+from katdal.h5datav2 import H5DataV2
+from katdal.concatdata import ConcatenatedDataSet
+from katdal.lazy_indexer import DaskLazyIndexer
+
+
+ANTENNA = 'ant1, -30:43:17.3, 21:24:38.5, 1038.0, 12.0'
+TARGET = 'PKS 1934-63, radec, 19:39:25.03, -63:42:45.7'
+
+
+def _sensor(group, name, timestamps, values, value_dtype='S64'):
+    """Create sensor dataset `name` in `group` with the given samples."""
+    dtype = [('timestamp', np.float64), ('value', value_dtype), ('status', 'S7')]
+    data = np.array([(ts, value, b'nominal') for ts, value in zip(timestamps, values)], dtype=dtype)
+    return group.create_dataset(name, data=data)
+
+
+def make_v2_file(filename, num_dumps=10, num_chans=16, dump_period=2.0,
+                 start_time=1500000000.0, duplicate_dump=False):
+    """Create a minimal synthetic v2 file with a single antenna and 4 products.
+
+    If `duplicate_dump` is True, an extra final dump is added with the same
+    timestamp as the one before it (as produced by a stop packet in k7_capture).
+    Returns the raw correlator data, flags and weights.
+    """
+    corrprods = np.array([['ant1h', 'ant1h'], ['ant1v', 'ant1v'],
+                          ['ant1h', 'ant1v'], ['ant1v', 'ant1h']])
+    shape = (num_dumps + int(duplicate_dump), num_chans, len(corrprods))
+    rs = np.random.RandomState(int(start_time) % 1000)
+    vis = rs.standard_normal(shape + (2,)).astype(np.float32)
+    flags = rs.randint(0, 256, size=shape).astype(np.uint8)
+    weights = rs.randint(0, 256, size=shape).astype(np.uint8)
+    timestamps = start_time + dump_period * np.arange(num_dumps)
+    if duplicate_dump:
+        timestamps = np.r_[timestamps, timestamps[-1]]
+    sensor_times = [start_time - 10.0, start_time + 0.5 * num_dumps * dump_period]
+    with h5py.File(filename, 'w') as f:
+        f.attrs['version'] = '2.4'
+        f.attrs['augment_ts'] = start_time
+        data_group = f.create_group('Data')
+        data_group.create_dataset('correlator_data', data=vis, chunks=(2, 4, 4, 2))
+        data_group.create_dataset('timestamps', data=timestamps)
+        markup_group = f.create_group('Markup')
+        markup_group.create_dataset('flags', data=flags, chunks=(2, 4, 4))
+        markup_group.create_dataset('weights', data=weights, chunks=(2, 4, 4))
+        labels = np.array([(start_time, b'track')], dtype=[('timestamp', np.float64), ('label', 'S64')])
+        markup_group.create_dataset('labels', data=labels)
+        f.create_group('History').create_dataset('script_log', data=np.array(
+            [(start_time, b'started')], dtype=[('timestamp', np.float64), ('log', 'S64')]))
+        config_group = f.create_group('MetaData/Configuration')
+        correlator_group = config_group.create_group('Correlator')
+        correlator_group.attrs['int_time'] = dump_period
+        correlator_group.attrs['n_chans'] = num_chans
+        correlator_group.attrs['bandwidth'] = 400e6
+        correlator_group.attrs['bls_ordering'] = corrprods.astype('S')
+        config_group.create_group('Observation').attrs['script_ants'] = 'ant1'
+        config_group.create_group('Antennas/ant1').attrs['description'] = ANTENNA
+        sensors_group = f.create_group('MetaData/Sensors')
+        _sensor(sensors_group, 'RFE/center-frequency-hz', sensor_times[:1], [1822e6], np.float64)
+        _sensor(sensors_group, 'Antennas/ant1/activity', sensor_times, [b'slew', b'track'])
+        _sensor(sensors_group, 'Antennas/ant1/target', sensor_times[:1], [TARGET.encode()])
+    return vis, flags, weights
+
+
+class TestVisLikeData(object):
+    """Compare vis / weights / flags with selections made on the raw datasets."""
+    def setup(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.filenames = [os.path.join(self.tempdir, 'test%d.h5' % (n,)) for n in range(2)]
+        # The first file has a duplicate final dump that should be ignored
+        self.raw = [make_v2_file(self.filenames[0], duplicate_dump=True),
+                    make_v2_file(self.filenames[1], num_dumps=6, start_time=1500000100.0)]
+        self.raw[0] = tuple(data[:10] for data in self.raw[0])
+
+    def teardown(self):
+        shutil.rmtree(self.tempdir)
+
+    @staticmethod
+    def _expected(raw, flags_mask=0xff):
+        """Vis, weights and flags as extracted from the raw datasets."""
+        vis, flags, weights = raw
+        return (vis.view(np.complex64)[..., 0].conj(),
+                weights.astype(np.float32),
+                np.bitwise_and(flags, flags_mask) != 0)
+
+    def test_selection(self):
+        d = H5DataV2(self.filenames[0])
+        assert_equal(d.shape, (10, 16, 4))
+        time_keep = np.zeros(10, dtype=bool)
+        time_keep[[1, 2, 5, 9]] = True
+        d.select(dumps=time_keep, channels=slice(3, 11), corrprods=[0, 2], flags='cam')
+        indexers = [d.vis, d.weights, d.flags]
+        # KAT-7 flags use the np.packbits convention (bit 0 = MSB)
+        cam_mask = 0x20
+        for expected, indexer in zip(self._expected(self.raw[0], flags_mask=cam_mask), indexers):
+            expected = expected[time_keep][:, 3:11][:, :, [0, 2]]
+            np.testing.assert_array_equal(indexer[:], expected)
+            np.testing.assert_array_equal(indexer[1:3, ::2, -1], expected[1:3, ::2, -1])
+            np.testing.assert_array_equal(indexer[[3, 0], 4], expected[[3, 0], 4])
+        # Joint loading returns the same data
+        joint = DaskLazyIndexer.get(indexers, np.s_[2:])
+        for expected, data in zip(self._expected(self.raw[0], flags_mask=cam_mask), joint):
+            np.testing.assert_array_equal(data, expected[time_keep][2:, 3:11][:, :, [0, 2]])
+
+    def test_integer_indices(self):
+        d = H5DataV2(self.filenames[0])
+        d_keepdims = H5DataV2(self.filenames[0], keepdims=True)
+        for expected, indexer, indexer_keepdims in zip(self._expected(self.raw[0]),
+                                                       [d.vis, d.weights, d.flags],
+                                                       [d_keepdims.vis, d_keepdims.weights,
+                                                        d_keepdims.flags]):
+            np.testing.assert_array_equal(indexer[3], expected[3])
+            np.testing.assert_array_equal(indexer[-1, 2, 1], expected[-1, 2, 1])
+            np.testing.assert_array_equal(indexer_keepdims[3], expected[3:4])
+            np.testing.assert_array_equal(indexer_keepdims[-1, 2, 1], expected[-1:, 2:3, 1:2])
+            np.testing.assert_array_equal(indexer_keepdims[2:5, -1], expected[2:5, -1:])
+
+    def test_concatenated(self):
+        d = ConcatenatedDataSet([H5DataV2(filename, keepdims=True) for filename in self.filenames])
+        assert_equal(d.shape, (16, 16, 4))
+        expected = [np.concatenate(data) for data in zip(*[self._expected(raw) for raw in self.raw])]
+        for expected, indexer in zip(expected, [d.vis, d.weights, d.flags]):
+            np.testing.assert_array_equal(indexer[:], expected)
+            np.testing.assert_array_equal(indexer[8:12, 5], expected[8:12, 5:6])
+            np.testing.assert_array_equal(indexer[12], expected[12:13])
+            np.testing.assert_array_equal(indexer[[1, 14], 0, -1], expected[[1, 14], :1, -1:])
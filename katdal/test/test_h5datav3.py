@@ -0,0 +1,179 @@
+################################################################################
+# Copyright (c) 2020, National Research Foundation (Square Kilometre Array)
+#
+# Licensed under the BSD 3-Clause License (the "License"); you may not use
+# this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#   https://opensource.org/licenses/BSD-3-Clause
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+"""Tests for :py:mod:`katdal.h5datav3`."""
+from __future__ import print_function, division, absolute_import
+from builtins import object, range
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import h5py
+from nose.tools import assert_equal, assert_in, assert_not_in
+
+from katdal.h5datav3 import H5DataV3, _leaf_links
+from katdal.concatdata import ConcatenatedDataSet
+from katdal.lazy_indexer import DaskLazyIndexer
+
+
+ANTENNA = 'm000, -30:42:39.8, 21:26:38.0, 1035.0, 13.5'
+TARGET = 'PKS 1934-63, radec, 19:39:25.03, -63:42:45.7'
+SENSOR_DTYPE = [('timestamp', np.float64), ('value', 'S64'), ('status', 'S7')]
+
+
+def _sensor(group, name, timestamps, values):
+    """Create sensor dataset `name` in `group` with the given samples."""
+    data = np.array([(ts, value, b'nominal') for ts, value in zip(timestamps, values)],
+                    dtype=SENSOR_DTYPE)
+    return group.create_dataset(name, data=data)
+
+
+def make_v3_file(filename, num_dumps=10, num_chans=16, dump_period=2.0,
+                 start_time=1500000000.0, duplicate_dump=False):
+    """Create a minimal synthetic v3 file with a single antenna and 4 products.
+
+    If `duplicate_dump` is True, an extra final dump is added with the same
+    timestamp as the one before it (as produced by a stop packet in ingest).
+    Returns the raw correlator data, flags, weights and channel weights.
+    """
+    corrprods = np.array([['m000h', 'm000h'], ['m000v', 'm000v'],
+                          ['m000h', 'm000v'], ['m000v', 'm000h']])
+    shape = (num_dumps + int(duplicate_dump), num_chans, len(corrprods))
+    rs = np.random.RandomState(int(start_time) % 1000)
+    vis = rs.standard_normal(shape + (2,)).astype(np.float32)
+    flags = rs.randint(0, 256, size=shape).astype(np.uint8)
+    weights = rs.randint(0, 256, size=shape).astype(np.uint8)
+    weights_channel = rs.uniform(size=shape[:2]).astype(np.float32)
+    timestamps = start_time + dump_period * np.arange(num_dumps)
+    if duplicate_dump:
+        timestamps = np.r_[timestamps, timestamps[-1]]
+    sensor_times = [start_time - 10.0, start_time + 0.5 * num_dumps * dump_period]
+    with h5py.File(filename, 'w') as f:
+        f.attrs['version'] = '3.0'
+        data_group = f.create_group('Data')
+        data_group.create_dataset('correlator_data', data=vis, chunks=(2, 4, 4, 2))
+        data_group.create_dataset('flags', data=flags, chunks=(2, 4, 4))
+        data_group.create_dataset('weights', data=weights, chunks=(2, 4, 4))
+        data_group.create_dataset('weights_channel', data=weights_channel, chunks=(2, 4))
+        data_group.create_dataset('timestamps', data=timestamps)
+        data_group['timestamps'].attrs['timestamp_reference'] = 'centroid'
+        tm_group = f.create_group('TelescopeModel')
+        cbf_group = tm_group.create_group('cbf')
+        cbf_group.attrs['class'] = 'CorrelatorBeamformer'
+        cbf_group.attrs['int_time'] = dump_period
+        cbf_group.attrs['scale_factor_timestamp'] = 1712e6
+        cbf_group.attrs['sync_time'] = start_time - 1000.0
+        cbf_group.attrs['n_chans'] = num_chans
+        cbf_group.attrs['bandwidth'] = 856e6
+        cbf_group.attrs['bls_ordering'] = corrprods.astype('S')
+        ant_group = tm_group.create_group('m000')
+        ant_group.attrs['class'] = 'AntennaPositioner'
+        ant_group.attrs['description'] = ANTENNA
+        _sensor(ant_group, 'activity', sensor_times, [b'slew', b'track'])
+        _sensor(ant_group, 'target', sensor_times[:1], [TARGET.encode()])
+    return vis, flags, weights, weights_channel
+
+
+class TestH5DataV3(object):
+    def setup(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, 'test.h5')
+        make_v3_file(self.filename)
+
+    def teardown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_lazy_sensors_with_sibling_names(self):
+        # Names with characters that sort before '/' follow groups of the same prefix
+        with h5py.File(self.filename, 'a') as f:
+            ant_group = f['TelescopeModel/m000']
+            _sensor(ant_group, 'sub/x', [0.0], [b'x'])
+            _sensor(ant_group, 'sub.y', [0.0], [b'y'])
+            _sensor(ant_group, 'sub-z', [0.0], [b'z'])
+            assert_equal(_leaf_links(ant_group),
+                         ['activity', 'sub-z', 'sub.y', 'sub/x', 'target'])
+        d = H5DataV3(self.filename, band='l', lazy_sensors=True)
+        for path, value in [('sub/x', 'x'), ('sub.y', 'y'), ('sub-z', 'z')]:
+            sensor_name = 'Antennas/m000/' + path
+            assert_in(sensor_name, d.sensor)
+            assert_equal(d.sensor.get(sensor_name, extract=False).get().value[0], value)
+        assert_not_in('Antennas/m000/sub', d.sensor)
+        assert_equal(d.sensor['Antennas/m000/activity'][-1], 'track')
+
+
+class TestVisLikeData(object):
+    """Compare vis / weights / flags with selections made on the raw datasets."""
+    def setup(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.filenames = [os.path.join(self.tempdir, 'test%d.h5' % (n,)) for n in range(2)]
+        # The first file has a duplicate final dump that should be ignored
+        self.raw = [make_v3_file(self.filenames[0], duplicate_dump=True),
+                    make_v3_file(self.filenames[1], num_dumps=6, start_time=1500000100.0)]
+        self.raw[0] = tuple(data[:10] for data in self.raw[0])
+
+    def teardown(self):
+        shutil.rmtree(self.tempdir)
+
+    @staticmethod
+    def _expected(raw, flags_mask=0xff):
+        """Vis, weights and flags as extracted from the raw datasets."""
+        vis, flags, weights, weights_channel = raw
+        return (vis.view(np.complex64)[..., 0],
+                weights * weights_channel[..., np.newaxis],
+                np.bitwise_and(flags, flags_mask) != 0)
+
+    def test_selection(self):
+        d = H5DataV3(self.filenames[0], band='l')
+        assert_equal(d.shape, (10, 16, 4))
+        time_keep = np.zeros(10, dtype=bool)
+        time_keep[[1, 2, 5, 9]] = True
+        d.select(dumps=time_keep, channels=slice(3, 11), corrprods=[0, 2], flags='cam')
+        indexers = [d.vis, d.weights, d.flags]
+        for expected, indexer in zip(self._expected(self.raw[0], flags_mask=4), indexers):
+            expected = expected[time_keep][:, 3:11][:, :, [0, 2]]
+            np.testing.assert_array_equal(indexer[:], expected)
+            np.testing.assert_array_equal(indexer[1:3, ::2, -1], expected[1:3, ::2, -1])
+            np.testing.assert_array_equal(indexer[[3, 0], 4], expected[[3, 0], 4])
+        # Joint loading returns the same data
+        joint = DaskLazyIndexer.get(indexers, np.s_[2:])
+        for expected, data in zip(self._expected(self.raw[0], flags_mask=4), joint):
+            np.testing.assert_array_equal(data, expected[time_keep][2:, 3:11][:, :, [0, 2]])
+
+    def test_integer_indices(self):
+        d = H5DataV3(self.filenames[0], band='l')
+        d_keepdims = H5DataV3(self.filenames[0], band='l', keepdims=True)
+        for expected, indexer, indexer_keepdims in zip(self._expected(self.raw[0]),
+                                                       [d.vis, d.weights, d.flags],
+                                                       [d_keepdims.vis, d_keepdims.weights,
+                                                        d_keepdims.flags]):
+            np.testing.assert_array_equal(indexer[3], expected[3])
+            np.testing.assert_array_equal(indexer[-1, 2, 1], expected[-1, 2, 1])
+            np.testing.assert_array_equal(indexer_keepdims[3], expected[3:4])
+            np.testing.assert_array_equal(indexer_keepdims[-1, 2, 1], expected[-1:, 2:3, 1:2])
+            np.testing.assert_array_equal(indexer_keepdims[2:5, -1], expected[2:5, -1:])
+
+    def test_concatenated(self):
+        d = ConcatenatedDataSet([H5DataV3(filename, band='l', keepdims=True)
+                                 for filename in self.filenames])
+        assert_equal(d.shape, (16, 16, 4))
+        expected = [np.concatenate(data) for data in zip(*[self._expected(raw) for raw in self.raw])]
+        for expected, indexer in zip(expected, [d.vis, d.weights, d.flags]):
+            np.testing.assert_array_equal(indexer[:], expected)
+            np.testing.assert_array_equal(indexer[8:12, 5], expected[8:12, 5:6])
+            np.testing.assert_array_equal(indexer[12], expected[12:13])
+            np.testing.assert_array_equal(indexer[[1, 14], 0, -1], expected[[1, 14], :1, -1:])
@@ -0,0 +1,95 @@
+################################################################################
+# Copyright (c) 2020, National Research Foundation (Square Kilometre Array)
+#
+# Licensed under the BSD 3-Clause License (the "License"); you may not use
+# this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#   https://opensource.org/licenses/BSD-3-Clause
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+"""Tests for the scripts/h5v3_to_mvf.py converter."""
+from __future__ import print_function, division, absolute_import
+from builtins import object
+
+import os
+import runpy
+import shutil
+import sys
+import tempfile
+
+import mock
+import numpy as np
+import katsdptelstate
+from nose import SkipTest
+from nose.tools import assert_equal
+
+import katdal
+from katdal.chunkstore_npy import NpyFileChunkStore
+from katdal.test.test_h5datav3 import make_v3_file
+
+
+SCRIPT = os.path.join(os.path.dirname(katdal.__file__), os.pardir, 'scripts', 'h5v3_to_mvf.py')
+
+
+class TestH5v3ToMvf(object):
+    def setup(self):
+        if not os.path.exists(SCRIPT):
+            raise SkipTest('Converter script is not available outside the source tree')
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, 'test.h5')
+        self.dest = os.path.join(self.tempdir, 'mvf')
+        # Include a duplicate final dump, which should not be converted
+        self.vis, self.flags, self.weights, self.weights_channel = \
+            make_v3_file(self.filename, duplicate_dump=True)
+        script = runpy.run_path(SCRIPT)
+        argv = ['h5v3_to_mvf.py', self.filename, self.dest, '--band', 'l',
+                '--capture-block-id', '123', '--time-chunk', '4', '--freq-chunk', '8']
+        with mock.patch.object(sys, 'argv', argv):
+            script['main']()
+        self.prefix = '123-sdp-l0'
+        self.rdb = os.path.join(self.dest, '123', '123_sdp_l0.rdb')
+
+    def teardown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_chunks(self):
+        store = NpyFileChunkStore(self.dest)
+        raw = {'correlator_data': self.vis[:10].view(np.complex64)[..., 0],
+               'flags': self.flags[:10], 'weights': self.weights[:10],
+               'weights_channel': self.weights_channel[:10]}
+        for array_name, array in raw.items():
+            assert_equal(len(os.listdir(os.path.join(self.dest, self.prefix, array_name))), 3 * 2)
+            for start in (0, 4, 8):
+                for chan in (0, 8):
+                    index = np.s_[start:min(start + 4, 10), chan:chan + 8]
+                    index += tuple(slice(0, length) for length in array.shape[2:])
+                    chunk = store.get_chunk(store.join(self.prefix, array_name), index, array.dtype)
+                    np.testing.assert_array_equal(chunk, array[index])
+
+    def test_rdb(self):
+        telstate = katsdptelstate.TelescopeState()
+        telstate.load_from_file(self.rdb)
+        chunk_info = telstate.view('123_sdp_l0')['chunk_info']
+        assert_equal(chunk_info['correlator_data']['shape'], (10, 16, 4))
+        assert_equal(chunk_info['correlator_data']['chunks'], ((4, 4, 2), (8, 8), (4,)))
+        assert_equal(chunk_info['weights_channel']['chunks'], ((4, 4, 2), (8, 8)))
+        # The converted data set matches the original one
+        d3 = katdal.open(self.filename, band='l')
+        d4 = katdal.open(self.rdb, chunk_store=NpyFileChunkStore(self.dest))
+        assert_equal(d4.shape, d3.shape)
+        np.testing.assert_array_equal(d4.timestamps, d3.timestamps)
+        np.testing.assert_array_equal(d4.freqs, d3.freqs)
+        np.testing.assert_array_equal(d4.corr_products, d3.corr_products)
+        assert_equal([ant.description for ant in d4.ants], [ant.description for ant in d3.ants])
+        assert_equal(d4.catalogue.targets, d3.catalogue.targets)
+        assert_equal(list(d4.scans()), list(d3.scans()))
+        np.testing.assert_array_equal(d4.vis[:], d3.vis[:])
+        np.testing.assert_array_equal(d4.flags[:], d3.flags[:])
+        np.testing.assert_array_equal(d4.weights[:], d3.weights[:])
@@ -0,0 +1,167 @@
+################################################################################
+# Copyright (c) 2020, National Research Foundation (Square Kilometre Array)
+#
+# Licensed under the BSD 3-Clause License (the "License"); you may not use
+# this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#   https://opensource.org/licenses/BSD-3-Clause
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+"""Tests for :py:mod:`katdal.katstore`, using a fake katstore64 server."""
+from __future__ import print_function, division, absolute_import
+from future import standard_library
+standard_library.install_aliases()     # noqa: E402
+from builtins import object
+
+import threading
+import json
+import socketserver
+import http.server
+import urllib.parse
+
+import numpy as np
+from numpy.testing import assert_array_equal, assert_allclose
+from nose.tools import assert_equal, assert_raises
+
+from katdal.katstore import KatstoreClient
+from katdal.sensordata import SensorCache, get_sensor_from_katstore
+
+
+# Sensor records served by the fake katstore, as (sample_time, value, status)
+SENSORS = {
+    'anc_air_temperature': [(1000.0 + 10 * n, 20.0 + n, 'nominal') for n in range(10)],
+    'anc_mean_wind_speed': [(1000.0, 5.0, 'nominal'), (1050.0, 6.0, 'warn')],
+    # Several records share a sample time, which straddles pages
+    'm000_ap_mode': [(1000.0, 'stop', 'nominal'), (1010.0, 'slew', 'nominal'),
+                     (1010.0, 'track', 'nominal'), (1010.0, 'track', 'nominal'),
+                     (1010.0, 'slew', 'nominal'), (1020.0, 'stop', 'nominal')],
+}
+
+
+class _KatstoreHandler(http.server.BaseHTTPRequestHandler):
+    """Serve :data:`SENSORS` via a minimal version of the katstore64 query API."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path != '/katstore/api/query':
+            self.send_error(404)
+            return
+        params = dict(urllib.parse.parse_qsl(url.query))
+        name = params['sensor']
+        start_time = float(params['start_time'])
+        end_time = float(params['end_time'])
+        limit = int(params['limit'])
+        records = [{'sensor': name, 'sample_time': t, 'value_time': t - 0.5,
+                    'value': value, 'status': status}
+                   for t, value, status in SENSORS.get(name, [])
+                   if start_time <= t < end_time][:limit]
+        body = json.dumps({'data': records}).encode('utf-8')
+        with self.server.lock:
+            self.server.requests.append(params)
+            self.server.connections.add(self.client_address)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _KatstoreServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """Fake katstore that serves each (persistent) connection in its own thread."""
+
+    daemon_threads = True
+
+
+class TestKatstoreClient(object):
+    def setup(self):
+        self.server = _KatstoreServer(('127.0.0.1', 0), _KatstoreHandler)
+        self.server.requests = []
+        self.server.connections = set()
+        self.server.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.store = '%s:%d' % self.server.server_address
+
+    def teardown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def test_get(self):
+        client = KatstoreClient(self.store, workers=1)
+        data = client.get('anc_air_temperature', 1000.0, 1050.0).get()
+        assert_equal(data.name, 'anc_air_temperature')
+        assert_array_equal(data.timestamp, [999.5, 1009.5, 1019.5, 1029.5, 1039.5])
+        assert_array_equal(data.value, [20.0, 21.0, 22.0, 23.0, 24.0])
+        assert_array_equal(data.status, ['nominal'] * 5)
+        assert_raises(KeyError, client.get, 'anc_unknown', 1000.0, 1050.0)
+        assert_raises(KeyError, client.get, 'not/an/identifier', 1000.0, 1050.0)
+        # Both sensors came from the server and share a connection
+        assert_equal(len(self.server.requests), 2)
+        assert_equal(len(self.server.connections), 1)
+
+    def test_paging(self):
+        client = KatstoreClient(self.store, workers=1, page_size=3)
+        data = client.get('anc_air_temperature', 0.0, 2000.0).get()
+        assert_array_equal(data.value, 20.0 + np.arange(10))
+        assert_equal(len(self.server.requests), 5)
+        # A page full of records at the same time is enlarged to get past them
+        client = KatstoreClient(self.store, workers=1, page_size=2)
+        data = client.get('m000_ap_mode', 0.0, 2000.0).get()
+        assert_array_equal(data.value, [name for t, name, status in SENSORS['m000_ap_mode']])
+        assert_array_equal(data.timestamp, [999.5, 1009.5, 1009.5, 1009.5, 1009.5, 1019.5])
+
+    def test_get_many_and_caching(self):
+        client = KatstoreClient(self.store, workers=4)
+        names = ['anc_air_temperature', 'anc_mean_wind_speed', 'anc_unknown']
+        data = client.get_many(names, 0.0, 2000.0)
+        assert_equal(sorted(data), names[:2])
+        assert_array_equal(data['anc_mean_wind_speed'].get().value, [5.0, 6.0])
+        assert_equal(len(self.server.requests), 3)
+        # Repeated queries (including for missing sensors) are served from the cache
+        data = client.get_many(names, 0.0, 2000.0)
+        assert_equal(sorted(data), names[:2])
+        assert_raises(KeyError, client.get, 'anc_unknown', 0.0, 2000.0)
+        assert_equal(len(self.server.requests), 3)
+        # A different time range is a new query
+        client.get('anc_mean_wind_speed', 0.0, 1010.0)
+        assert_equal(len(self.server.requests), 4)
+        # The cache is bounded
+        client.cache_size = 2
+        client.get('anc_air_temperature', 0.0, 1010.0)
+        assert_equal(len(client._cache), 2)
+
+    def test_connection_error(self):
+        self.teardown()
+        client = KatstoreClient(self.store, workers=1)
+        assert_raises(ConnectionError, client.get, 'anc_air_temperature', 0.0, 2000.0)
+        self.setup()
+
+    def test_sensor_cache(self):
+        assert_equal(get_sensor_from_katstore(self.store, 'anc_mean_wind_speed',
+                                              0.0, 2000.0).get().value[0], 5.0)
+        timestamps = 1000.0 + 2.0 * np.arange(10)
+        cache = SensorCache({}, timestamps, 2.0, store=self.store)
+        cache.virtual['Virtual/{item}'] = lambda cache, name, item: np.zeros(10)
+        fetched = cache.prefetch(['anc_air_temperature', 'anc_mean_wind_speed',
+                                  'anc_unknown', 'Virtual/thing'])
+        assert_equal(sorted(fetched), ['Virtual/thing', 'anc_air_temperature',
+                                       'anc_mean_wind_speed'])
+        # The store is not asked for the virtual sensor
+        queried = set(params['sensor'] for params in self.server.requests)
+        assert_equal(queried, {'anc_air_temperature', 'anc_mean_wind_speed', 'anc_unknown'})
+        assert_allclose(cache.get('anc_mean_wind_speed'), 5.0 + (timestamps - 999.5) / 50.)
+        assert_allclose(cache['anc_air_temperature'][:2], [20.05, 20.25])
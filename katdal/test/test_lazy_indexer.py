@@ -20,13 +20,19 @@ from builtins import object, range
 
 from numbers import Integral
 from functools import partial
+import os
+import shutil
+import tempfile
 
 import numpy as np
 import dask.array as da
-from nose.tools import assert_raises, assert_equal
+from nose.tools import assert_raises, assert_equal, assert_true
 
+from katdal.chunkstore import DirectReader
+from katdal.chunkstore_dict import DictChunkStore
 from katdal.lazy_indexer import (_range_to_slice, _simplify_index,
-                                 _dask_oindex, dask_getitem, DaskLazyIndexer)
+                                 _dask_oindex, dask_getitem, DaskLazyIndexer,
+                                 LazyIndexer, _plan_reads, hdf5_to_dask)
 
 
 def slice_to_range(s, l):
@@ -224,6 +230,22 @@ class TestDaskGetitem(object):
     def test_repeated_fancy_indexing(self):
         self._test_with(np.s_[:, [1, 1, 1], [6, 6, 6], :])
 
+    def test_unsorted_and_duplicate_fancy_indexing(self):
+        self._test_with(np.s_[[5, 1, 3], :, :])
+        self._test_with(np.s_[[2, 2, 0, 2], 1:5, [9, 0, 0, -1]])
+        self._test_with(np.s_[1, [3, 2, 1, 2], np.newaxis, [4, 2, 2, 7]])
+
+    def test_unsorted_fancy_indexing_keeps_chunk_sizes(self):
+        # Permuting a long axis should not merge it into one huge chunk
+        x = da.from_array(np.arange(1000 * 6).reshape(1000, 6), chunks=(10, 3))
+        index = np.random.RandomState(42).permutation(1000)[:500]
+        index[-10:] = index[:10]
+        out = dask_getitem(x, np.s_[index, :])
+        np.testing.assert_array_equal(out.compute(), x.compute()[index])
+        assert_equal(out.chunks[1], x.chunks[1])
+        assert_true(max(out.chunks[0]) <= max(x.chunks[0]))
+        assert_true(len(out.chunks[0]) >= len(index) // max(x.chunks[0]))
+
     def test_slices(self):
         self._test_with(np.s_[0:2, 2:4, 4:6, 6:8])
         self._test_with(np.s_[-8:-6, -4:-2, 3:10:2, -2:])
@@ -245,6 +267,71 @@ class TestDaskGetitem(object):
                         np.s_[0, 2:5, 3 * UNEVEN, np.newaxis, [4, 6]])
 
 
+class TestLazyIndexer(object):
+    """Test the :class:`~katdal.lazy_indexer.LazyIndexer` class."""
+    def setup(self):
+        shape = (10, 20, 30)
+        self.data = np.arange(np.product(shape)).reshape(shape)
+
+    def _test_with(self, stage1=(), stage2=(), dataset=None, **kwargs):
+        npy1 = numpy_oindex(self.data, stage1)
+        npy2 = numpy_oindex(npy1, stage2)
+        indexer = LazyIndexer(self.data if dataset is None else dataset, stage1, **kwargs)
+        np.testing.assert_array_equal(indexer[stage2], npy2)
+
+    def test_fancy_indexing(self):
+        self._test_with(np.s_[UNEVEN, :, 2:7], np.s_[[0, 1, 3], 4])
+        self._test_with(np.s_[[1, 2, 3, 4, 6, 9], 2 * UNEVEN, :])
+
+    def test_unsorted_and_duplicate_fancy_indexing(self):
+        self._test_with((), np.s_[[5, 1, 3], :, :])
+        self._test_with((), np.s_[[2, 2, 0, 2], 1:5, [9, 0, 0, -1]])
+        self._test_with(np.s_[[7, 3, 5], :, :], np.s_[[2, 0, 0], 4, :])
+
+    def test_plan_reads(self):
+        indices = np.array([0, 1, 2, 5, 6, 20, 21, 22])
+        # Free reads result in a single read spanning all segments
+        reads = _plan_reads(indices, 1, 8, (1.0, 0.0))
+        assert_equal(len(reads), 1)
+        assert_equal(reads[0][0], slice(0, 23, 1))
+        np.testing.assert_array_equal(reads[0][1], indices)
+        # Expensive bytes result in one read per segment without post-selection
+        reads = _plan_reads(indices, 1, 8, (0.0, 1.0))
+        assert_equal([read[0] for read in reads], [slice(0, 3, 1), slice(5, 7, 1), slice(20, 23, 1)])
+        assert_equal([read[1] for read in reads], [slice(None)] * 3)
+        assert_equal([read[2] for read in reads], [slice(0, 3, 1), slice(3, 5, 1), slice(5, 8, 1)])
+        # Gaps inside HDF5 chunks that are read anyway are bridged for free
+        reads = _plan_reads(indices, 10, 8, (0.0, 1.0))
+        assert_equal([read[0] for read in reads], [slice(0, 7, 1), slice(20, 23, 1)])
+        np.testing.assert_array_equal(reads[0][1], [0, 1, 2, 5, 6])
+
+    def test_parallel_threads(self):
+        stage1 = np.s_[[0, 2, 3, 7, 9], :, 3 * UNEVEN]
+        stage2 = np.s_[[0, 1, 4], 2:18, [8, 1, 1]]
+        # Expensive bytes ensure lots of separate reads to distribute over the workers
+        read_cost, LazyIndexer.read_cost = LazyIndexer.read_cost, (0.0, 1.0)
+        try:
+            self._test_with(stage1, stage2, workers=4)
+        finally:
+            LazyIndexer.read_cost = read_cost
+
+    def test_parallel_processes(self):
+        import h5py
+        stage1 = np.s_[[0, 2, 3, 7, 9], :, 3 * UNEVEN]
+        stage2 = np.s_[[0, 1, 4], 2:18, [8, 1, 1]]
+        tempdir = tempfile.mkdtemp()
+        try:
+            with h5py.File(os.path.join(tempdir, 'test.h5'), 'w') as h5file:
+                dataset = h5file.create_dataset('data', data=self.data, chunks=(1, 5, 10))
+                self._test_with(stage1, stage2, dataset, workers=2, worker_type='process')
+        finally:
+            shutil.rmtree(tempdir)
+
+    def test_bad_worker_type(self):
+        assert_raises(ValueError, LazyIndexer, self.data, worker_type='fibre')
+        assert_raises(ValueError, LazyIndexer, self.data, worker_type='process')
+
+
 class TestDaskLazyIndexer(object):
     """Test the :class:`~katdal.lazy_indexer.DaskLazyIndexer` class."""
     def setup(self):
@@ -311,3 +398,70 @@ class TestDaskLazyIndexer(object):
         indexer.dataset
         indexer.add_transform(lambda x: 0 * x)
         np.testing.assert_array_equal(indexer[:], np.zeros_like(indexer))
+
+    def test_direct(self):
+        # The direct reader sees negated data so that we can tell it was used
+        store = DictChunkStore(x=-self.data)
+        direct = DirectReader(store, 'x', self.data_dask.chunks, self.data.dtype)
+        stage1 = np.s_[2:8, [False] * 3 + [True] * 17, 1:]
+        indexer = DaskLazyIndexer(self.data_dask, stage1, direct=direct)
+        stage2 = np.s_[1:4, 5:, :-2]
+        expected = numpy_oindex(numpy_oindex(self.data, stage1), stage2)
+        np.testing.assert_array_equal(indexer[stage2], -expected)
+        vis, direct_vis = DaskLazyIndexer.get([DaskLazyIndexer(self.data_dask, stage1),
+                                               indexer], stage2)
+        np.testing.assert_array_equal(vis, expected)
+        np.testing.assert_array_equal(direct_vis, -expected)
+        # Fancy indexing, integer indices and transforms use dask instead
+        for stage2 in [np.s_[[0, 2], :, :], np.s_[1], np.s_[:, ::2]]:
+            expected = numpy_oindex(numpy_oindex(self.data, stage1), stage2)
+            np.testing.assert_array_equal(indexer[stage2], expected)
+        indexer = DaskLazyIndexer(self.data_dask, stage1, [lambda x: x], direct=direct)
+        np.testing.assert_array_equal(indexer[:], numpy_oindex(self.data, stage1))
+
+    def test_iter_blocks(self):
+        indexer1 = DaskLazyIndexer(self.data_dask)
+        indexer2 = DaskLazyIndexer(da.from_array(-self.data, chunks=(2, 8, 30)))
+        for axis, block, expected_edges in [(0, 5, [0, 4, 8, 10]),
+                                            (0, 1, [0, 2, 4, 6, 8, 10]),
+                                            (1, 9, [0, 8, 16, 20]),
+                                            (2, None, [0, 30])]:
+            edges = [0]
+            for index, out1, out2 in DaskLazyIndexer.iter_blocks(
+                    [indexer1, indexer2], axis=axis, block=block):
+                assert_equal(index[axis].start, edges[-1])
+                edges.append(index[axis].stop)
+                np.testing.assert_array_equal(out1, self.data[index])
+                np.testing.assert_array_equal(out2, -self.data[index])
+            assert_equal(edges, expected_edges)
+        # Limit on block size in bytes (a dump of both arrays is 9600 bytes)
+        blocks = DaskLazyIndexer.iter_blocks([indexer1, indexer2], max_bytes=30000)
+        assert_equal([index[0] for index, out1, out2 in blocks],
+                     [slice(0, 2), slice(2, 4), slice(4, 6), slice(6, 8), slice(8, 10)])
+        with assert_raises(ValueError):
+            next(DaskLazyIndexer.iter_blocks([indexer1, DaskLazyIndexer(self.data_dask[1:])]))
+
+
+def test_hdf5_to_dask():
+    import h5py
+    data = np.arange(10 * 20 * 30, dtype=np.float32).reshape(10, 20, 30)
+    tempdir = tempfile.mkdtemp()
+    try:
+        with h5py.File(os.path.join(tempdir, 'test.h5'), 'w') as h5file:
+            chunked = h5file.create_dataset('chunked', data=data, chunks=(2, 5, 30))
+            contiguous = h5file.create_dataset('contiguous', data=data)
+            # Dask chunks consist of whole HDF5 chunks, grown from the last dimension backwards
+            x = hdf5_to_dask(chunked, max_bytes=2 * 20 * 30 * 4)
+            assert_equal(x.chunksize, (2, 20, 30))
+            x = hdf5_to_dask(chunked, max_bytes=2 * 5 * 30 * 4 * 2 + 1)
+            assert_equal(x.chunksize, (2, 10, 30))
+            np.testing.assert_array_equal(x.compute(), data)
+            y = hdf5_to_dask(contiguous, max_bytes=4 * 20 * 30 * 4)
+            assert_equal(y.chunksize, (4, 20, 30))
+            np.testing.assert_array_equal(y.compute(), data)
+            # Use it in a lazy indexer that keeps singleton dimensions
+            indexer = DaskLazyIndexer(x, np.s_[2:8], keepdims=True)
+            np.testing.assert_array_equal(indexer[3, [0, 4], -1], data[5:6, [0, 4], 29:30])
+            assert_equal(DaskLazyIndexer(x)[3, :, -1].shape, (20,))
+    finally:
+        shutil.rmtree(tempdir)
@@ -0,0 +1,72 @@
+################################################################################
+# Copyright (c) 2020, National Research Foundation (Square Kilometre Array)
+#
+# Licensed under the BSD 3-Clause License (the "License"); you may not use
+# this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#   https://opensource.org/licenses/BSD-3-Clause
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+"""Tests for :py:mod:`katdal.lazy_jit`."""
+from __future__ import print_function, division, absolute_import
+
+import pickle
+import subprocess
+import sys
+
+import numpy as np
+from nose import SkipTest
+from nose.tools import assert_equal, assert_is, assert_true
+
+from katdal.lazy_jit import jit, warm_up, KERNEL_MODULES
+
+
+@jit(nopython=True)
+def add_one(x):
+    """Add one to each element of `x`."""
+    out = np.empty_like(x)
+    for i in range(len(x)):
+        out[i] = x[i] + 1
+    return out
+
+
+def test_lazy_jit():
+    assert_equal(add_one.__name__, 'add_one')
+    assert_equal(add_one.__doc__, 'Add one to each element of `x`.')
+    np.testing.assert_array_equal(add_one(np.arange(3)), [1, 2, 3])
+    # Compilation only happens once and results in a proper numba dispatcher
+    dispatcher = add_one.dispatcher
+    assert_is(add_one.dispatcher, dispatcher)
+    assert_true(hasattr(dispatcher, 'signatures'))
+    # Pickle by reference, just like the undecorated function
+    assert_is(pickle.loads(pickle.dumps(add_one)), add_one)
+
+
+def test_warm_up():
+    elapsed = warm_up()
+    assert_equal(sorted(elapsed), sorted(KERNEL_MODULES))
+    from katdal.applycal import apply_vis_correction
+    from katdal.datasources import weight_power_scale
+    assert_true(apply_vis_correction.dispatcher.signatures)
+    assert_true(weight_power_scale.dispatcher.signatures)
+
+
+def test_import_is_lazy():
+    if sys.version_info < (3, 7):
+        raise SkipTest('Lazy imports need module-level __getattr__ (Python 3.7+)')
+    script = ('import sys, katdal; '
+              'print([m for m in ("dask", "numba", "h5py", "katsdptelstate", "requests") '
+              'if m in sys.modules])')
+    output = subprocess.check_output([sys.executable, '-c', script])
+    assert_equal(output.decode().strip(), '[]')
+    script = ('import sys, katdal.applycal; '
+              'print("numba" in sys.modules)')
+    output = subprocess.check_output([sys.executable, '-c', script])
+    assert_equal(output.decode().strip(), 'False')
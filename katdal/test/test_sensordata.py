@@ -20,13 +20,22 @@
 from __future__ import print_function, division, absolute_import
 from builtins import object
 
+import shutil
+import tempfile
+import threading
 from collections import OrderedDict
 
 import numpy as np
-from nose.tools import assert_equal, assert_in, assert_not_in, assert_raises, assert_is_instance
+import katpoint
+import katsdptelstate
+from nose.tools import (assert_equal, assert_false, assert_true, assert_is_none, assert_in,
+                        assert_not_in, assert_raises, assert_is_instance)
 import mock
 
-from katdal.sensordata import SensorCache, SimpleSensorGetter, to_str
+from katdal.sensordata import (SensorCache, SensorData, SimpleSensorGetter, DiskSensorCache,
+                               LazyInterpolator, TelstateSensorGetter,
+                               remove_duplicates_and_invalid_values, to_str)
+from katdal.categorical import CategoricalData
 
 
 def assert_equal_typed(a, b):
@@ -74,6 +83,100 @@ class TestToStr(object):
         np.testing.assert_array_equal(to_str(a), b)
 
 
+def test_remove_duplicates_and_invalid_values():
+    timestamp = np.array([3.0, 1.0, 2.0, 2.0, 4.0, 3.0, 5.0])
+    value = np.array([30., 10., 20., 21., 40., 31., 50.])
+    status = np.array(['nominal', 'warn', 'error', 'nominal', 'unknown', 'nominal', 'failure'])
+    # Last of each run of duplicates is kept, and the status follows its sample when sorting
+    clean = remove_duplicates_and_invalid_values(SensorData('s', timestamp, value, status))
+    np.testing.assert_array_equal(clean.timestamp, [1.0, 2.0, 3.0])
+    np.testing.assert_array_equal(clean.value, [10., 21., 31.])
+    assert_is_none(clean.status)
+    clean = remove_duplicates_and_invalid_values(SensorData('s', timestamp, value, status.astype('S')))
+    np.testing.assert_array_equal(clean.value, [10., 21., 31.])
+    clean = remove_duplicates_and_invalid_values(SensorData('s', timestamp, value))
+    np.testing.assert_array_equal(clean.value, [10., 21., 31., 40., 50.])
+    # Strictly increasing timestamps without status are passed through as is
+    clean = remove_duplicates_and_invalid_values(SensorData('s', timestamp[1:3], value[1:3]))
+    np.testing.assert_array_equal(clean.value, [10., 20.])
+
+
+class TestTelstateSensorGetter(object):
+    def setup(self):
+        self.telstate = katsdptelstate.TelescopeState()
+        self.times = 1000.0 + np.arange(100.0)
+        for t in self.times:
+            self.telstate.add('float_sensor', t - 1000.0, ts=t)
+            self.telstate.add('str_sensor', 'slew' if t % 20 < 10 else 'track', ts=t)
+
+    def test_get_range(self):
+        getter = TelstateSensorGetter(self.telstate, 'float_sensor')
+        np.testing.assert_array_equal(getter.get().timestamp, self.times)
+        # Include the values in effect at the start and following the end of range
+        data = getter.get_range(1040.5, 1050.0)
+        np.testing.assert_array_equal(data.timestamp, self.times[40:51])
+        np.testing.assert_array_equal(data.value, np.arange(40.0, 51.0))
+        data = getter.get_range(0.0, 500.0)
+        np.testing.assert_array_equal(data.timestamp, self.times[:1])
+        data = getter.get_range(2000.0, 3000.0)
+        np.testing.assert_array_equal(data.timestamp, self.times[-1:])
+
+    def test_sparse_samples(self):
+        # The next sample after the data set is far beyond the last dump
+        self.telstate.add('sparse_sensor', 0.0, ts=0.0)
+        self.telstate.add('sparse_sensor', 600.0, ts=600.0)
+        self.telstate.add('sparse_sensor', 0.0, ts=5000.0)
+        getter = TelstateSensorGetter(self.telstate, 'sparse_sensor')
+        data = getter.get_range(99.5, 190.5)
+        np.testing.assert_array_equal(data.timestamp, [0.0, 600.0])
+        timestamps = 100.0 + 10.0 * np.arange(10)
+        cache = SensorCache({'sparse_sensor': getter}, timestamps, 10.0)
+        np.testing.assert_array_equal(cache.get('sparse_sensor'), timestamps)
+
+    def test_round_trips(self):
+        self.telstate.add('sparse_sensor', 0.0, ts=0.0)
+        self.telstate.add('sparse_sensor', 5000.0, ts=5000.0)
+        self.telstate.add('sparse_str_sensor', 'slew', ts=0.0)
+        self.telstate.add('sparse_str_sensor', 'track', ts=5000.0)
+        get_range = katsdptelstate.TelescopeState.get_range
+        with mock.patch.object(katsdptelstate.TelescopeState, 'get_range',
+                               autospec=True, side_effect=get_range) as mock_get_range:
+            # The next value is normally found in the same request as the range
+            for name in ('float_sensor', 'str_sensor'):
+                data = TelstateSensorGetter(self.telstate, name, check=False).get_range(1040.5, 1050.0)
+                np.testing.assert_array_equal(data.timestamp, self.times[40:51])
+            assert_equal(mock_get_range.call_count, 2)
+            # Categorical sensors don't search for the next value beyond that
+            getter = TelstateSensorGetter(self.telstate, 'sparse_str_sensor', check=False)
+            np.testing.assert_array_equal(getter.get_range(99.5, 190.5).timestamp, [0.0])
+            getter = TelstateSensorGetter(self.telstate, 'sparse_sensor', check=False)
+            data = getter.get_range(99.5, 190.5, categorical=True)
+            np.testing.assert_array_equal(data.timestamp, [0.0])
+            assert_equal(mock_get_range.call_count, 4)
+            # Numerical sensors search further ahead
+            np.testing.assert_array_equal(getter.get_range(99.5, 190.5).timestamp, [0.0, 5000.0])
+
+    def test_extract_only_fetches_window(self):
+        timestamps = 1030.0 + np.arange(10.0)
+        sensors = {name: TelstateSensorGetter(self.telstate, name)
+                   for name in ('float_sensor', 'str_sensor')}
+        full = {name: SimpleSensorGetter(name, getter.get().timestamp, getter.get().value)
+                for name, getter in sensors.items()}
+        get_range = katsdptelstate.TelescopeState.get_range
+        with mock.patch.object(katsdptelstate.TelescopeState, 'get_range',
+                               autospec=True, side_effect=get_range) as mock_get_range:
+            cache = SensorCache(sensors, timestamps, 1.0)
+            float_data = cache.get('float_sensor')
+            str_data = cache.get('str_sensor')
+        # No request (after self and key) asks for the history from the start,
+        # only for the window (start time) or the records following it
+        for args, kwargs in mock_get_range.call_args_list:
+            assert_true(args[2] is None or args[2] > 1020.0)
+        full_cache = SensorCache(full, timestamps, 1.0)
+        np.testing.assert_array_equal(float_data, full_cache.get('float_sensor'))
+        np.testing.assert_array_equal(str_data[:], full_cache.get('str_sensor')[:])
+
+
 class TestSensorCache(object):
     def _cache_data(self):
         sensors = [
@@ -93,6 +196,28 @@ class TestSensorCache(object):
         data = self.cache.get('foo', extract=True)
         np.testing.assert_array_equal(data, [3.0, 3.0, 3.0, 3.0, 3.0, 4.0, 5.0, 6.0, 6.0, 6.0])
 
+    def test_lazy_interpolation(self):
+        keep = np.zeros(10, dtype=bool)
+        keep[3:8] = True
+        cache_data = self._cache_data()
+        cache_data['bar'] = SimpleSensorGetter('bar', np.array([4.0, 7.0]), np.array([1.0, -2.0]))
+        cache = SensorCache(cache_data, np.arange(10.), 1.0, keep=keep,
+                            lazy_interpolation=True, float32=True)
+        np.testing.assert_array_equal(cache['foo'], [3.0, 3.0, 4.0, 5.0, 6.0])
+        assert_equal(cache['foo'].dtype, np.float32)
+        # The data is stored as samples, sharing the sample times where possible
+        assert_is_instance(cache.get('foo', extract=False), np.ndarray)
+        assert_is_instance(cache._raw['foo'], LazyInterpolator)
+        cache.get('bar')
+        assert_true(cache._raw['foo'].times is cache._raw['bar'].times)
+        # Changes to the selection (even in place) are picked up
+        keep[:] = False
+        keep[6:] = True
+        np.testing.assert_array_equal(cache['bar'], [-1.0, -2.0, -2.0, -2.0])
+        np.testing.assert_array_equal(cache.get('foo'), self.cache.get('foo'))
+        # Categorical sensors are not affected
+        assert_is_instance(cache.get('cat'), CategoricalData)
+
     def test_extract_categorical(self):
         data = self.cache.get('cat', extract=True)
         H = 'hello'
@@ -162,6 +287,119 @@ class TestSensorCache(object):
         assert_equal(value, params['param2'])
         assert_equal(calculate_value.call_count, 2)
 
+    def test_prefetch(self):
+        self.cache['bar'] = SimpleSensorGetter('bar', np.array([1.0]), np.array([2.0]))
+        self.cache.virtual['twice_{original}'] = lambda cache, name, original: 2 * cache.get(original)
+        fetched = self.cache.prefetch(['f*', 'cat', 'twice_foo', 'dog'], workers=2)
+        assert_equal(sorted(fetched), ['cat', 'foo', 'twice_foo'])
+        # The prefetched sensors are now cached but the rest are left alone
+        np.testing.assert_array_equal(self.cache.get('foo', extract=False),
+                                      [3.0, 3.0, 3.0, 3.0, 3.0, 4.0, 5.0, 6.0, 6.0, 6.0])
+        assert_equal(self.cache.get('cat', extract=False)[6], 'world')
+        assert_is_instance(self.cache.get('bar', extract=False), SimpleSensorGetter)
+        np.testing.assert_array_equal(self.cache.get('twice_foo'), 2 * self.cache.get('foo'))
+
+    def test_per_sensor_locking(self):
+        started = threading.Event()
+        release = threading.Event()
+        getter = self.cache.get('foo', extract=False)
+        slow_getter = mock.Mock(spec=SimpleSensorGetter)
+        slow_getter.name = 'slow'
+
+        def slow_get():
+            started.set()
+            release.wait(5)
+            return getter.get()
+        slow_getter.get.side_effect = slow_get
+        slow_getter.get_range.side_effect = lambda start_time, end_time, categorical=None: slow_get()
+        self.cache['slow'] = slow_getter
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.cache.get('slow')))
+                   for n in range(3)]
+        for thread in threads:
+            thread.start()
+        started.wait(5)
+        # Other sensors are not held up by the slow one
+        other = threading.Thread(target=lambda: self.cache.get('cat'))
+        other.start()
+        other.join(2)
+        assert_false(other.is_alive())
+        release.set()
+        for thread in threads:
+            thread.join()
+        # The slow sensor is only extracted once and shared by all requests
+        assert_equal(slow_getter.get_range.call_count, 1)
+        assert_equal(len(results), 3)
+        np.testing.assert_array_equal(results[0], self.cache.get('foo'))
+
     # TODO: more tests required:
     # - extract=False
     # - selection
+
+
+class TestDiskSensorCache(object):
+    def setup(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.disk_cache = DiskSensorCache(self.tempdir, 'test')
+        self.timestamps = np.arange(10.)
+
+    def teardown(self):
+        shutil.rmtree(self.tempdir)
+
+    def _round_trip(self, data, props={}):
+        assert_true(self.disk_cache.save('sensor', self.timestamps, props, data))
+        return self.disk_cache.load('sensor', self.timestamps, props)
+
+    def test_array(self):
+        data = np.linspace(0., 1., 10)
+        np.testing.assert_array_equal(self._round_trip(data), data)
+
+    def test_categorical(self):
+        targets = [katpoint.Target('Sun, special'), katpoint.Target('Moon, special')]
+        for values in (['slew', 'track', 'slew'], [0.5, 1.5, 0.5], [True, False, True],
+                       [np.zeros(4), np.ones(4), np.zeros(4)], targets + targets[:1]):
+            data = CategoricalData(values, [0, 2, 5, 10])
+            loaded = self._round_trip(data)
+            np.testing.assert_array_equal(loaded.events, data.events)
+            np.testing.assert_array_equal(loaded.indices, data.indices)
+            assert_equal(len(loaded.unique_values), 2)
+            for dump in range(10):
+                np.testing.assert_array_equal(loaded[dump], data[dump])
+
+    def test_key(self):
+        data = np.arange(10.)
+        self.disk_cache.save('sensor', self.timestamps, {'categorical': False}, data)
+        # Any change in data set, sensor, properties or timestamps misses the cache
+        assert_is_none(self.disk_cache.load('other', self.timestamps, {'categorical': False}))
+        assert_is_none(self.disk_cache.load('sensor', self.timestamps, {}))
+        assert_is_none(self.disk_cache.load('sensor', self.timestamps + 1, {'categorical': False}))
+        other = DiskSensorCache(self.tempdir, 'other')
+        assert_is_none(other.load('sensor', self.timestamps, {'categorical': False}))
+        # Unsupported data is not stored
+        assert_false(self.disk_cache.save('sensor', self.timestamps, {}, 'not an array'))
+
+    def test_sensor_cache(self):
+        def make_cache():
+            getter = SimpleSensorGetter('foo', np.array([4.0, 7.0]), np.array([3.0, 6.0]))
+            cache = SensorCache({'foo': getter}, self.timestamps, 1.0, disk_cache=self.disk_cache)
+            cache.virtual['twice_{original}'] = create_twice
+            return cache
+
+        def create_twice(cache, name, original):
+            calls.append(name)
+            cache[name] = 2 * cache.get(original)
+            return cache[name]
+
+        calls = []
+        np.testing.assert_array_equal(make_cache().get('twice_foo'),
+                                      [6., 6., 6., 6., 6., 8., 10., 12., 12., 12.])
+        assert_equal(calls, ['twice_foo'])
+        # The second time around the virtual sensor comes from disk
+        cache = make_cache()
+        np.testing.assert_array_equal(cache.get('twice_foo'),
+                                      [6., 6., 6., 6., 6., 8., 10., 12., 12., 12.])
+        assert_equal(calls, ['twice_foo'])
+        # The actual sensor was extracted and stored along the way
+        assert_is_instance(cache.get('foo', extract=False), SimpleSensorGetter)
+        with mock.patch.object(SimpleSensorGetter, 'get', side_effect=AssertionError):
+            np.testing.assert_array_equal(cache.get('foo'), [3., 3., 3., 3., 3., 4., 5., 6., 6., 6.])
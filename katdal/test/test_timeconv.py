@@ -0,0 +1,59 @@
+################################################################################
+# Copyright (c) 2020, National Research Foundation (Square Kilometre Array)
+#
+# Licensed under the BSD 3-Clause License (the "License"); you may not use
+# this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#   https://opensource.org/licenses/BSD-3-Clause
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+"""Tests for :py:mod:`katdal.timeconv`."""
+from __future__ import print_function, division, absolute_import
+
+import numpy as np
+from numpy.testing import assert_array_equal, assert_array_less
+from nose.tools import assert_equal, assert_true
+import katpoint
+
+from katdal.timeconv import to_ephem_date, to_mjd, to_mjd_seconds, local_sidereal_time
+
+
+ANTENNA = katpoint.Antenna('m000, -30:42:39.8, 21:26:38.0, 1086.6, 13.5')
+
+
+def test_mjd_agrees_with_katpoint():
+    rs = np.random.RandomState(42)
+    timestamps = 1.2e9 + rs.uniform(0, 5e8, 1000)
+    # Include whole seconds and midnight
+    timestamps[:2] = [1500000000.0, 1500076800.0]
+    assert_array_equal(to_ephem_date(timestamps),
+                       [katpoint.Timestamp(t).to_ephem_date() for t in timestamps])
+    assert_array_equal(to_mjd(timestamps), [katpoint.Timestamp(t).to_mjd() for t in timestamps])
+    assert_array_equal(to_mjd_seconds(timestamps),
+                       [katpoint.Timestamp(t).to_mjd() * 24 * 60 * 60 for t in timestamps])
+    # Scalars stay scalars
+    assert_equal(np.shape(to_mjd(timestamps[0])), ())
+    assert_equal(to_mjd(timestamps[0]), katpoint.Timestamp(timestamps[0]).to_mjd())
+    assert_equal(to_mjd([]).shape, (0,))
+
+
+def test_local_sidereal_time_agrees_with_katpoint():
+    rs = np.random.RandomState(42)
+    for span in (0.0, 10.0, 8 * 3600.0, 3 * 86400.0):
+        timestamps = 1.5e9 + np.sort(rs.uniform(0, span, 500))
+        lst = local_sidereal_time(timestamps, ANTENNA)
+        expected = ANTENNA.local_sidereal_time(timestamps)
+        # Compare angles modulo 2*pi
+        error = np.angle(np.exp(1j * (lst - expected)))
+        assert_array_less(np.abs(error), 1e-8)
+        assert_true(np.all((lst >= 0.0) & (lst < 2 * np.pi)))
+    lst = local_sidereal_time(1.5e9, ANTENNA)
+    assert_equal(np.shape(lst), ())
+    assert_equal(local_sidereal_time(np.zeros((0,)), ANTENNA).shape, (0,))
@@ -0,0 +1,128 @@
+################################################################################
+# Copyright (c) 2020, National Research Foundation (Square Kilometre Array)
+#
+# Licensed under the BSD 3-Clause License (the "License"); you may not use
+# this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#   https://opensource.org/licenses/BSD-3-Clause
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+"""Vectorised conversions of arrays of UTC timestamps to other time scales.
+
+These are array versions of :meth:`katpoint.Timestamp.to_ephem_date`,
+:meth:`katpoint.Timestamp.to_mjd` and :meth:`katpoint.Antenna.local_sidereal_time`,
+which convert one timestamp at a time.
+"""
+from __future__ import print_function, division, absolute_import
+
+import numpy as np
+
+# Dublin Julian Day (the ephem epoch of 1899-12-31 12:00 UTC) of the Unix epoch
+UNIX_EPOCH_DJD = 25567.5
+# Earth rotation angle per second of UTC, in radians
+SIDEREAL_RATE = 2.0 * np.pi * 1.002737909350795 / 86400.0
+
+
+def to_ephem_date(timestamps):
+    """Convert UTC timestamps to ephem dates (Dublin Julian Days).
+
+    Parameters
+    ----------
+    timestamps : float or array of float
+        Timestamp(s) in UTC seconds since Unix epoch
+
+    Returns
+    -------
+    djd : float or array of float
+        Dublin Julian Day(s), identical to what
+        :meth:`katpoint.Timestamp.to_ephem_date` produces
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    int_secs = np.floor(timestamps)
+    days, secs = np.divmod(int_secs, 86400.0)
+    hours, secs = np.divmod(secs, 3600.0)
+    minutes, secs = np.divmod(secs, 60.0)
+    secs += timestamps - int_secs
+    # Follow the calendar tuple route (and order of operations) of
+    # katpoint / pyephem so that the results agree to the last bit
+    djd = days + UNIX_EPOCH_DJD + hours / 24. + minutes / (24. * 60.) + secs / (24. * 60. * 60.)
+    return djd[()]
+
+
+def to_mjd(timestamps):
+    """Convert UTC timestamps to Modified Julian Days (MJD).
+
+    Parameters
+    ----------
+    timestamps : float or array of float
+        Timestamp(s) in UTC seconds since Unix epoch
+
+    Returns
+    -------
+    mjd : float or array of float
+        Modified Julian Day(s), identical to what
+        :meth:`katpoint.Timestamp.to_mjd` produces
+    """
+    return to_ephem_date(timestamps) + 2415020 - 2400000.5
+
+
+def to_mjd_seconds(timestamps):
+    """Convert UTC timestamps to MJD seconds, as used by Measurement Sets.
+
+    Parameters
+    ----------
+    timestamps : float or array of float
+        Timestamp(s) in UTC seconds since Unix epoch
+
+    Returns
+    -------
+    mjd_seconds : float or array of float
+        Seconds since the MJD epoch (1858-11-17 00:00 UTC), identical to
+        ``katpoint.Timestamp(t).to_mjd() * 24 * 60 * 60``
+    """
+    return to_mjd(timestamps) * 24 * 60 * 60
+
+
+def local_sidereal_time(timestamps, antenna, max_knot_spacing=3600.0):
+    """Calculate local sidereal time at antenna for an array of timestamps.
+
+    This evaluates :meth:`katpoint.Antenna.local_sidereal_time` (the apparent
+    sidereal time according to pyephem) only at a few knots spanning the
+    timestamps. After removing the steady rotation of the Earth, what remains
+    is the slowly varying equation of the equinoxes, which is interpolated
+    linearly between the knots. With the default spacing of an hour the
+    results agree with katpoint to within 1e-8 radians (2 milliarcseconds).
+
+    Parameters
+    ----------
+    timestamps : float or array of float
+        Timestamp(s) in UTC seconds since Unix epoch
+    antenna : :class:`katpoint.Antenna` object
+        Antenna whose longitude determines the local sidereal time
+    max_knot_spacing : float, optional
+        Maximum time interval between knots, in seconds
+
+    Returns
+    -------
+    lst : float or array of float
+        Local sidereal time(s) in radians, in the range [0, 2*pi)
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    if timestamps.size == 0:
+        return np.empty(timestamps.shape)
+    start, end = timestamps.min(), timestamps.max()
+    num_knots = int(np.ceil((end - start) / max_knot_spacing)) + 1
+    knots = np.linspace(start, end, num_knots)
+    knot_lst = np.array(antenna.local_sidereal_time(knots), dtype=np.float64)
+    # Remove the steady rotation, which leaves small offsets and 2*pi wraps
+    knot_offset = np.unwrap(knot_lst - SIDEREAL_RATE * (knots - start))
+    offset = np.interp(timestamps, knots, knot_offset)
+    lst = np.mod(offset + SIDEREAL_RATE * (timestamps - start), 2.0 * np.pi)
+    return lst[()]
@@ -29,7 +29,7 @@ from .dataset import (DataSet, BrokenFile, Subarray, DEFAULT_SENSOR_PROPS,
                       _selection_to_list)
 from .datasources import VisFlagsWeights
 from .spectral_window import SpectralWindow
-from .sensordata import SensorCache
+from .sensordata import SensorCache, DiskSensorCache
 from .categorical import CategoricalData
 from .lazy_indexer import DaskLazyIndexer
 from .applycal import (add_applycal_sensors, calc_correction,
@@ -95,6 +95,11 @@ def _relative_view(telstate, name):
     return view
 
 
+def _correct_vis_in_place(vis, correction):
+    """Apply `correction` to visibilities loaded by a direct reader."""
+    apply_vis_correction(vis, correction, vis)
+
+
 def _normalise_cal_products(products, cal_streams):
     """Expand user-supplied list of cal products into fully qualified versions."""
     requested_cal_products = _selection_to_list(products, all=cal_streams,
@@ -162,12 +167,22 @@ class VisibilityDataV4(DataSet):
         (if available). A value of None disables flux calibration.
     sensor_store : string, optional
         Hostname / endpoint of katstore webserver to access additional sensors
+    sensor_cache_dir : string or None, optional
+        Store extracted and virtual sensors (including calibration corrections)
+        in this directory and reuse them when the data set is opened again
+        (see :class:`~katdal.sensordata.DiskSensorCache`)
+    sensor_lazy_interpolation : {False, True}, optional
+        Only interpolate numerical sensors onto the selected timestamps when
+        they are requested, to save memory (see :class:`~katdal.sensordata.SensorCache`)
+    sensor_float32 : {False, True}, optional
+        Store numerical sensor values as float32 to save memory
     kwargs : dict, optional
         Extra keyword arguments, typically meant for other formats and ignored
 
     """
     def __init__(self, source, ref_ant='', time_offset=0.0, applycal='',
-                 gaincal_flux={}, sensor_store=None, **kwargs):
+                 gaincal_flux={}, sensor_store=None, sensor_cache_dir=None,
+                 sensor_lazy_interpolation=False, sensor_float32=False, **kwargs):
         DataSet.__init__(self, source.name, ref_ant, time_offset)
         attrs = source.metadata.attrs
 
@@ -217,10 +232,20 @@ class VisibilityDataV4(DataSet):
         all_dumps = [0, num_dumps]
 
         # Assemble sensor cache
+        if sensor_cache_dir:
+            # Calibration corrections also depend on the gaincal flux override
+            flux = sorted(gaincal_flux.items()) if gaincal_flux else gaincal_flux
+            identity = '%s cbid=%s stream=%s gaincal_flux=%r' % (
+                source.name, getattr(source, 'capture_block_id', ''),
+                getattr(source, 'stream_name', ''), flux)
+            disk_cache = DiskSensorCache(sensor_cache_dir, identity)
+        else:
+            disk_cache = None
         self.sensor = SensorCache(source.metadata.sensors, source.timestamps,
                                   self.dump_period, self._time_keep,
                                   SENSOR_PROPS, VIRTUAL_SENSORS, SENSOR_ALIASES,
-                                  sensor_store)
+                                  sensor_store, disk_cache, sensor_lazy_interpolation,
+                                  sensor_float32)
 
         # ------ Extract flags ------
 
@@ -436,8 +461,13 @@ class VisibilityDataV4(DataSet):
                     name = name.replace('sdp_l0', 'sdp_l1')
                 else:
                     name = name + ' (corrected)'
+                direct_vis = self.source.data.direct_vis
+                if direct_vis is not None:
+                    direct_vis = direct_vis.with_transform(_correct_vis_in_place,
+                                                           self._corrections)
                 self._corrected = VisFlagsWeights(corrected_vis, corrected_flags,
-                                                  corrected_weights, name=name)
+                                                  corrected_weights, name=name,
+                                                  direct_vis=direct_vis)
 
         # Apply default selection and initialise all members that depend
         # on selection in the process
@@ -545,7 +575,8 @@ class VisibilityDataV4(DataSet):
             stage1 = (self._time_keep, self._freq_keep, self._corrprod_keep)
             if update_all:
                 # Cache dask graphs for the data fields
-                self._vis = DaskLazyIndexer(self._corrected.vis, stage1)
+                self._vis = DaskLazyIndexer(self._corrected.vis, stage1,
+                                            direct=self._corrected.direct_vis)
                 self._weights = DaskLazyIndexer(self._corrected.weights, stage1)
             flag_transforms = []
             if ~self._flags_select != 0:
@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+
+#
+# Convert an HDF5 v3 file to the MeerKAT Visibility Format version 4 (MVFv4),
+# i.e. a directory of chunks (or an S3 bucket) plus an RDB file.
+#
+# The visibilities, flags and weights are streamed from the HDF5 file in
+# blocks of dumps and written in parallel by dask workers, so memory use is
+# bounded by the block size regardless of the size of the file. The metadata
+# is rebuilt from the opened H5DataV3 object rather than copied from the file,
+# so that VisibilityDataV4 sees the same antennas, spectral window, scans,
+# compound scans and targets as H5DataV3 did.
+#
+
+from __future__ import print_function, division, absolute_import
+from builtins import range
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+import dask
+import dask.array as da
+import katsdptelstate
+from katsdptelstate.rdb_writer import RDBWriter
+
+import katdal
+from katdal.chunkstore import ChunkStoreError
+from katdal.chunkstore_npy import NpyFileChunkStore
+from katdal.lazy_indexer import hdf5_to_dask
+from katdal.sensordata import to_str
+
+
+# Map SpectralWindow band name to the subarray band expected by VisibilityDataV4
+SUB_BAND = {'L': 'l', 'UHF': 'u', 'S': 's', 'X': 'x', 'Ku': 'x'}
+
+# Raw sensors copied verbatim, as (H5DataV3 names to try in turn, MVFv4 name)
+ANTENNA_SENSORS = [
+    (['Antennas/{ant}/pos_actual_scan_azim'], '{ant}_pos_actual_scan_azim'),
+    (['Antennas/{ant}/pos_actual_scan_elev'], '{ant}_pos_actual_scan_elev'),
+    (['Antennas/{ant}/pos_request_scan_azim'], '{ant}_pos_request_scan_azim'),
+    (['Antennas/{ant}/pos_request_scan_elev'], '{ant}_pos_request_scan_elev'),
+    (['Antennas/{ant}/nd_coupler'], '{ant}_dig_{band}_band_noise_diode'),
+]
+ARRAY_SENSORS = [
+    (['Enviro/air_temperature', 'TelescopeState/anc_weather_temperature'],
+     'anc_air_temperature'),
+    (['Enviro/air_pressure', 'TelescopeState/anc_weather_pressure'],
+     'anc_air_pressure'),
+    (['Enviro/air_relative_humidity', 'TelescopeState/anc_weather_humidity'],
+     'anc_air_relative_humidity'),
+    (['Enviro/mean_wind_speed', 'Enviro/wind_speed', 'TelescopeState/anc_weather_wind_speed'],
+     'anc_mean_wind_speed'),
+    (['Enviro/wind_direction', 'TelescopeState/anc_weather_wind_direction'],
+     'anc_wind_direction'),
+    (['Observation/script_log'], 'obs_script_log'),
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Convert an HDF5 v3 file to MVFv4 (RDB file plus chunk store). '
+        'The RDB file ends up in DEST/CBID/CBID_STREAM.rdb and the chunks '
+        'in DEST/PREFIX (or in an S3 bucket called PREFIX).')
+    parser.add_argument('filename', help='Input HDF5 v3 file')
+    parser.add_argument('dest', help='Output directory')
+    parser.add_argument('--capture-block-id',
+                        help='Capture block ID [from file, else start time]')
+    parser.add_argument('--time-chunk', type=int,
+                        help='Number of dumps per chunk [auto]')
+    parser.add_argument('--freq-chunk', type=int,
+                        help='Number of channels per chunk [auto]')
+    parser.add_argument('--chunk-size', type=float, default=4.0,
+                        help='Target size of visibility chunks when chunking '
+                        'automatically, in MB [%(default)s]')
+    parser.add_argument('--block-size', type=float, default=1024.0,
+                        help='Amount of data to convert at a time, in MB, '
+                        'which bounds memory usage [%(default)s]')
+    parser.add_argument('--workers', type=int, default=2 * multiprocessing.cpu_count(),
+                        help='Number of dask workers [%(default)s]')
+    parser.add_argument('--s3-endpoint-url',
+                        help='Upload chunks to this S3 service instead of DEST')
+    parser.add_argument('--access-key', help='S3 access key')
+    parser.add_argument('--secret-key', help='S3 secret key')
+    parser.add_argument('--band', help='Receiver band, if not in file (l, s, u, x)')
+    parser.add_argument('--centre-freq', type=float,
+                        help='Centre frequency in Hz, if not in file')
+    return parser.parse_args()
+
+
+def auto_chunks(n_chans, n_bls, itemsize, target_bytes):
+    """Pick the number of dumps and channels per chunk for a target chunk size."""
+    dump_bytes = n_bls * itemsize
+    freq_chunk = int(min(n_chans, max(target_bytes // dump_bytes, 1)))
+    time_chunk = int(max(target_bytes // (freq_chunk * dump_bytes), 1))
+    return time_chunk, freq_chunk
+
+
+def regular_chunks(length, chunk):
+    """Split `length` elements into chunks of size `chunk` (last one smaller)."""
+    chunks = (chunk,) * (length // chunk)
+    return chunks + ((length % chunk,) if length % chunk else ())
+
+
+def categorical_events(telstate, key, sensor, timestamps, to_value=lambda value: value):
+    """Add one sample per event of categorical `sensor` at the corresponding dump."""
+    for segment, value in sensor.segments():
+        telstate.add(key, to_value(value), ts=timestamps[segment.start])
+
+
+def raw_sensor(d, names):
+    """Raw sensor data of the first of `names` available in dataset `d` (or None)."""
+    for name in names:
+        try:
+            return d.sensor.get(name, extract=False).get()
+        except KeyError:
+            continue
+    return None
+
+
+def build_telstate(d, cbid, stream, chunk_info, s3_endpoint_url=None):
+    """Assemble MVFv4 metadata from the opened H5DataV3 dataset `d`."""
+    telstate = katsdptelstate.TelescopeState()
+    spw = d.spectral_windows[d.spw]
+    band = SUB_BAND[spw.band]
+    ants = d.subarrays[d.subarray].ants
+    corrprods = d.subarrays[d.subarray].corr_products
+    n_dumps = chunk_info['correlator_data']['shape'][0]
+    # VisibilityDataV4 synthesises regular timestamps from these attributes
+    # (sync_time is irrelevant here as the timestamps are already absolute)
+    first_timestamp = d.timestamps[0]
+    timestamps = first_timestamp + np.arange(n_dumps) * d.dump_period
+    irregular = np.abs(timestamps - d.timestamps).max()
+    if irregular > 0.01 * d.dump_period:
+        print('WARNING: timestamps deviate from regular grid by up to %g s' % (irregular,))
+
+    telstate['capture_block_id'] = cbid
+    telstate['stream_name'] = stream
+    telstate['sdp_archived_streams'] = [stream]
+    telstate['sub_pool_resources'] = ','.join(ant.name for ant in ants)
+    telstate['sub_band'] = band
+    telstate['sub_product'] = spw.product or ''
+    for ant in ants:
+        telstate[ant.name + '_observer'] = ant.description
+        rx_serial = d.receivers.get(ant.name, '').partition('.')[2]
+        if rx_serial.isdigit():
+            telstate['%s_rsc_rx%s_serial_number' % (ant.name, band)] = int(rx_serial)
+    cb_telstate = telstate.view(cbid)
+    cb_telstate['obs_params'] = d.obs_params
+    stream_telstate = telstate.view(stream)
+    stream_telstate['stream_type'] = 'sdp.vis'
+    stream_telstate['n_chans'] = spw.num_chans
+    stream_telstate['bandwidth'] = spw.channel_width * spw.num_chans
+    stream_telstate['center_freq'] = spw.centre_freq
+    stream_telstate['bls_ordering'] = [list(corrprod) for corrprod in corrprods]
+    stream_telstate['int_time'] = d.dump_period
+    stream_telstate['sync_time'] = 0.0
+    stream_telstate['first_timestamp'] = first_timestamp
+    stream_telstate['need_weights_power_scale'] = False
+    if s3_endpoint_url:
+        stream_telstate['s3_endpoint_url'] = s3_endpoint_url
+    telstate.view(telstate.join(cbid, stream))['chunk_info'] = chunk_info
+
+    # Use the scans, compound scans and targets of H5DataV3 as they are
+    # (the "array" sensors are the ones VisibilityDataV4 uses by default)
+    categorical_events(telstate, 'obs_activity', d.sensor.get('Observation/scan_state'), timestamps)
+    categorical_events(telstate, 'obs_label', d.sensor.get('Observation/label'), timestamps)
+    categorical_events(telstate, 'cbf_target', d.sensor.get('Observation/target'), timestamps,
+                       lambda target: target.description)
+    for ant in ants:
+        for sensor_name in ('activity', 'target'):
+            try:
+                sensor = d.sensor.get('Antennas/%s/%s' % (ant.name, sensor_name))
+            except KeyError:
+                continue
+            categorical_events(telstate, '%s_%s' % (ant.name, sensor_name), sensor, timestamps,
+                               lambda value: getattr(value, 'description', value))
+    sensors = [([name.format(ant=ant.name) for name in names], key.format(ant=ant.name, band=band))
+               for names, key in ANTENNA_SENSORS for ant in ants] + ARRAY_SENSORS
+    for names, key in sensors:
+        data = raw_sensor(d, names)
+        if data is not None:
+            for ts, value in zip(data.timestamp.tolist(), data.value.tolist()):
+                telstate.add(key, value, ts=ts)
+    return telstate
+
+
+def main():
+    args = parse_args()
+    dask.config.set(num_workers=args.workers)
+    open_kwargs = {}
+    if args.band:
+        open_kwargs['band'] = args.band
+    if args.centre_freq:
+        open_kwargs['centre_freq'] = args.centre_freq
+    d = katdal.open(args.filename, **open_kwargs)
+    if d.version[0] != '3':
+        raise RuntimeError('{} is a version {} file, not version 3'.format(args.filename, d.version))
+    spw = d.spectral_windows[d.spw]
+    if spw.sideband != 1:
+        raise RuntimeError('Lower sideband data is not supported by MVFv4')
+    if spw.band not in SUB_BAND:
+        raise RuntimeError('Unknown receiver band {!r} - please specify --band'.format(spw.band))
+    cbid = args.capture_block_id or to_str(
+        d.file.attrs.get('capture_block_id', str(int(d.start_time.secs))))
+    stream = d.stream_name
+    prefix = '{}-{}'.format(cbid, stream.replace('_', '-'))
+
+    # The raw HDF5 datasets, minus any duplicate final dump
+    data_group = d.file['Data']
+    n_dumps = len(d.timestamps)
+    vis = hdf5_to_dask(data_group['correlator_data'])[:n_dumps]
+    vis = vis.view(np.complex64)[..., 0]
+    n_dumps, n_chans, n_bls = vis.shape
+    if 'flags' in data_group:
+        flags = hdf5_to_dask(data_group['flags'])[:n_dumps]
+    else:
+        flags = da.zeros(vis.shape, np.uint8, chunks=vis.chunks)
+    if 'weights' in data_group:
+        weights = hdf5_to_dask(data_group['weights'])[:n_dumps]
+    else:
+        weights = da.ones(vis.shape, np.uint8, chunks=vis.chunks)
+    if 'weights_channel' in data_group:
+        weights_channel = hdf5_to_dask(data_group['weights_channel'])[:n_dumps]
+    else:
+        weights_channel = da.ones(vis.shape[:2], np.float32, chunks=vis.chunks[:2])
+    arrays = {'correlator_data': vis, 'flags': flags,
+              'weights': weights, 'weights_channel': weights_channel}
+
+    # Decide on chunking and block size (a whole number of time chunks)
+    time_chunk, freq_chunk = auto_chunks(n_chans, n_bls, vis.dtype.itemsize,
+                                         int(args.chunk_size * 1024 ** 2))
+    time_chunk = min(args.time_chunk or time_chunk, n_dumps)
+    freq_chunk = min(args.freq_chunk or freq_chunk, n_chans)
+    dump_bytes = sum(array.dtype.itemsize * np.prod(array.shape[1:]) for array in arrays.values())
+    block_chunks = max(int(args.block_size * 1024 ** 2 // (time_chunk * dump_bytes)), 1)
+    block_dumps = block_chunks * time_chunk
+    chunk_info = {}
+    for array_name, array in arrays.items():
+        chunks = (regular_chunks(n_dumps, time_chunk), regular_chunks(n_chans, freq_chunk))
+        chunks += tuple((length,) for length in array.shape[2:])
+        chunk_info[array_name] = {'prefix': prefix, 'chunks': chunks, 'shape': array.shape,
+                                  'dtype': np.lib.format.dtype_to_descr(array.dtype)}
+
+    # Assemble the metadata up front to catch any problems before writing data
+    telstate = build_telstate(d, cbid, stream, chunk_info, args.s3_endpoint_url)
+
+    if args.s3_endpoint_url:
+        from katdal.chunkstore_s3 import S3ChunkStore
+        credentials = (args.access_key, args.secret_key) if args.access_key else None
+        store = S3ChunkStore(args.s3_endpoint_url, credentials=credentials)
+    else:
+        if os.path.exists(os.path.join(args.dest, prefix)):
+            raise RuntimeError('Directory {!r} already exists'.format(os.path.join(args.dest, prefix)))
+        if not os.path.isdir(args.dest):
+            os.makedirs(args.dest)
+        store = NpyFileChunkStore(args.dest)
+    for array_name in arrays:
+        store.create_array(store.join(prefix, array_name))
+
+    # Stream the data into the chunk store one block of dumps at a time
+    print('Converting {} dumps x {} channels x {} baselines in chunks of {} dumps x {} channels'
+          .format(n_dumps, n_chans, n_bls, time_chunk, freq_chunk))
+    start_time = time.time()
+    for start in range(0, n_dumps, block_dumps):
+        stop = min(start + block_dumps, n_dumps)
+        stores = []
+        for array_name, array in arrays.items():
+            block = array[start:stop].rechunk((time_chunk, freq_chunk) + array.shape[2:])
+            offset = (start,) + (0,) * (array.ndim - 1)
+            stores.append(store.put_dask_array(store.join(prefix, array_name), block, offset))
+        # put_dask_array returns an array with an exception object per chunk
+        for result_set in da.compute(*stores):
+            for result in result_set.flat:
+                if result is not None:
+                    raise result
+        elapsed = time.time() - start_time
+        print('Wrote dumps {}-{} of {} ({:.1f} MB/s)'
+              .format(start, stop - 1, n_dumps, stop * dump_bytes / elapsed / 1e6))
+
+    # Write the RDB file last, so that it only exists if the data is complete
+    dest_file = os.path.join(args.dest, cbid, '{}_{}.rdb'.format(cbid, stream))
+    if not os.path.isdir(os.path.dirname(dest_file)):
+        os.makedirs(os.path.dirname(dest_file))
+    with RDBWriter(dest_file) as writer:
+        writer.save(telstate.backend)
+    print('Wrote', dest_file)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except (RuntimeError, ChunkStoreError) as exc:
+        print(exc, file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+
+#
+# Measure how long it takes to import katdal (and optionally open a data set)
+# in a fresh Python interpreter, and report which heavy dependencies got loaded.
+#
+
+from __future__ import print_function, division, absolute_import
+from builtins import range
+import argparse
+import json
+import subprocess
+import sys
+
+import numpy as np
+
+
+HEAVY_MODULES = ('dask', 'numba', 'h5py', 'katpoint', 'katsdptelstate',
+                 'requests', 'jwt', 'katdal.applycal', 'katdal.chunkstore_s3',
+                 'katdal.h5datav3', 'katdal.visdatav4')
+
+CHILD_SCRIPT = """
+import json, sys, time
+start = time.time()
+import katdal
+imported = time.time()
+filename = {filename!r}
+if filename:
+    d = katdal.open(filename, **{kwargs!r})
+opened = time.time()
+loaded = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps([imported - start, opened - imported, loaded]))
+"""
+
+
+parser = argparse.ArgumentParser(
+    description='Time the import of katdal in a fresh interpreter')
+parser.add_argument('filename', nargs='?', default='',
+                    help='Optionally also open this data set after import')
+parser.add_argument('--repeats', type=int, default=5,
+                    help='Number of fresh interpreters to time (default %(default)s)')
+parser.add_argument('--metadata-only', action='store_true',
+                    help='Open RDB file without its chunk store')
+args = parser.parse_args()
+
+kwargs = {'chunk_store': None} if args.metadata_only else {}
+script = CHILD_SCRIPT.format(filename=args.filename, kwargs=kwargs, heavy=HEAVY_MODULES)
+import_times, open_times = [], []
+for n in range(args.repeats):
+    output = subprocess.check_output([sys.executable, '-c', script])
+    import_time, open_time, loaded = json.loads(output.decode().splitlines()[-1])
+    import_times.append(import_time)
+    open_times.append(open_time)
+print('import katdal: best %.3f s, median %.3f s over %d runs'
+      % (min(import_times), np.median(import_times), args.repeats))
+if args.filename:
+    print('katdal.open:   best %.3f s, median %.3f s over %d runs'
+          % (min(open_times), np.median(open_times), args.repeats))
+print('Heavy modules loaded:', ', '.join(loaded) if loaded else 'none')
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+
+#
+# Measure the cold-start latency of katdal's numba kernels, i.e. how long a
+# fresh process takes to compile them, with and without numba's disk cache.
+#
+
+from __future__ import print_function, division, absolute_import
+from builtins import range
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+
+CHILD_SCRIPT = """
+import json, time
+start = time.time()
+from katdal.lazy_jit import warm_up
+elapsed = warm_up()
+print(json.dumps([time.time() - start, elapsed]))
+"""
+
+
+def run_child(cache_dir):
+    env = dict(os.environ, NUMBA_CACHE_DIR=cache_dir)
+    output = subprocess.check_output([sys.executable, '-c', CHILD_SCRIPT], env=env)
+    return json.loads(output.decode().splitlines()[-1])
+
+
+parser = argparse.ArgumentParser(
+    description='Time the warm-up of katdal numba kernels in fresh interpreters')
+parser.add_argument('--repeats', type=int, default=5,
+                    help='Number of fresh interpreters using the warm cache '
+                         '(default %(default)s)')
+args = parser.parse_args()
+
+cache_dir = tempfile.mkdtemp(prefix='katdal-numba-cache-')
+try:
+    cold_total, cold = run_child(cache_dir)
+    warm_totals = []
+    for n in range(args.repeats):
+        warm_total, warm = run_child(cache_dir)
+        warm_totals.append(warm_total)
+finally:
+    shutil.rmtree(cache_dir)
+
+print('Empty cache: %.3f s' % (cold_total,))
+for module, seconds in sorted(cold.items()):
+    print('  %-20s %.3f s' % (module, seconds))
+print('Warm cache:  best %.3f s, median %.3f s over %d runs'
+      % (min(warm_totals), np.median(warm_totals), args.repeats))
+for module, seconds in sorted(warm.items()):
+    print('  %-20s %.3f s' % (module, seconds))
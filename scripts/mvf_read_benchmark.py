@@ -18,7 +18,7 @@ parser.add_argument('filename')
 parser.add_argument('--time', type=int, default=10, help='Number of times to read per batch')
 parser.add_argument('--channels', type=int, help='Number of channels to read')
 parser.add_argument('--dumps', type=int, help='Number of times to read')
-parser.add_argument('--joint', action='store_true', help='Load vis, weights, flags together')
+parser.add_argument('--joint', action='store_true', help='Load vis, weights, flags together in chunk-aligned blocks')
 parser.add_argument('--applycal', help='Calibration solutions to apply')
 parser.add_argument('--workers', type=int, help='Number of dask workers')
 args = parser.parse_args()
@@ -41,14 +41,14 @@ _ = (f.vis[0, 0, 0], f.weights[0, 0, 0], f.flags[0, 0, 0])
 logging.info('Selection complete')
 start = time.time()
 last_time = start
-for st in range(0, f.shape[0], args.time):
-    et = st + args.time
-    if args.joint:
-        vis, weights, flags = DaskLazyIndexer.get([f.vis, f.weights, f.flags], np.s_[st:et])
-    else:
-        vis = f.vis[st:et]
-        weights = f.weights[st:et]
-        flags = f.flags[st:et]
+if args.joint:
+    # Chunk-aligned blocks of about args.time dumps, prefetched in the background
+    blocks = DaskLazyIndexer.iter_blocks([f.vis, f.weights, f.flags], block=args.time)
+else:
+    blocks = ((np.s_[st:st + args.time], f.vis[st:st + args.time],
+               f.weights[st:st + args.time], f.flags[st:st + args.time])
+              for st in range(0, f.shape[0], args.time))
+for index, vis, weights, flags in blocks:
     current_time = time.time()
     elapsed = current_time - last_time
     last_time = current_time
@@ -39,12 +39,12 @@ import numpy as np
 import dask
 import numba
 
-import katpoint
 import katdal
 from katdal import averager
 from katdal import ms_extra
 from katdal import ms_async
 from katdal.sensordata import telstate_decode
+from katdal.timeconv import to_mjd_seconds
 from katdal.lazy_indexer import DaskLazyIndexer
 from katdal.flags import NAMES as FLAG_NAMES
 
@@ -96,7 +96,7 @@ def load(dataset, indices, vis, weights, flags):
         flags[:] = dataset.flags[indices]
 
 
-@numba.jit(nopython=True, parallel=True)
+@numba.jit(nopython=True, parallel=True, cache=True)
 def permute_baselines(in_vis, in_weights, in_flags, cp_index, out_vis, out_weights, out_flags):
     """Reorganise baselines and axis order.
 
@@ -429,8 +429,8 @@ def main():
         print("\nUsing %s as the reference antenna. All targets and scans "
               "will be based on this antenna.\n" % (dataset.ref_ant,))
         # MS expects timestamps in MJD seconds
-        start_time = dataset.start_time.to_mjd() * 24 * 60 * 60
-        end_time = dataset.end_time.to_mjd() * 24 * 60 * 60
+        start_time = to_mjd_seconds(dataset.start_time.secs)
+        end_time = to_mjd_seconds(dataset.end_time.secs)
         # MVF version 1 and 2 datasets are KAT-7; the rest are MeerKAT
         telescope_name = 'KAT-7' if dataset.version[0] in '12' else 'MeerKAT'
 
@@ -534,7 +534,7 @@ def main():
 
                     field_names.append(target.name)
                     field_centers.append((ra, dec))
-                    field_times.append(katpoint.Timestamp(utc_seconds[0]).to_mjd() * 60 * 60 * 24)
+                    field_times.append(to_mjd_seconds(utc_seconds[0]))
                     if options.verbose:
                         print("Added new field %d: '%s' %s %s"
                               % (len(field_names) - 1, target.name, ra, dec))
@@ -718,8 +718,7 @@ def main():
                         solvals = np.array(solvals)
 
                         # convert averaged UTC timestamps to MJD seconds.
-                        sol_mjd = np.array([katpoint.Timestamp(time_utc).to_mjd() * 24 * 60 * 60
-                                            for time_utc in soltimes])
+                        sol_mjd = to_mjd_seconds(soltimes)
 
                         # determine solution characteristics
                         if len(solvals.shape) == 4:
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+#
+# Measure how long it takes to clean up and extract large synthetic sensors,
+# such as the 10 Hz pointing sensors of a long observation.
+#
+
+from __future__ import print_function, division, absolute_import
+from builtins import range
+import argparse
+import time
+
+import numpy as np
+
+from katdal.sensordata import (SensorData, SimpleSensorGetter, SensorCache,
+                               remove_duplicates_and_invalid_values)
+
+
+def make_sensor(name, samples, duplicates, invalid, categorical, rs):
+    """Synthesise sensor with a given fraction of duplicate and invalid samples."""
+    timestamp = 1500000000.0 + 0.1 * np.arange(samples)
+    dup = rs.rand(samples) < duplicates
+    timestamp[1:][dup[1:]] = timestamp[:-1][dup[1:]]
+    if categorical:
+        value = np.array(['slew', 'track', 'scan'])[rs.randint(3, size=samples)]
+    else:
+        value = rs.uniform(-180, 180, samples)
+    status = np.where(rs.rand(samples) < invalid, 'unknown', 'nominal')
+    return SensorData(name, timestamp, value, status)
+
+
+def best_of(repeats, func, *args, **kwargs):
+    elapsed = []
+    for n in range(repeats):
+        start = time.time()
+        func(*args, **kwargs)
+        elapsed.append(time.time() - start)
+    return min(elapsed)
+
+
+parser = argparse.ArgumentParser(
+    description='Time the clean-up and extraction of large synthetic sensors')
+parser.add_argument('--samples', type=int, default=3000000,
+                    help='Number of samples per sensor (default %(default)s)')
+parser.add_argument('--duplicates', type=float, default=0.001,
+                    help='Fraction of samples with duplicate timestamps (default %(default)s)')
+parser.add_argument('--invalid', type=float, default=0.001,
+                    help='Fraction of samples with invalid status (default %(default)s)')
+parser.add_argument('--dumps', type=int, default=10000,
+                    help='Number of data timestamps to interpolate onto (default %(default)s)')
+parser.add_argument('--repeats', type=int, default=3,
+                    help='Number of repeats, of which the best is reported (default %(default)s)')
+args = parser.parse_args()
+
+rs = np.random.RandomState(42)
+for categorical in (False, True):
+    kind = 'categorical' if categorical else 'numerical'
+    for duplicates in (0.0, args.duplicates):
+        sensor = make_sensor('sensor', args.samples, duplicates, args.invalid, categorical, rs)
+        clean = best_of(args.repeats, remove_duplicates_and_invalid_values, sensor)
+        timestamps = np.linspace(sensor.timestamp[0], sensor.timestamp[-1], args.dumps)
+        getter = SimpleSensorGetter(sensor.name, sensor.timestamp, sensor.value, sensor.status)
+
+        def extract():
+            cache = SensorCache({'sensor': getter}, timestamps, timestamps[1] - timestamps[0])
+            cache.get('sensor')
+        total = best_of(args.repeats, extract)
+        print('%-11s sensor, %d samples, %g%% duplicates: clean-up %.3f s, extraction %.3f s'
+              % (kind, args.samples, 100 * duplicates, clean, total))
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+
+#
+# Compare the vectorised time conversions in katdal.timeconv to converting
+# one timestamp at a time with katpoint, for large arrays of timestamps.
+#
+
+from __future__ import print_function, division, absolute_import
+import argparse
+import time
+
+import numpy as np
+import katpoint
+
+from katdal.timeconv import to_mjd_seconds, local_sidereal_time
+
+
+def elapsed(func, *args):
+    start = time.time()
+    func(*args)
+    return time.time() - start
+
+
+parser = argparse.ArgumentParser(
+    description='Time the conversion of UTC timestamps to MJD seconds and LST')
+parser.add_argument('--samples', type=int, default=1000000,
+                    help='Number of timestamps (default %(default)s)')
+parser.add_argument('--span', type=float, default=8 * 3600.0,
+                    help='Time span covered by timestamps, in seconds (default %(default)s)')
+parser.add_argument('--reference-samples', type=int, default=20000,
+                    help='Number of timestamps converted by katpoint, '
+                         'scaled up to the full number (default %(default)s)')
+args = parser.parse_args()
+
+antenna = katpoint.Antenna('m000, -30:42:39.8, 21:26:38.0, 1086.6, 13.5')
+timestamps = 1500000000.0 + np.linspace(0.0, args.span, args.samples)
+reference = timestamps[:args.reference_samples]
+scale = args.samples / len(reference)
+
+katpoint_mjd = scale * elapsed(lambda: [katpoint.Timestamp(t).to_mjd() * 24 * 60 * 60
+                                        for t in reference])
+katdal_mjd = elapsed(to_mjd_seconds, timestamps)
+print('MJD seconds: katpoint %.3f s, katdal %.3f s (%.0fx faster)'
+      % (katpoint_mjd, katdal_mjd, katpoint_mjd / katdal_mjd))
+
+katpoint_lst = scale * elapsed(antenna.local_sidereal_time, reference)
+katdal_lst = elapsed(local_sidereal_time, timestamps, antenna)
+print('LST: katpoint %.3f s, katdal %.3f s (%.0fx faster)'
+      % (katpoint_lst, katdal_lst, katpoint_lst / katdal_lst))